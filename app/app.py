@@ -1,49 +1,91 @@
 import logging
-import os
 
-import sentry_sdk
+import click
 from flask import Flask
 from flask_cors import CORS
-from sentry_sdk.integrations.flask import FlaskIntegration
-from sentry_sdk.integrations.logging import LoggingIntegration
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from app.auth.auth_controller import AuthController
+from app.auth.fenix.circuit_breaker import CircuitBreaker
 from app.auth.fenix.fenix_service import FenixService
 from app.auth.scopes.system_scopes import SystemScopes
 
 from app.commands import register_cli_commands
-from app.config import Config
+from app.config import Config, resolve_clients
 
-from app.errors import handle_validation_error, handle_http_exception
+from app.image_resizer import ImageResizer
+from app.image_transcoder import ImageTranscoder
+from app.image_store import image_store_from_config
+from app.rate_limiter import RateLimiter
+from app.session_interface import SessionlessPathsInterface, TimedSessionInterface
+
+from app.errors import handle_validation_error, handle_http_exception, handle_password_hasher_busy
 
 from app.extensions import db
-from app.extensions import migrate
 from app.extensions import session
-
+from app.extensions import password_hasher
+from app.extensions import image_url_signer
+from app.extensions import log_pipeline
+from app.extensions import request_ids
+from app.extensions import profiler
+from app.extensions import query_counter
+from app.extensions import slow_query_log
+from app.extensions import request_metrics
+from app.extensions import server_timing
+
+from app.repositories.api_key_repository import ApiKeyRepository
+from app.repositories.image_repository import ImageRepository
 from app.repositories.member_repository import MemberRepository
 from app.repositories.project_participation_repository import ProjectParticipationRepository
 from app.repositories.task_repository import TaskRepository
 from app.repositories.project_repository import ProjectRepository
 
+from app.controllers.api_key_controller import create_api_key_bp
 from app.controllers.member_controller import create_member_bp
 from app.controllers.project_controller import create_project_bp
 from app.controllers.project_participation_controller import create_participation_bp
 from app.controllers.login_controller import create_login_bp
+from app.controllers.metrics_controller import create_metrics_bp
 from app.controllers.image_controller import create_images_bp
 from app.controllers.task_controller import create_task_bp
 
 
 def create_app(config_class=Config, *, member_repo=None, project_repo=None, participation_repo=None, task_repo=None,
-               fenix_service=None, auth_controller=None):
+               api_key_repo=None, image_repo=None, image_store=None, image_resizer=None, image_transcoder=None,
+               fenix_service=None, auth_controller=None, rate_limiter=None):
     flask_app = Flask(__name__)
     flask_app.config.from_object(config_class)
+    resolve_clients(flask_app.config)
+    log_pipeline.init_app(flask_app)
+    if flask_app.config["PROXY_FIX_X_FOR"] > 0:
+        flask_app.wsgi_app = ProxyFix(flask_app.wsgi_app, x_for=flask_app.config["PROXY_FIX_X_FOR"])
     CORS(flask_app, supports_credentials=True, resources={r"/*": {"origins": config_class.ORIGINS_WHITELIST}})
 
     session.init_app(flask_app)
+    # signed image URLs are authorized by their signature, not the session, and scrapers have none
+    flask_app.session_interface = SessionlessPathsInterface(TimedSessionInterface(flask_app.session_interface),
+                                                            prefixes=["/images/", "/metrics"])
     db.init_app(flask_app)
-    migrate.init_app(flask_app, db)
+    # Flask-Migrate imports alembic, a tenth of the startup, only the flask db commands need it
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(flask_app, db)
+    password_hasher.init_app(flask_app)
+    image_url_signer.init_app(flask_app)
+    # first, the request id is known to the other instrumentation hooks and logs
+    request_ids.init_app(flask_app)
+    profiler.init_app(flask_app)
+    request_metrics.init_app(flask_app)
+    query_counter.init_app(flask_app)
+    server_timing.init_app(flask_app)
+    with flask_app.app_context():
+        slow_query_log.init_app(flask_app, engines=db.engines.values())
 
     if flask_app.config["SENTRY_DSN"]:
+        import sentry_sdk  # optional, only imported when configured
+        from sentry_sdk.integrations.flask import FlaskIntegration
+        from sentry_sdk.integrations.logging import LoggingIntegration
+
         sentry_logging = LoggingIntegration(
             level=logging.INFO,  # capture info and above as breadcrumbs
             event_level=logging.ERROR  # send errors and above as events to Sentry
@@ -66,14 +108,40 @@ def create_app(config_class=Config, *, member_repo=None, project_repo=None, part
     if task_repo is None:
         task_repo = TaskRepository(db=db)
 
+    if api_key_repo is None:
+        api_key_repo = ApiKeyRepository(db=db)
+
+    if image_repo is None:
+        image_repo = ImageRepository(db=db)
+    if image_store is None:
+        image_store = image_store_from_config(flask_app.config)
+    if image_resizer is None:
+        image_resizer = ImageResizer(image_store=image_store, sizes=flask_app.config["IMAGES_VARIANT_SIZES"],
+                                     max_pixels=flask_app.config["IMAGES_MAX_PIXELS"])
+    if image_transcoder is None:
+        image_transcoder = ImageTranscoder(image_resizer=image_resizer,
+                                           formats=flask_app.config["IMAGES_TRANSCODE_FORMATS"],
+                                           max_workers=flask_app.config["IMAGES_TRANSCODE_WORKERS"],
+                                           max_queue=flask_app.config["IMAGES_TRANSCODE_QUEUE"])
+
     if fenix_service is None:
         fenix_service = FenixService(
             client_id=flask_app.config["CLIENT_ID"],
             client_secret=flask_app.config["CLIENT_SECRET"],
             root_uri=flask_app.config["ROOT_URI"],
             redirect_endpoint=flask_app.config["FENIX_REDIRECT_ENDPOINT"],
+            base_url=flask_app.config["FENIX_BASE_URL"],
+            pool_size=flask_app.config["FENIX_POOL_SIZE"],
+            connect_timeout=flask_app.config["FENIX_CONNECT_TIMEOUT"],
+            read_timeout=flask_app.config["FENIX_READ_TIMEOUT"],
+            max_retries=flask_app.config["FENIX_MAX_RETRIES"],
+            circuit_breaker=CircuitBreaker(failure_threshold=flask_app.config["FENIX_CIRCUIT_FAILURE_THRESHOLD"],
+                                           reset_timeout=flask_app.config["FENIX_CIRCUIT_RESET_TIMEOUT"]),
         )
 
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(redis=flask_app.config["RATE_LIMIT_REDIS"])
+
     if auth_controller is None:
         auth_controller = AuthController(
             enabled=flask_app.config["ENABLED_ACCESS_CONTROL"],
@@ -81,6 +149,7 @@ def create_app(config_class=Config, *, member_repo=None, project_repo=None, part
             member_repo=member_repo,
             project_repo=project_repo,
             participation_repo=participation_repo,
+            api_key_repo=api_key_repo,
         )
 
     member_bp = create_member_bp(member_repo=member_repo, auth_controller=auth_controller)
@@ -98,41 +167,33 @@ def create_app(config_class=Config, *, member_repo=None, project_repo=None, part
                         project_repo=project_repo, member_repo=member_repo, auth_controller=auth_controller)
     flask_app.register_blueprint(task_bp)
 
-    images_bp = create_images_bp(flask_app.config["IMAGES_PATH"], member_repo=member_repo, project_repo=project_repo,
-                                 auth_controller=auth_controller)
+    images_bp = create_images_bp(image_store=image_store, image_resizer=image_resizer,
+                                 image_transcoder=image_transcoder, image_url_signer=image_url_signer,
+                                 image_repo=image_repo,
+                                 member_repo=member_repo, project_repo=project_repo, auth_controller=auth_controller,
+                                 cache_max_age=flask_app.config["IMAGES_CACHE_MAX_AGE"],
+                                 offload=flask_app.config["IMAGES_OFFLOAD"],
+                                 offload_prefix=flask_app.config["IMAGES_OFFLOAD_PREFIX"],
+                                 max_upload_size=flask_app.config["IMAGES_MAX_UPLOAD_SIZE"])
     flask_app.register_blueprint(images_bp)
 
-    login_bp = create_login_bp(member_repo=member_repo, auth_controller=auth_controller, fenix_service=fenix_service)
+    api_key_bp = create_api_key_bp(api_key_repo=api_key_repo, member_repo=member_repo, auth_controller=auth_controller)
+    flask_app.register_blueprint(api_key_bp)
+
+    login_bp = create_login_bp(member_repo=member_repo, auth_controller=auth_controller, fenix_service=fenix_service,
+                               rate_limiter=rate_limiter)
     flask_app.register_blueprint(login_bp)
 
+    flask_app.register_blueprint(create_metrics_bp())
+
     from werkzeug.exceptions import HTTPException
     flask_app.register_error_handler(HTTPException, handle_http_exception)
     from pydantic import ValidationError
     flask_app.register_error_handler(ValidationError, handle_validation_error)
+    from app.password_hasher import PasswordHasherBusyError
+    flask_app.register_error_handler(PasswordHasherBusyError, handle_password_hasher_busy)
 
     register_cli_commands(flask_app)
 
     return flask_app
 
-
-def setup_logger(app: Flask):
-    """
-    If ran with gunicorn simply sets Flask logger to gunicorn ones, configured through cli arguments.
-    If ran with Flask development server simply logs at debug level or default to stdout.
-    """
-    if app.debug:
-        app.logger.setLevel(logging.DEBUG)
-        return
-
-    # create logs folder
-    logs_path = app.config.get("LOGS_PATH")
-    log_dir = os.path.dirname(logs_path)
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    # ran in gunicorn, use gunicorn handlers set through cli arguments
-    if __name__ != "__main__":
-        gunicorn_logger = logging.getLogger("gunicorn.error")
-        app.logger.handlers = gunicorn_logger.handlers
-        app.logger.setLevel(gunicorn_logger.level)
-        return
@@ -1,11 +1,17 @@
 from functools import wraps
 from http import HTTPStatus
 
-from flask import session, abort, g, redirect
+from flask import session, abort, g, redirect, request
 
 from app.auth.permission_strategies import Ctx, indexed_permission_evaluators, indexed_endpoint_validators
 from app.auth.scopes.system_scopes import SystemScopes
 
+from app.instrumentation.profiler import profile_authorized_request
+from app.instrumentation.server_timing import start_phase, stop_phase
+
+from app.models.api_key_model import hash_api_key
+
+from app.repositories.api_key_repository import ApiKeyRepository
 from app.repositories.member_repository import MemberRepository
 from app.repositories.project_participation_repository import ProjectParticipationRepository
 from app.repositories.project_repository import ProjectRepository
@@ -22,6 +28,7 @@ class AuthController:
     - Log in members via :func:`login_member`.
     - Log out members via :func:`logout_member`.
     - Enforce authentication on controllers via :func:`requires_login` and populate the ``current_member`` global proxy.
+      Members are authenticated either by their session or by an API key sent as ``Authorization: Bearer <key>``.
     - Enforce authorization checks on controllers via ``requires_permission``. This also enforces authentication
       by using :func`requires_login`, making ``current_member`` also available.
 
@@ -35,14 +42,18 @@ class AuthController:
     :type participation_repo: ``app.repositories.project_participation_repository.ProjectParticipationRepository``
     :param system_scopes: Class with system scopes.
     :type participation_repo: ``app.auth.scopes.system_scopes.SystemScopes``
+    :param api_key_repo: Repository interface to retrieve API keys, API key authentication is disabled if not provided.
+    :type api_key_repo: ``app.repositories.api_key_repository.ApiKeyRepository``
     """
 
-    def __init__(self, *, enabled: bool, member_repo: MemberRepository, project_repo: ProjectRepository, participation_repo: ProjectParticipationRepository,system_scopes: SystemScopes):
+    def __init__(self, *, enabled: bool, member_repo: MemberRepository, project_repo: ProjectRepository, participation_repo: ProjectParticipationRepository,system_scopes: SystemScopes,
+                 api_key_repo: ApiKeyRepository = None):
         self.enabled = enabled
         self.member_repo = member_repo
         self.project_repo = project_repo
         self.participation_repo = participation_repo
         self.system_scopes = system_scopes
+        self.api_key_repo = api_key_repo
 
     def login_member(self, fn):
         """
@@ -106,18 +117,49 @@ class AuthController:
 
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            if not self.enabled:
-                return fn(*args, **kwargs)
-            if "id" not in session:
-                return abort(HTTPStatus.UNAUTHORIZED, description="You are not logged in")
-            member = self.member_repo.get_member_by_id(session["id"])
-            if member is None:  # member deleted while session was still valid
-                return abort(HTTPStatus.UNAUTHORIZED, description="You are not logged in")
-            g.current_member = member
-            return fn(*args, **kwargs)
+            start_phase("auth")
+            if self.enabled:
+                self._authenticate()
+            return self._authorized(fn, *args, **kwargs)
 
         return wrapper
 
+    def _authenticate(self):
+        """ Sets the member and API key of the request, aborting requests of no member. """
+        if (authorization := request.headers.get("Authorization")) is not None:
+            return self._authenticate_api_key(authorization)
+        if "id" not in session:
+            return abort(HTTPStatus.UNAUTHORIZED, description="You are not logged in")
+        member = self.member_repo.get_member_by_id(session["id"])
+        if member is None:  # member deleted while session was still valid
+            return abort(HTTPStatus.UNAUTHORIZED, description="You are not logged in")
+        self._set_member(member, None)
+
+    def _authenticate_api_key(self, authorization: str):
+        """ Authenticates the request with the API key in the ``Authorization`` header, in a single indexed lookup. """
+        scheme, _, key = authorization.partition(" ")
+        if self.api_key_repo is None or scheme.lower() != "bearer" or not key:
+            return abort(HTTPStatus.UNAUTHORIZED, description="Invalid authorization header")
+        if (api_key := self.api_key_repo.get_api_key_by_hash(hash_api_key(key.strip()))) is None:
+            return abort(HTTPStatus.UNAUTHORIZED, description="Invalid API key")
+        self._set_member(api_key.member, api_key)
+
+    @staticmethod
+    def _set_member(member, api_key):
+        g.current_member = member
+        g.current_api_key = api_key
+        # captured as the member is expired once the request commits
+        g.current_roles = member.roles
+        g.current_member_id = member.id
+
+    @staticmethod
+    def _authorized(fn, *args, **kwargs):
+        """ Run the controller once the request is authorized, the time until then is reported as ``auth``. """
+        stop_phase("auth")
+        if g.get("current_member") is not None:
+            profile_authorized_request()
+        return fn(*args, **kwargs)
+
     def logout_member(self, fn):
         """
         Decorate controllers meant to end a user session.
@@ -158,6 +200,9 @@ class AuthController:
         Each keyword argument represents a scope, and its value is the required permission
         for that scope. If any one scope grants the required permission, access is allowed.
 
+        Requests authenticated with an API key are only evaluated in the ``general`` scope, and only
+        for the permissions the key was issued with.
+
         :param scoped_permissions: Mapping of scope names to required permission strings.
         :type scoped_permissions: dict[str, str]
 
@@ -181,17 +226,21 @@ class AuthController:
                 assert_valid_endpoint(fn) # raises error if invalid endpoint signature
 
             @wraps(fn)
-            @self.requires_login
             def wrapper(*args, **kwargs):
+                start_phase("auth")
                 # skip authorization if access control is disabled
                 if not self.enabled:
-                    return fn(*args, **kwargs)
+                    return self._authorized(fn, *args, **kwargs)
+                self._authenticate()
 
                 # check if user has at least permissions in one scope
+                api_key = g.get("current_api_key")
                 for scope in scoped_permissions:
+                    if api_key is not None and (scope != "general" or not api_key.grants(scoped_permissions[scope])):
+                        continue
                     has_perm_eval = indexed_permission_evaluators[scope]
                     if has_perm_eval(Ctx(authCtx=self, permission=scoped_permissions[scope], args=args, kwargs=kwargs)):
-                        return fn(*args, **kwargs)
+                        return self._authorized(fn, *args, **kwargs)
                 return abort(HTTPStatus.FORBIDDEN, description="You don't have permissions to perform this action")
 
             return wrapper
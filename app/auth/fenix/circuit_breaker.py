@@ -0,0 +1,77 @@
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """ Raised instead of calling a dependency while the circuit is open. """
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a dependency is down instead of letting every request wait for it to time out.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls raise :class:`CircuitOpenError`
+    right away. Once ``reset_timeout`` seconds have passed a single trial call is let through, closing the
+    circuit if it succeeds or opening it again if it fails.
+
+    :param failure_threshold: Consecutive failures that open the circuit.
+    :type failure_threshold: int
+    :param reset_timeout: Seconds the circuit stays open before a trial call.
+    :type reset_timeout: float
+    :param clock: Monotonic time source, in seconds.
+    :type clock: function
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call ``fn`` through the circuit, any exception it raises counts as a failure.
+
+        :raises CircuitOpenError: If the circuit is open.
+        """
+        with self._lock:
+            state = self.state
+            if state == self.OPEN or (state == self.HALF_OPEN and self._trial_in_progress):
+                raise CircuitOpenError("Circuit is open, dependency is failing")
+            if state == self.HALF_OPEN:
+                self._trial_in_progress = True
+
+        try:
+            r = fn(*args, **kwargs)
+        except Exception:
+            self._record_failure()
+            raise
+        self._record_success()
+        return r
+
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_progress or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial_in_progress = False
@@ -1,4 +1,5 @@
 import logging
+import time
 
 from typing import Dict
 
@@ -6,17 +7,64 @@ from urllib.parse import urlencode
 
 import requests
 
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
 from requests.exceptions import JSONDecodeError
+from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
+
+from app.auth.fenix.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.instrumentation.metrics import FENIX_REQUEST_DURATION
 
 logger = logging.getLogger(__name__)
 
+
+class FenixUnavailableError(ValueError):
+    """ Raised when Fénix can't be reached, times out, fails with a server error or the circuit is open. """
+
+
 class FenixService:
-    def __init__(self, *, client_id: str, client_secret: str, root_uri: str, redirect_endpoint: str):
+    """
+    Client of the Fénix OAuth API.
+
+    Requests go through a pooled keep-alive session with connect and read timeouts. Idempotent requests are retried
+    with exponential backoff on connection errors and ``502/503/504`` responses, and a circuit breaker fails every
+    call fast while Fénix keeps failing. Latency of each call is recorded in ``hs_api_fenix_request_duration_seconds``.
+
+    :param base_url: Fénix root URL, pointed at a stand-in server for load tests.
+    :type base_url: str
+    :param pool_size: Maximum number of kept-alive connections to Fénix.
+    :type pool_size: int
+    :param connect_timeout: Seconds to wait for a connection.
+    :type connect_timeout: float
+    :param read_timeout: Seconds to wait for each read of the response.
+    :type read_timeout: float
+    :param max_retries: Retries of idempotent requests.
+    :type max_retries: int
+    :param backoff_factor: Backoff between retries, ``backoff_factor * 2 ** (retry - 1)`` seconds.
+    :type backoff_factor: float
+    :param circuit_breaker: Circuit breaker guarding the calls, one failing after 5 consecutive failures for 30 seconds by default.
+    :type circuit_breaker: ``app.auth.fenix.circuit_breaker.CircuitBreaker``
+    """
+
+    def __init__(self, *, client_id: str, client_secret: str, root_uri: str, redirect_endpoint: str,
+                 base_url: str = "https://fenix.tecnico.ulisboa.pt", pool_size: int = 10, connect_timeout: float = 3.05,
+                 read_timeout: float = 10.0, max_retries: int = 2, backoff_factor: float = 0.3,
+                 circuit_breaker: CircuitBreaker = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.root_uri = root_uri
         self.redirect_endpoint = redirect_endpoint
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+
+        # only GETs are retried once sent, exchanging an authorization code twice fails
+        retry = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET"}), raise_on_status=False)
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry))
 
     def redirect_url(self, state: str):
         params = {
@@ -24,7 +72,7 @@ class FenixService:
             "redirect_uri": self.root_uri + self.redirect_endpoint,
             "state": state,
         }
-        return "https://fenix.tecnico.ulisboa.pt/oauth/userdialog?" + urlencode(params)
+        return self.base_url + "/oauth/userdialog?" + urlencode(params)
 
     def fetch_access_token(self, *, redirect_endpoint: str, code: str) -> str:
         params = {
@@ -34,29 +82,51 @@ class FenixService:
             "grant_type": "authorization_code",
             "code": code,
         }
-        rsp = requests.post("https://fenix.tecnico.ulisboa.pt/oauth/access_token?" + urlencode(params))
+        rsp = self._request("access_token", "POST", self.base_url + "/oauth/access_token?" + urlencode(params))
         try:
             rsp.raise_for_status()
             access_token = rsp.json()["access_token"]
         except HTTPError as e:
-            logging.error(f"Content: {rsp.content}")
+            logger.error(f"Content: {rsp.content}")
             raise ValueError(f"Failed fetching access token from Fénix: {e}")
         except (JSONDecodeError, KeyError) as e:
-            logging.error(str(e))
+            logger.error(str(e))
             raise ValueError(f"Failed fetching access token from Fénix: {e}")
 
         return access_token
 
     def fetch_user_info(self, access_token: str) -> Dict[str, str]:
-        rsp = requests.get("https://fenix.tecnico.ulisboa.pt/api/fenix/v1/person?" + urlencode({"access_token": access_token}))
+        rsp = self._request("user_info", "GET", self.base_url + "/api/fenix/v1/person?" + urlencode({"access_token": access_token}))
         try:
             rsp.raise_for_status()
             rsp_json = rsp.json()
         except HTTPError as e:
-            logging.error(f"Content: {rsp.content}")
+            logger.error(f"Content: {rsp.content}")
             raise ValueError(f"Failed fetching user information from Fénix: {e}")
         except Exception as e:
-            logging.error(str(e))
+            logger.error(str(e))
             raise ValueError(f"Failed fetching user information from Fénix: {e}")
 
         return rsp_json
+
+    def _request(self, operation: str, method: str, url: str) -> requests.Response:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            rsp = self.circuit_breaker.call(self._send, method, url)
+            outcome = "success" if rsp.ok else "rejected"
+            return rsp
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise FenixUnavailableError("Fénix is unavailable, circuit is open")
+        except RequestException as e:
+            logger.error(f"Fénix {operation} request failed: {e}")
+            raise FenixUnavailableError(f"Fénix is unavailable: {e}")
+        finally:
+            FENIX_REQUEST_DURATION.labels(operation=operation, outcome=outcome).observe(time.perf_counter() - start)
+
+    def _send(self, method: str, url: str) -> requests.Response:
+        rsp = self.session.request(method, url, timeout=self.timeout)
+        if rsp.status_code >= 500:  # counts as a circuit failure, client errors don't
+            rsp.raise_for_status()
+        return rsp
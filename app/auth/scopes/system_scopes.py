@@ -1,6 +1,8 @@
 import logging
+import os
 
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Set
 
 import yaml
 from pydantic import BaseModel, Field, field_validator
@@ -97,6 +99,21 @@ class SystemScopes(BaseModel):
         highest_target_role = max(target_roles, key=lambda x: x.privilege)
         return highest_subject_role.privilege > highest_target_role.privilege
 
+    def get_permissions(self, scope_name: str, roles: List[str]) -> Set[str]:
+        """
+        Retrieve every permission granted by the given roles within a scope.
+
+        :param scope_name: The name of the scope to look for.
+        :type scope_name: str
+        :param roles: Names of the roles held by the subject.
+        :type roles: List[str]
+        :return: The union of the roles permissions, empty if the scope is not found.
+        :rtype: Set[str]
+        """
+        if (scope := self.get_scope(scope_name)) is None:
+            return set()
+        return {p for role in roles if (r := scope.get_role(role)) is not None for p in r.permissions}
+
     @classmethod
     def from_yaml_config(cls, path: str):
         """
@@ -104,8 +121,15 @@ class SystemScopes(BaseModel):
 
         :param path: Path to YAML configuration file.
         :type path: str
-        :return: An instance of the class initialized with the parsed configuration.
+        :return: An instance of the class initialized with the parsed configuration, shared until the file changes so
+            it must not be modified.
         :rtype: :class:`PermissionHandler`
         """
-        with open(path, "r") as f:
-            return cls(**yaml.safe_load(f))
+        return _load_yaml_config(cls, path, os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _load_yaml_config(cls, path: str, mtime_ns: int):
+    # every app created parses it, the pure Python loader is slower than creating the rest of the app
+    with open(path, "r") as f:
+        return cls(**yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)))
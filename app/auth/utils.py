@@ -3,6 +3,8 @@ from flask import g, has_app_context
 from werkzeug.local import LocalProxy
 
 current_member = LocalProxy(lambda: _get_current_member())
+current_api_key = LocalProxy(lambda: _get_current_api_key())
+current_roles = LocalProxy(lambda: _get_current_roles())
 
 def _get_current_member():
     """
@@ -13,3 +15,19 @@ def _get_current_member():
         return g.get("current_member", None)
     return None
 
+def _get_current_roles():
+    """
+    Retrieves the roles of the member the request was authorized for, captured on authorization as the member is
+    expired once the request commits.
+    """
+    if has_app_context():
+        return g.get("current_roles", [])
+    return []
+
+def _get_current_api_key():
+    """
+    Retrieves the API key used to authenticate the current request, ``None`` if authenticated by session.
+    """
+    if has_app_context():
+        return g.get("current_api_key", None)
+    return None
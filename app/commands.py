@@ -1,3 +1,7 @@
+import re
+import time
+from datetime import datetime, timedelta
+
 import click
 
 from sqlalchemy import select
@@ -5,8 +9,33 @@ from sqlalchemy import select
 from flask.cli import with_appcontext
 from flask import Flask
 
+from app.image_resizer import ImageResizer, ImageResizeError
+from app.image_store import image_store_from_config
+from app.models.image_model import Image, MIMETYPES
 from app.models.member_model import Member
+from app.models.project_model import Project
+from app.auth.scopes.system_scopes import SystemScopes
 from app.extensions import db
+from app.extensions import password_hasher
+from app.extensions import profiler
+from app.instrumentation.access_log import latency_report, read_access_logs
+from app.seeding import seed_database
+
+RELATIVE_TIME = re.compile(r"^(\d+)([smhd])$")
+TIME_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def _parse_time(ctx, param, value):
+    """ ``30m``, ``2h`` or ``7d`` ago, or an ISO date in local time unless it has an offset. """
+    if value is None:
+        return None
+    if match := RELATIVE_TIME.match(value):
+        return datetime.now().astimezone() - timedelta(**{TIME_UNITS[match[2]]: int(match[1])})
+    try:
+        return datetime.fromisoformat(value).astimezone()
+    except ValueError:
+        raise click.BadParameter(f"'{value}' is neither a duration like 2h nor an ISO date")
+
 
 def register_cli_commands(app: Flask):
     @click.command("create-admin")
@@ -30,6 +59,142 @@ def register_cli_commands(app: Flask):
 
     app.cli.add_command(create_admin_member)
 
+    @click.command("seed")
+    @click.option("--members", default=100, show_default=True)
+    @click.option("--projects", default=10, show_default=True)
+    @click.option("--participations-per-member", default=2, show_default=True)
+    @click.option("--tasks-per-participation", default=5, show_default=True)
+    @click.option("--seed", default=0, show_default=True, help="Random seed, the same seed generates the same data.")
+    @click.option("--password", default="password", show_default=True, help="Password of every generated member.")
+    @with_appcontext
+    def seed(members, projects, participations_per_member, tasks_per_participation, seed, password):
+        """ Generate members, projects, participations and tasks for load testing. """
+        counts = seed_database(db, system_scopes=SystemScopes.from_yaml_config(app.config["ROLES_PATH"]),
+                               password_hash=password_hasher.hash(password), members=members, projects=projects,
+                               participations_per_member=participations_per_member,
+                               tasks_per_participation=tasks_per_participation, seed=seed)
+        click.echo(f"Seeded {counts.members} members, {counts.projects} projects, {counts.participations} "
+                   f"participations and {counts.tasks} tasks.")
+
+    app.cli.add_command(seed)
+
+    @click.command("index-images")
+    @with_appcontext
+    def index_images():
+        """ Index images uploaded before the images table existed, named by ist id or project slug/name. """
+        image_store = image_store_from_config(app.config)
+
+        def find_legacy_file(directory, stems):
+            for stem in filter(None, stems):
+                for ext in MIMETYPES:
+                    if image_store.exists(f"{directory}/{stem}.{ext}"):
+                        return f"{directory}/{stem}.{ext}", MIMETYPES[ext]
+            return None, None
+
+        indexed = 0
+        owners = [("members", m, [m.ist_id], "member_id") for m in db.session.execute(select(Member)).scalars()]
+        owners += [("projects", p, [p.slug, p.name], "project_id") for p in db.session.execute(select(Project)).scalars()]
+        for directory, owner, stems, owner_field in owners:
+            if db.session.execute(select(Image).where(getattr(Image, owner_field) == owner.id)).scalars().one_or_none():
+                continue
+            path, mimetype = find_legacy_file(directory, stems)
+            if path is None:
+                continue
+            stored = image_store.stat(path)
+            db.session.add(Image(path=path, mimetype=mimetype, size=stored.size, content_hash=stored.content_hash,
+                                 mtime=stored.mtime, **{owner_field: owner.id}))
+            indexed += 1
+        db.session.commit()
+        click.echo(f"Indexed {indexed} images.")
+
+    app.cli.add_command(index_images)
+
+    @click.command("gc-images")
+    @click.option("--grace-period", default=3600, show_default=True,
+                  help="Seconds an unreferenced file is kept, uploads in flight aren't indexed yet.")
+    @click.option("--dry-run", is_flag=True, help="List the files that would be deleted.")
+    @with_appcontext
+    def gc_images(grace_period, dry_run):
+        """ Delete stored images and variants no member or project references anymore. """
+        image_store = image_store_from_config(app.config)
+        referenced = db.session.execute(select(Image.content_hash).distinct()).scalars()
+        deleted = image_store.collect_garbage(referenced, grace_period=grace_period, dry_run=dry_run)
+        for path in deleted:
+            click.echo(path)
+        click.echo(f"{'Would delete' if dry_run else 'Deleted'} {len(deleted)} files.")
+
+    app.cli.add_command(gc_images)
+
+    @click.command("render-placeholders")
+    @with_appcontext
+    def render_placeholders():
+        """ Render the manifest placeholders of images uploaded before they were rendered on upload. """
+        image_resizer = ImageResizer(image_store=image_store_from_config(app.config),
+                                     max_pixels=app.config["IMAGES_MAX_PIXELS"])
+        rendered = 0
+        for image in db.session.execute(select(Image).where(Image.placeholder.is_(None))).scalars():
+            try:
+                image.placeholder = image_resizer.render_placeholder(image.path)
+            except (FileNotFoundError, ImageResizeError) as e:
+                click.echo(f"Skipped '{image.path}': {e}")
+                continue
+            rendered += 1
+        db.session.commit()
+        click.echo(f"Rendered {rendered} placeholders.")
+
+    app.cli.add_command(render_placeholders)
+
+    @click.group("profiles")
+    def profiles():
+        """ Request profiles captured with the X-Profile header. """
 
+    @profiles.command("list")
+    def list_profiles():
+        """ List the captured profiles, newest first. """
+        captured = profiler.list_profiles()
+        if not captured:
+            click.echo(f"No profiles in '{profiler.path}'.")
+        for info in captured:
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(info.created))
+            click.echo(f"{info.name}  {info.endpoint}  {created}  {info.total_time * 1000:.1f}ms  {info.calls} calls")
 
+    @profiles.command("show")
+    @click.argument("name")
+    @click.option("--sort", default="cumulative", show_default=True,
+                  help="pstats sort key, e.g. cumulative, tottime or ncalls.")
+    @click.option("--limit", default=25, show_default=True, help="Functions to show.")
+    def show_profile(name, sort, limit):
+        """ Show the top functions of the profile NAME. """
+        try:
+            click.echo(profiler.summarize(name, sort=sort, limit=limit))
+        except (FileNotFoundError, KeyError) as e:
+            raise click.ClickException(str(e))
+
+    app.cli.add_command(profiles)
+
+    @click.command("latency-report")
+    @click.argument("log_files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+    @click.option("--since", callback=_parse_time, help="Start of the window, e.g. 2h ago or 2025-03-01T12:00.")
+    @click.option("--until", callback=_parse_time, help="End of the window, same format as --since.")
+    @click.option("--endpoint", help="Only requests to this endpoint, e.g. member.get_members.")
+    @click.option("--slowest", default=10, show_default=True, help="Slowest requests to list.")
+    def latency_report_command(log_files, since, until, endpoint, slowest):
+        """ Per endpoint latency percentiles and error rates of the gunicorn access LOG_FILES. """
+        report = latency_report(read_access_logs(log_files), since=since, until=until, endpoint=endpoint,
+                                slowest=slowest)
+        if report.without_duration:
+            click.echo(f"{report.without_duration} requests logged without a duration were ignored.")
+        if not report.endpoints:
+            click.echo("No requests in the window.")
+            return
+        click.echo(f"{'endpoint':<48} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+                   f"{'4xx':>6} {'5xx %':>6}")
+        for e in report.endpoints:
+            click.echo(f"{e.endpoint:<48} {e.requests:>8} {e.p50 * 1000:>8.1f} {e.p95 * 1000:>8.1f} "
+                       f"{e.p99 * 1000:>8.1f} {e.max * 1000:>8.1f} {e.client_errors:>6} {e.error_rate * 100:>6.2f}")
+        click.echo("\nSlowest requests:")
+        for entry in report.slowest:
+            click.echo(f"{entry.time.isoformat()}  {entry.duration * 1000:>8.1f}ms  {entry.status}  "
+                       f"{entry.method} {entry.target}  {entry.request_id}")
 
+    app.cli.add_command(latency_report_command)
@@ -1,11 +1,10 @@
 import os
 import secrets
 from datetime import timedelta
+from functools import lru_cache
 from typing import List
 
-from cachelib import FileSystemCache
 from dotenv import load_dotenv
-from redis import Redis
 
 basedir = os.path.abspath(
     os.path.abspath(os.path.dirname(__file__)) + "/.."
@@ -27,31 +26,107 @@ def _get_int_env_or_default(env: str, default: str) -> int:
         return default
 
 
+def _get_float_env_or_default(env: str, default: float) -> float:
+    try:
+        return _get_env_or_default(env, default, float)
+    except ValueError:
+        return default
+
+
 def _get_bool_env_or_false(env: str) -> bool:
     return os.environ.get(env, False) in ['True', 'true', 1]
 
 
 class Config:
-    SECRET_KEY = secrets.token_hex()
+    # generated once per process if empty, set it when the sessions must outlive a restart or be shared by workers
+    SECRET_KEY: str = _get_env_or_default("SECRET_KEY", "")
 
     MAX_CONTENT_LENGTH: int = 16 * 1000 * 1000 # max for file uplaods
 
-    # see https://flask-session.readthedocs.io/en/latest/config.html#
-    SESSION_TYPE: str = _get_env_or_default("SESSION_TYPE", "cachelib")
-    if SESSION_TYPE == "cachelib":
-        SESSION_CACHELIB = FileSystemCache(
-            cache_dir=os.path.join(basedir, _get_env_or_default("SESSION_DIR", "resources/flask_sessions")),
-            threshold=500,
-        )
-    elif SESSION_TYPE == "redis":
-        SESSION_REDIS = Redis.from_url(url=_get_env_or_default("SESSION_REDIS", ""))
+    # bcrypt cost factor, passwords hashed with a different cost are rehashed on login
+    BCRYPT_ROUNDS:      int = _get_int_env_or_default("BCRYPT_ROUNDS", 12)
+    BCRYPT_MAX_WORKERS: int = _get_int_env_or_default("BCRYPT_MAX_WORKERS", 2)
+    BCRYPT_MAX_QUEUE:   int = _get_int_env_or_default("BCRYPT_MAX_QUEUE", 32)  # 503 once exceeded
+
+    # see https://flask-session.readthedocs.io/en/latest/config.html#, sessions are kept in SESSION_DIR with "cachelib"
+    # or at SESSION_REDIS_URL with "redis", the clients are created by create_app, see resolve_clients
+    SESSION_TYPE:      str = _get_env_or_default("SESSION_TYPE", "cachelib")
+    SESSION_DIR:       str = os.path.join(basedir, _get_env_or_default("SESSION_DIR", "resources/flask_sessions"))
+    SESSION_REDIS_URL: str = _get_env_or_default("SESSION_REDIS", "")
+
+    # token buckets shared by every worker, in the session Redis if not set, kept in process memory without Redis
+    RATE_LIMIT_REDIS_URL: str = _get_env_or_default("RATE_LIMIT_REDIS", "")
+
+    # rates formatted as <count>/<second|minute|hour|day>, empty to disable
+    LOGIN_RATE_LIMIT_IP:       str = _get_env_or_default("LOGIN_RATE_LIMIT_IP", "30/minute")
+    LOGIN_RATE_LIMIT_USERNAME: str = _get_env_or_default("LOGIN_RATE_LIMIT_USERNAME", "10/minute")
+
+    # number of reverse proxies setting X-Forwarded-For in front of the API, used to get the client address
+    PROXY_FIX_X_FOR: int = _get_int_env_or_default("PROXY_FIX_X_FOR", 0)
 
     PERMANENT_SESSION_LIFETIME = _get_int_env_or_default("PERMANENT_SESSION_LIFETIME", timedelta(days=14))
 
     SQLALCHEMY_DATABASE_URI: str = ("sqlite:///" + os.path.join(basedir, _get_env_or_default("SQLALCHEMY_DATABASE_URI", "resources/hackerschool.sqlite3")))
 
+    # requests executing more SQL statements are logged as warnings, 0 disables it. SQL_STATS_HEADERS returns the
+    # statement count and database time of every request as X-SQL-Statements and X-SQL-Duration headers, as in debug
+    SQL_STATEMENT_BUDGET: int  = _get_int_env_or_default("SQL_STATEMENT_BUDGET", 20)
+    SQL_STATS_HEADERS:    bool = _get_bool_env_or_false("SQL_STATS_HEADERS")
+    # statements running for longer, in milliseconds, are logged with their query plan to SLOW_QUERY_LOG, rotated
+    # beside the gunicorn access log. 0 disables it
+    SLOW_QUERY_THRESHOLD_MS: float = _get_float_env_or_default("SLOW_QUERY_THRESHOLD_MS", 100.0)
+    SLOW_QUERY_LOG:          str   = os.path.join(basedir, _get_env_or_default("SLOW_QUERY_LOG",
+                                                                               "resources/slow_queries.log"))
+    # application logs, written by a background thread as JSON lines, or "text", to LOG_FILE, or stdout if empty. Once
+    # LOG_QUEUE_SIZE records wait for it new ones are dropped. At DEBUG only LOG_DEBUG_SAMPLE_RATE of the requests log
+    # their debug records
+    LOG_LEVEL:             str   = _get_env_or_default("LOG_LEVEL", "INFO")
+    LOG_FORMAT:            str   = _get_env_or_default("LOG_FORMAT", "json")
+    LOG_FILE:              str   = os.path.join(basedir, _get_env_or_default("LOG_FILE", "")) \
+        if _get_env_or_default("LOG_FILE", "") else ""
+    LOG_QUEUE_SIZE:        int   = _get_int_env_or_default("LOG_QUEUE_SIZE", 10000)
+    LOG_DEBUG_SAMPLE_RATE: float = _get_float_env_or_default("LOG_DEBUG_SAMPLE_RATE", 0.01)
+    # Server-Timing header of the session, auth, validation, db, schema and json phases of each request, sent on every
+    # response with SERVER_TIMING or only to the members with one of SERVER_TIMING_ROLES
+    SERVER_TIMING:       bool      = _get_bool_env_or_false("SERVER_TIMING")
+    SERVER_TIMING_ROLES: List[str] = _get_env_or_default("SERVER_TIMING_ROLES", "sysadmin").split()
+    # cProfile captures of single requests sent with an "X-Profile: 1" header or ?_profile=1 by members with one of
+    # PROFILING_ROLES, none disables it, saved to PROFILES_PATH keeping the last PROFILES_MAX
+    PROFILING_ROLES: List[str] = _get_env_or_default("PROFILING_ROLES", "sysadmin").split()
+    PROFILES_PATH:   str       = os.path.join(basedir, _get_env_or_default("PROFILES_PATH", "resources/profiles"))
+    PROFILES_MAX:    int       = _get_int_env_or_default("PROFILES_MAX", 100)
+
     ROLES_PATH:  str = os.path.join(basedir, _get_env_or_default("ROLES_PATH", "resources/roles.yaml"))
+    # where images are stored, "local" under IMAGES_PATH or "s3" in IMAGES_S3_BUCKET, with the AWS_ACCESS_KEY_ID and
+    # AWS_SECRET_ACCESS_KEY credentials. IMAGES_S3_ENDPOINT_URL points to S3 compatible stores, e.g. MinIO
+    IMAGES_STORAGE: str = _get_env_or_default("IMAGES_STORAGE", "local")
     IMAGES_PATH: str = os.path.join(basedir, _get_env_or_default("IMAGES_PATH", "resources/images/"))
+    IMAGES_S3_BUCKET:       str = _get_env_or_default("IMAGES_S3_BUCKET", "")
+    IMAGES_S3_PREFIX:       str = _get_env_or_default("IMAGES_S3_PREFIX", "")
+    IMAGES_S3_ENDPOINT_URL: str = _get_env_or_default("IMAGES_S3_ENDPOINT_URL", "")
+    IMAGES_S3_REGION:       str = _get_env_or_default("IMAGES_S3_REGION", "")
+    # seconds browsers keep images requested with their content hash, ?v=<image_hash>, without revalidating
+    IMAGES_CACHE_MAX_AGE: int = _get_int_env_or_default("IMAGES_CACHE_MAX_AGE", 31536000)
+    # largest image upload request accepted, in bytes, below MAX_CONTENT_LENGTH
+    IMAGES_MAX_UPLOAD_SIZE: int = _get_int_env_or_default("IMAGES_MAX_UPLOAD_SIZE", 5 * 1024 * 1024)
+    # largest image decoded to render variants and placeholders, in pixels, larger ones are served as uploaded
+    IMAGES_MAX_PIXELS: int = _get_int_env_or_default("IMAGES_MAX_PIXELS", 25_000_000)
+    # key of the HMAC signed image URLs in the members and projects JSON, served without session or query, shared by
+    # every API node. Empty disables them. URLs are valid for IMAGES_URL_TTL to twice IMAGES_URL_TTL seconds
+    IMAGES_URL_KEY: str = _get_env_or_default("IMAGES_URL_KEY", "")
+    IMAGES_URL_TTL: int = _get_int_env_or_default("IMAGES_URL_TTL", 600)
+    # sizes in pixels images can be requested at, ?size=<px>, rendered on first request
+    IMAGES_VARIANT_SIZES: List[int] = [int(size) for size in
+                                       _get_env_or_default("IMAGES_VARIANT_SIZES", "48 128 512").split()]
+    # let the reverse proxy stream images, "x-accel" for nginx or "x-sendfile" for Apache/lighttpd, empty to stream them
+    # from the worker. nginx serves X-Accel-Redirect paths from the internal location IMAGES_OFFLOAD_PREFIX
+    IMAGES_OFFLOAD:        str = _get_env_or_default("IMAGES_OFFLOAD", "")
+    IMAGES_OFFLOAD_PREFIX: str = _get_env_or_default("IMAGES_OFFLOAD_PREFIX", "/_protected/images/")
+    # modern formats images are encoded in on the background, by preference, served to browsers accepting them.
+    # Formats Pillow wasn't built with are skipped. At most IMAGES_TRANSCODE_QUEUE encodings wait for a worker thread
+    IMAGES_TRANSCODE_FORMATS: List[str] = _get_env_or_default("IMAGES_TRANSCODE_FORMATS", "avif webp").split()
+    IMAGES_TRANSCODE_WORKERS: int = _get_int_env_or_default("IMAGES_TRANSCODE_WORKERS", 1)
+    IMAGES_TRANSCODE_QUEUE:   int = _get_int_env_or_default("IMAGES_TRANSCODE_QUEUE", 64)
 
     ROOT_URI = _get_env_or_default("ROOT_URI", "http://localhost:5000")
 
@@ -62,8 +137,58 @@ class Config:
     CLIENT_SECRET: str =           _get_env_or_default("CLIENT_SECRET", "")
     FENIX_REDIRECT_ENDPOINT: str = _get_env_or_default("FENIX_REDIRECT_ENDPOINT", "/fenix-login-callback")
 
+    FENIX_BASE_URL:        str   = _get_env_or_default("FENIX_BASE_URL", "https://fenix.tecnico.ulisboa.pt")
+    FENIX_POOL_SIZE:       int   = _get_int_env_or_default("FENIX_POOL_SIZE", 10)
+    FENIX_CONNECT_TIMEOUT: float = _get_float_env_or_default("FENIX_CONNECT_TIMEOUT", 3.05)
+    FENIX_READ_TIMEOUT:    float = _get_float_env_or_default("FENIX_READ_TIMEOUT", 10.0)
+    FENIX_MAX_RETRIES:     int   = _get_int_env_or_default("FENIX_MAX_RETRIES", 2)
+    # consecutive failures before failing fast, and for how many seconds
+    FENIX_CIRCUIT_FAILURE_THRESHOLD: int   = _get_int_env_or_default("FENIX_CIRCUIT_FAILURE_THRESHOLD", 5)
+    FENIX_CIRCUIT_RESET_TIMEOUT:     float = _get_float_env_or_default("FENIX_CIRCUIT_RESET_TIMEOUT", 30.0)
+
     SESSION_COOKIE_SAMESITE = _get_env_or_default("SESSION_COOKIE_SAMESITE", "Lax")
     SESSION_COOKIE_HTTPONLY = True
-    SESSION_COOKIE_SECURE   = True
+    SESSION_COOKIE_SECURE   = _get_env_or_default("SESSION_COOKIE_SECURE", "True") in ["True", "true"]  # plain http load tests
 
     SENTRY_DSN: str = _get_env_or_default("SENTRY_DSN", "")
+
+
+@lru_cache
+def _process_secret_key() -> str:
+    return secrets.token_hex()
+
+
+@lru_cache
+def _session_cache(path: str):
+    from cachelib import FileSystemCache
+    return FileSystemCache(cache_dir=path, threshold=500)
+
+
+@lru_cache
+def _redis_client(url: str):
+    from redis import Redis  # optional, only needed with Redis sessions or rate limits
+    return Redis.from_url(url=url)
+
+
+def resolve_clients(config: dict):
+    """
+    Set the secret key, session store and rate limit Redis client of the app ``config`` from the settings naming them,
+    unless already set. Created on first use and shared by the apps of the process, importing the config has no side
+    effects.
+
+    :param config: Config of the app being created.
+    :type config: flask.Config
+    """
+    if not config.get("SECRET_KEY"):
+        config["SECRET_KEY"] = _process_secret_key()
+    if config["SESSION_TYPE"] == "cachelib" and config.get("SESSION_CACHELIB") is None:
+        config["SESSION_CACHELIB"] = _session_cache(config["SESSION_DIR"])
+    elif config["SESSION_TYPE"] == "redis" and config.get("SESSION_REDIS") is None:
+        config["SESSION_REDIS"] = _redis_client(config["SESSION_REDIS_URL"])
+    if config.get("RATE_LIMIT_REDIS") is None:
+        if config["RATE_LIMIT_REDIS_URL"]:
+            config["RATE_LIMIT_REDIS"] = _redis_client(config["RATE_LIMIT_REDIS_URL"])
+        elif config["SESSION_TYPE"] == "redis":
+            config["RATE_LIMIT_REDIS"] = config["SESSION_REDIS"]
+        else:
+            config["RATE_LIMIT_REDIS"] = None
@@ -0,0 +1,78 @@
+from http import HTTPStatus
+
+from flask import Blueprint
+from flask import abort
+from flask import request
+
+from app.auth import AuthController, current_member
+from app.auth.utils import current_api_key
+
+from app.decorators import transactional
+
+from app.instrumentation.server_timing import phase
+
+from app.models.api_key_model import ApiKey, generate_api_key
+from app.models.member_model import Member
+
+from app.repositories.api_key_repository import ApiKeyRepository
+from app.repositories.member_repository import MemberRepository
+
+from app.schemas.api_key_schema import ApiKeySchema
+
+
+def create_api_key_bp(*, api_key_repo: ApiKeyRepository, member_repo: MemberRepository, auth_controller: AuthController):
+    bp = Blueprint("api_keys", __name__)
+
+    def _resolve_member(username: str) -> Member:
+        if current_api_key:
+            abort(HTTPStatus.FORBIDDEN, description="API keys can't be used to manage API keys")
+
+        if (member := member_repo.get_member_by_username(username)) is None:
+            abort(HTTPStatus.NOT_FOUND, description=f"Member with username '{username}' not found")
+
+        # determine whether member can manage this member keys
+        if auth_controller.enabled and current_member.username != username:
+            if not auth_controller.system_scopes.has_priority(scope_name="general",
+                                                              subject_roles=current_member.roles,
+                                                              target_roles=member.roles):
+                abort(HTTPStatus.FORBIDDEN, description="No permission to manage this member API keys")
+        return member
+
+    @bp.route("/members/<username>/api-keys", methods=["POST"])
+    @auth_controller.requires_permission(general="member:update")
+    @transactional
+    def create_api_key(username):
+        member = _resolve_member(username)
+
+        with phase("validation"):
+            api_key_data = ApiKeySchema(**request.json)
+        granted = auth_controller.system_scopes.get_permissions("general", member.roles)
+        if not set(api_key_data.permissions) <= granted:
+            return abort(HTTPStatus.FORBIDDEN,
+                         description=f"Member '{username}' doesn't have these permissions: {sorted(set(api_key_data.permissions) - granted)}")
+
+        key = generate_api_key()
+        api_key = api_key_repo.create_api_key(
+            ApiKey(member=member, key=key, name=api_key_data.name, permissions=api_key_data.permissions)
+        )
+        # the key is only shown once, only its digest is stored
+        return {**ApiKeySchema.from_api_key(api_key).model_dump(), "key": key}
+
+    @bp.route("/members/<username>/api-keys", methods=["GET"])
+    @auth_controller.requires_permission(general="member:update")
+    def get_api_keys(username):
+        member = _resolve_member(username)
+        return [ApiKeySchema.from_api_key(k).model_dump() for k in api_key_repo.get_api_keys_by_member_id(member.id)]
+
+    @bp.route("/members/<username>/api-keys/<int:key_id>", methods=["DELETE"])
+    @auth_controller.requires_permission(general="member:update")
+    @transactional
+    def delete_api_key(username, key_id: int):
+        member = _resolve_member(username)
+        if (api_key := api_key_repo.get_api_key_by_id(key_id)) is None or api_key.member_id != member.id:
+            return abort(HTTPStatus.NOT_FOUND, description=f"API key '{key_id}' not found for member '{username}'")
+
+        deleted_id = api_key_repo.delete_api_key(api_key)
+        return {"description": "API key revoked successfully", "id": deleted_id}
+
+    return bp
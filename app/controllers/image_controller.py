@@ -1,97 +1,305 @@
-import os.path
+import logging
+from functools import wraps
 from http import HTTPStatus
 
 from flask import Blueprint
+from flask import Response
 from flask import abort
+from flask import after_this_request
+from flask import current_app
 from flask import request
-from flask import send_file
+from flask import url_for
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.utils import send_file
+from werkzeug.wsgi import wrap_file
 
 from app.auth import AuthController
 
+from app.decorators import transactional
+from app.extensions import db
+
+from app.image_resizer import ImageResizer, ImageResizeError
+from app.image_store import ImageStore, ImageTooLargeError, LocalImageStore
+from app.image_transcoder import ImageTranscoder, MIMETYPES as TRANSCODED_MIMETYPES
+from app.image_url_signer import ImageUrlSigner
+from app.instrumentation.metrics import CACHE_REQUESTS
+
+from app.models.image_model import Image, MIMETYPES
+
+from app.repositories.image_repository import ImageRepository
 from app.repositories.project_repository import ProjectRepository
 from app.repositories.member_repository import MemberRepository
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
-MIMETYPES = {
-    "png": "image/png",
-    "jpg": "image/jpeg",
-    "jpeg": "image/jpeg"
+logger = logging.getLogger(__name__)
+
+# leading bytes of the accepted image types, the uploaded filename and content type are client controlled
+SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpg",
 }
+OFFLOAD_MODES = {"", "x-accel", "x-sendfile"}
+
+def sniff_image_type(stream) -> str | None:
+    head = stream.read(max(map(len, SIGNATURES)))
+    stream.seek(0)
+    return next((ext for signature, ext in SIGNATURES.items() if head.startswith(signature)), None)
+
+def create_images_bp(*, image_store: ImageStore, image_resizer: ImageResizer, image_transcoder: ImageTranscoder,
+                     image_url_signer: ImageUrlSigner, image_repo: ImageRepository, member_repo: MemberRepository,
+                     project_repo: ProjectRepository, auth_controller: AuthController,
+                     cache_max_age: int = 31536000, offload: str = "", offload_prefix: str = "/_protected/images/",
+                     max_upload_size: int = 5 * 1024 * 1024):
+    """
+    Images are served at their original size or, with ``?size=<px>``, as a downscaled variant rendered by
+    ``image_resizer``. Browsers listing WebP or AVIF in their ``Accept`` header get the image in that format once
+    ``image_transcoder`` encoded it in the background, and the original meanwhile.
 
-def allowed_file(filename: str) -> bool:
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    Besides the member and project image routes, images are served at the URLs signed by ``image_url_signer`` with no
+    session, authentication nor query. The member images manifest lists all of them at once for directory pages.
 
-def create_images_bp(images_path: str, member_repo: MemberRepository, project_repo: ProjectRepository, auth_controller: AuthController):
-    members_images_path = os.path.join(images_path, "members")
-    projects_images_path = os.path.join(images_path, "projects")
-    if not os.path.exists(members_images_path):
-        os.makedirs(members_images_path)
-    if not os.path.exists(projects_images_path):
-        os.makedirs(projects_images_path)
+    :param offload: Hand the transfer of image bytes to the reverse proxy once the request is authorized and the image
+        looked up, ``x-accel`` answers with an ``X-Accel-Redirect`` to ``offload_prefix`` + the image path for nginx
+        and ``x-sendfile`` with an ``X-Sendfile`` absolute path for Apache/lighttpd. Empty streams them from the worker.
+        The proxy reads the files from disk, offloading requires a ``LocalImageStore``.
+    :type offload: str
+    :param offload_prefix: nginx ``internal`` location aliasing the images directory.
+    :type offload_prefix: str
+    :param max_upload_size: Largest image upload request accepted, in bytes.
+    :type max_upload_size: int
+    """
+    if offload not in OFFLOAD_MODES:
+        raise ValueError(f"Invalid images offload mode '{offload}', expected one of {sorted(OFFLOAD_MODES)}")
+    if offload and not isinstance(image_store, LocalImageStore):
+        raise ValueError(f"Images offload mode '{offload}' requires the local images storage")
+    offload_prefix = "/" + offload_prefix.strip("/") + "/"
 
     bp = Blueprint("images", __name__)
 
+    @bp.before_request
+    def limit_upload_size():
+        # werkzeug answers 413 while parsing the multipart body instead of spooling all of it
+        request.max_content_length = max_upload_size
+
+    def _set_cache_headers(rsp: Response, versioned: bool) -> Response:
+        rsp.cache_control.private = True
+        if versioned:
+            # the URL names the content, it never changes
+            rsp.cache_control.max_age = cache_max_age
+            rsp.cache_control.immutable = True
+        else:
+            rsp.cache_control.no_cache = True
+        return rsp
+
+    def _requested_size() -> int | None:
+        if "size" not in request.args:
+            return None
+        if (size := request.args.get("size", type=int)) not in image_resizer.sizes:
+            return abort(HTTPStatus.BAD_REQUEST,
+                         description=f"Invalid image size, only allowed: {list(image_resizer.sizes)}")
+        return size
+
+    def _etag(content_hash: str, size: int | None, image_format: str | None = None) -> str:
+        etag = content_hash if size is None else f"{content_hash}-{size}"
+        return etag if image_format is None else f"{etag}-{image_format}"
+
+    def _not_modified_if_versioned(fn):
+        """
+        Answer revalidations of hash versioned URLs, ``?v=<image_hash>``, with ``304 Not Modified`` before
+        authentication and any query, the content of a version never changes.
+        """
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            size = _requested_size()
+            if version := request.args.get("v"):
+                # any format of the version the browser cached is still valid, it only caches formats it accepts
+                for image_format in (None, *image_transcoder.formats):
+                    if request.if_none_match.contains(etag := _etag(version, size, image_format)):
+                        rsp = Response(status=HTTPStatus.NOT_MODIFIED)
+                        rsp.set_etag(etag)
+                        rsp.vary.add("Accept")
+                        CACHE_REQUESTS.labels("image_revalidation", "hit").inc()
+                        return _set_cache_headers(rsp, versioned=True)
+                if request.if_none_match:
+                    CACHE_REQUESTS.labels("image_revalidation", "miss").inc()
+            return fn(*args, **kwargs)
+        return wrapper
+
+    def _accel_redirect(image: Image, path: str, mimetype: str, etag: str) -> Response:
+        # nginx streams the file from the internal location, the index already describes it so the worker
+        # doesn't read it
+        rsp = current_app.response_class(mimetype=mimetype)
+        rsp.set_etag(etag)
+        rsp.last_modified = image.mtime
+        rsp.make_conditional(request)
+        if rsp.status_code == HTTPStatus.OK:
+            rsp.headers["X-Accel-Redirect"] = offload_prefix + path
+        return rsp
+
+    def _stream_file(image: Image, path: str, mimetype: str, etag: str) -> Response:
+        file, size = image_store.open(path)
+        rsp = current_app.response_class(wrap_file(request.environ, file), mimetype=mimetype, direct_passthrough=True)
+        rsp.content_length = size
+        rsp.set_etag(etag)
+        rsp.last_modified = image.mtime
+        try:
+            # ranges are served by seeking the file, a ranged read of the object from the S3 storage
+            return rsp.make_conditional(request.environ, accept_ranges=True, complete_length=size)
+        except RequestedRangeNotSatisfiable:
+            file.close()
+            raise
+
+    def _send_image(image: Image, description: str):
+        path, size, image_format, mimetype = image.path, _requested_size(), None, image.mimetype
+        try:
+            decodable = True
+            if size is not None:
+                try:
+                    path = image_resizer.get_variant(image.path, size)
+                except ImageResizeError:
+                    size, decodable = None, False  # the client may still make sense of the original
+            accepted = ImageTranscoder.accepted_mimetypes(request.accept_mimetypes)
+            if decodable and (negotiated := image_transcoder.negotiate(image.path, size, accepted)) is not None:
+                path, image_format = negotiated
+                mimetype = TRANSCODED_MIMETYPES[image_format]
+            etag = _etag(image.content_hash, size, image_format)
+            if offload == "x-accel":
+                rsp = _accel_redirect(image, path, mimetype, etag)
+            elif offload == "x-sendfile":
+                rsp = send_file(image_store.resolve(path), request.environ, mimetype=mimetype, etag=etag,
+                                last_modified=image.mtime, conditional=True, use_x_sendfile=True,
+                                response_class=current_app.response_class)
+            else:
+                rsp = _stream_file(image, path, mimetype, etag)
+        except FileNotFoundError:
+            logger.error(f"Indexed image '{image.path}' is missing from the images storage")
+            return abort(HTTPStatus.NOT_FOUND, description=description)
+        rsp.vary.add("Accept")
+        return _set_cache_headers(rsp, versioned=request.args.get("v") == image.content_hash)
+
+    def _store_image(image: Image) -> Image:
+        if 'file' not in request.files or not request.files['file'].filename:
+            return abort(HTTPStatus.BAD_REQUEST, description=f"Missing file part")
+
+        file = request.files['file']
+        if (ext := sniff_image_type(file.stream)) is None:
+            return abort(HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                         description=f"Invalid image type, only allowed: {sorted(set(SIGNATURES.values()))}")
+
+        # stored under a new name, the indexed file stays in place until the new entry is committed
+        try:
+            stored = image_store.save(file.stream, f".{ext}", max_size=max_upload_size)
+        except ImageTooLargeError as e:
+            return abort(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, description=str(e))
+        previous_path = image.path
+
+        @after_this_request
+        def cleanup(response):
+            # a blob left unreferenced by a failed upload is removed by the images garbage collection, another
+            # upload of the same content may be referencing it concurrently
+            if response.status_code >= 400 or stored.path == previous_path:
+                return response
+            image_transcoder.schedule(stored.path)
+            image_transcoder.schedule_placeholder(stored.path, save_placeholder)
+            if previous_path is not None and image_repo.count_images_by_path(previous_path) == 0:
+                image_store.delete(previous_path)
+                image_transcoder.delete_variants(previous_path)
+            return response
+
+        app = current_app._get_current_object()
+
+        def save_placeholder(placeholder: str):
+            # rendered on the transcoder pool once the upload is committed, images sharing the file share it
+            with app.app_context():
+                image_repo.set_placeholder(stored.path, placeholder)
+                db.session.commit()
+
+        if stored.path != previous_path:
+            image.placeholder = None
+        image.path = stored.path
+        image.mimetype = MIMETYPES[ext]
+        image.size = stored.size
+        image.content_hash = stored.content_hash
+        image.mtime = stored.mtime
+        return image_repo.save_image(image)
+
     @bp.route("/members/<username>/image", methods=["GET"])
+    @_not_modified_if_versioned
     @auth_controller.requires_permission(general="member:read")
     def get_member_image(username):
-        if (member := member_repo.get_member_by_username(username)) is None:
+        if (image := image_repo.get_image_by_username(username)) is not None:
+            return _send_image(image, description=f"Member '{username}' image not found")
+
+        if member_repo.get_member_by_username(username) is None:
             return abort(HTTPStatus.NOT_FOUND, description=f"Member with username '{username}' not found")
+        return abort(HTTPStatus.NOT_FOUND, description=f"Member '{username}' image not found")
 
-        for ext in ALLOWED_EXTENSIONS:
-            file_name = member.ist_id + "." + ext
-            path = os.path.join(members_images_path, file_name)
-            if os.path.exists(path):
-                return send_file(path, mimetype=MIMETYPES[ext])
+    @bp.route("/members/images/manifest", methods=["GET"])
+    @auth_controller.requires_permission(general="member:read")
+    def get_member_images_manifest():
+        placeholders = request.args.get("placeholders", "").lower() in ("1", "true")
+        manifest = {}
+        for username, image in image_repo.get_member_images(placeholders=placeholders):
+            if image is None:
+                manifest[username] = None
+                continue
+            entry = manifest[username] = {
+                "hash": image.content_hash,
+                "sizes": list(image_resizer.sizes),
+                # the signed URL skips the session and queries, the versioned route still caches without a key
+                "url": image_url_signer.url_for(image) or url_for("images.get_member_image", username=username,
+                                                                  v=image.content_hash),
+            }
+            if placeholders:
+                entry["placeholder"] = image.placeholder
 
-        return abort(HTTPStatus.NOT_FOUND, description=f"Member '{username}' image not found")
+        rsp = current_app.json.response(manifest)
+        rsp.cache_control.private = True
+        rsp.cache_control.no_cache = True
+        rsp.add_etag()  # signed URLs only change every IMAGES_URL_TTL seconds
+        return rsp.make_conditional(request)
 
     @bp.route("/projects/<slug>/image", methods=["GET"])
+    @_not_modified_if_versioned
     @auth_controller.requires_permission(general="project:read")
     def get_project_image(slug):
-        if (project := project_repo.get_project_by_slug(slug)) is None:
+        if (image := image_repo.get_image_by_project_slug(slug)) is not None:
+            return _send_image(image, description=f"Project {slug} image not found")
+
+        if project_repo.get_project_by_slug(slug) is None:
             return abort(HTTPStatus.NOT_FOUND, description=f"Project '{slug}' not found")
+        return abort(HTTPStatus.NOT_FOUND, description=f"Project {slug} image not found")
 
-        for ext in ALLOWED_EXTENSIONS:
-            file_name = project.name + "." + ext
-            path = os.path.join(projects_images_path, file_name)
-            if os.path.exists(path):
-                return send_file(path, mimetype=MIMETYPES[ext])
+    @bp.route("/images/<path:path>", methods=["GET"])
+    @_not_modified_if_versioned
+    def get_signed_image(path):
+        version, expires = request.args.get("v", ""), request.args.get("expires", type=int)
+        if expires is None or not image_url_signer.verify(path, version, expires, request.args.get("sig", "")):
+            return abort(HTTPStatus.FORBIDDEN, description="Invalid or expired image URL")
 
-        return abort(HTTPStatus.NOT_FOUND, description=f"Project {slug} image not found")
+        # the signed URL carries everything the index would tell
+        mimetype = MIMETYPES.get(path.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+        return _send_image(Image(path=path, mimetype=mimetype, content_hash=version), description="Image not found")
 
     @bp.route("/members/<username>/image", methods=["POST"])
     @auth_controller.requires_permission(general="member:update")
+    @transactional
     def upload_member_image(username):
         if (member := member_repo.get_member_by_username(username)) is None:
             return abort(HTTPStatus.NOT_FOUND, description=f"Member with username '{username}' not found")
 
-        if 'file' not in request.files or not request.files['file'].filename:
-            return abort(HTTPStatus.BAD_REQUEST, description=f"Missing file part")
-
-        file = request.files['file']
-        if not allowed_file(file.filename):
-            return abort(HTTPStatus.BAD_REQUEST, description=f"Invalid image extension, only allowed :{ALLOWED_EXTENSIONS}")
-
-        _, ext = os.path.splitext(file.filename)
-        file.save(os.path.join(members_images_path, member.ist_id + ext))
-        return {"description": "Member image uploaded successfully", "username": member.username}
+        image = _store_image(member.image or Image(member_id=member.id))
+        return {"description": "Member image uploaded successfully", "username": member.username,
+                "image_hash": image.content_hash}
 
     @bp.route("/projects/<slug>/image", methods=["POST"])
     @auth_controller.requires_permission(general="project:update", project="update")
+    @transactional
     def upload_project_image(slug):
         if (project := project_repo.get_project_by_slug(slug)) is None:
             return abort(HTTPStatus.NOT_FOUND, description=f"Project '{slug}' not found")
 
-        if 'file' not in request.files or not request.files['file'].filename:
-            return abort(HTTPStatus.BAD_REQUEST, description=f"Missing file part")
-
-        file = request.files['file']
-        if not allowed_file(file.filename):
-            return abort(HTTPStatus.BAD_REQUEST, description=f"Invalid image extension, only allowed :{ALLOWED_EXTENSIONS}")
-
-        _, ext = os.path.splitext(file.filename)
-        file.save(os.path.join(projects_images_path, project.slug + ext))
-        return {"description": "Project image uploaded successfully", "name": project.name}
+        image = _store_image(project.image or Image(project_id=project.id))
+        return {"description": "Project image uploaded successfully", "name": project.name,
+                "image_hash": image.content_hash}
 
     return bp
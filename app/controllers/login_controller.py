@@ -10,9 +10,15 @@ from flask import request
 from flask import session
 
 from app.auth.auth_controller import AuthController
-from app.auth.fenix.fenix_service import FenixService
+from app.auth.fenix.fenix_service import FenixService, FenixUnavailableError
 from app.auth.utils import current_member
 
+from app.decorators import transactional
+
+from app.instrumentation.server_timing import phase
+
+from app.rate_limiter import RateLimiter, client_ip, json_field
+
 from app.repositories.member_repository import MemberRepository
 
 from app.schemas.fenix_callback_schema import FenixCallbackSchema
@@ -21,19 +27,29 @@ from app.schemas.login_schema import LoginSchema
 from app.schemas.member_schema import MemberSchema
 
 
-def create_login_bp(*, member_repo: MemberRepository, auth_controller: AuthController, fenix_service: FenixService):
+def create_login_bp(*, member_repo: MemberRepository, auth_controller: AuthController, fenix_service: FenixService,
+                    rate_limiter: RateLimiter):
     bp = Blueprint("auth", __name__)
 
+    # checked before any database access or password verification
     @bp.route("/login", methods=["POST"])
+    @rate_limiter.limit("login-ip", key=client_ip, rate=lambda: current_app.config["LOGIN_RATE_LIMIT_IP"])
+    @rate_limiter.limit("login-username", key=json_field("username"),
+                        rate=lambda: current_app.config["LOGIN_RATE_LIMIT_USERNAME"])
+    # the response is built before the commit, which would expire the member and reload it
+    @transactional
     @auth_controller.login_member
     def login():
-        login_data = LoginSchema(**request.json)
+        with phase("validation"):
+            login_data = LoginSchema(**request.json)
         if (member := member_repo.get_member_by_username(login_data.username)) is None:
             return None, None
         if member.password is None:  # fenix authenticated users must login through Fenix
             return None, None
         if not member.matches_password(login_data.password):
             return None, None
+        if member.password_needs_rehash():  # hashed with an outdated cost factor
+            member.password = login_data.password
         return member, None
 
     @bp.route("/logout", methods=["GET"])
@@ -67,20 +83,25 @@ def create_login_bp(*, member_repo: MemberRepository, auth_controller: AuthContr
         return redirect(fenix_service.redirect_url(state=state))
 
     @bp.route(fenix_service.redirect_endpoint)
+    @rate_limiter.limit("fenix-login-ip", key=client_ip, rate=lambda: current_app.config["LOGIN_RATE_LIMIT_IP"])
     @auth_controller.login_member
     def fenix_auth_callback():
         if "next" not in session:
             return abort(HTTPStatus.UNAUTHORIZED)
 
-        callback_args = FenixCallbackSchema(**request.args)
+        with phase("validation"):
+            callback_args = FenixCallbackSchema(**request.args)
         if callback_args.error:
             return abort(HTTPStatus.BAD_GATEWAY, description=callback_args.error)
 
         if "state" not in session or callback_args.state != session["state"]:
             return None, session["next"]
 
-        token = fenix_service.fetch_access_token(redirect_endpoint="/fenix-login-callback", code=callback_args.code)
-        fenix_user_schema = FenixUserSchema(**fenix_service.fetch_user_info(token))
+        try:
+            token = fenix_service.fetch_access_token(redirect_endpoint="/fenix-login-callback", code=callback_args.code)
+            fenix_user_schema = FenixUserSchema(**fenix_service.fetch_user_info(token))
+        except FenixUnavailableError:
+            return abort(HTTPStatus.SERVICE_UNAVAILABLE, description="Fénix is unavailable, try again later")
         if (member := member_repo.get_member_by_ist_id(fenix_user_schema.ist_id)) is None:
             return None, session["next"]
 
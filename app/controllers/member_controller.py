@@ -8,6 +8,8 @@ from app.auth import AuthController, current_member
 
 from app.decorators import transactional
 
+from app.instrumentation.server_timing import phase
+
 from app.models.member_model import Member
 
 from app.repositories.member_repository import MemberRepository
@@ -23,7 +25,8 @@ def create_member_bp(*, member_repo: MemberRepository, auth_controller: AuthCont
     @auth_controller.requires_permission(general="member:create")
     @transactional
     def create_member():
-        member_data = MemberSchema(**request.json)
+        with phase("validation"):
+            member_data = MemberSchema(**request.json)
         if member_data.ist_id and member_repo.get_member_by_ist_id(member_data.ist_id) is not None:
             return abort(HTTPStatus.CONFLICT, description=f"Member with IST ID '{member_data.ist_id}' already exists")
 
@@ -61,7 +64,8 @@ def create_member_bp(*, member_repo: MemberRepository, auth_controller: AuthCont
         if (member := member_repo.get_member_by_username(username)) is None:
             return abort(HTTPStatus.NOT_FOUND, description=f"Member with username '{username}' not found")
 
-        member_update = UpdateMemberSchema(**request.json)
+        with phase("validation"):
+            member_update = UpdateMemberSchema(**request.json)
         if member_update.username and member_repo.get_member_by_username(member_update.username) is not None:
             return abort(HTTPStatus.CONFLICT,
                          description=f"Member with username '{member_update.username}' already exists")
@@ -0,0 +1,17 @@
+from flask import Blueprint
+
+from app.instrumentation.metrics import render_metrics
+
+
+def create_metrics_bp():
+    """
+    Prometheus scrape endpoint, with no authentication as it serves the scraper on the internal network, keep it out of
+    the reverse proxy.
+    """
+    bp = Blueprint("metrics", __name__)
+
+    @bp.route("/metrics", methods=["GET"])
+    def get_metrics():
+        return render_metrics()
+
+    return bp
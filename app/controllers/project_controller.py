@@ -8,6 +8,8 @@ from app.auth import AuthController
 
 from app.decorators import transactional
 
+from app.instrumentation.server_timing import phase
+
 from app.models.project_model import Project
 
 from app.repositories.project_repository import ProjectRepository
@@ -25,7 +27,8 @@ def create_project_bp(*, project_repo: ProjectRepository, auth_controller: AuthC
     @auth_controller.requires_permission(general="project:create")
     @transactional
     def create_project():
-        project_data = ProjectSchema(**request.json)
+        with phase("validation"):
+            project_data = ProjectSchema(**request.json)
         if project_repo.get_project_by_name(project_data.name) is not None:
             return abort(HTTPStatus.CONFLICT, description=f"Project with name '{project_data.name}' already exists")
 
@@ -56,7 +59,8 @@ def create_project_bp(*, project_repo: ProjectRepository, auth_controller: AuthC
         if (project := project_repo.get_project_by_slug(slug)) is None:
             return abort(HTTPStatus.NOT_FOUND, description=f"Project '{slug}' not found")
 
-        project_update = UpdateProjectSchema(**request.json)
+        with phase("validation"):
+            project_update = UpdateProjectSchema(**request.json)
         if project_update.name and project_repo.get_project_by_slug(slugify(project_update.name)) is not None:
             return abort(HTTPStatus.CONFLICT,
                          description=f"A slug already exists for this name, please pick a new one: '{project_update.name}'")
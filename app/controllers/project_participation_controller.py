@@ -8,6 +8,8 @@ from app.auth.auth_controller import AuthController
 
 from app.decorators import transactional
 
+from app.instrumentation.server_timing import phase
+
 from app.models.project_participation_model import ProjectParticipation
 
 from app.repositories.member_repository import MemberRepository
@@ -30,7 +32,8 @@ def create_participation_bp(*, participation_repo: ProjectParticipationRepositor
             return abort(HTTPStatus.NOT_FOUND,
                          description=f"Project '{slug}' not found")
 
-        participation_data = ProjectParticipationSchema(**request.json)
+        with phase("validation"):
+            participation_data = ProjectParticipationSchema(**request.json)
         if (member := member_repo.get_member_by_username(participation_data.username)) is None:
             return abort(HTTPStatus.NOT_FOUND,
                          description=f'Member with username "{participation_data.username}" not found')
@@ -92,7 +95,8 @@ def create_participation_bp(*, participation_repo: ProjectParticipationRepositor
             return abort(HTTPStatus.NOT_FOUND,
                          description=f"Member with username '{username}' not found")
 
-        participation_update = UpdateProjectParticipationSchema(**request.json)
+        with phase("validation"):
+            participation_update = UpdateProjectParticipationSchema(**request.json)
         if (participation := participation_repo.get_participation_by_project_and_member_id(project_id=project.id,
                                                                                            member_id=member.id)) is None:
             return abort(HTTPStatus.NOT_FOUND,
@@ -13,6 +13,8 @@ from app.repositories.project_participation_repository import ProjectParticipati
 from app.models.task_model import Task
 from app.decorators import transactional
 
+from app.instrumentation.server_timing import phase
+
 def create_task_bp(*, task_repo: TaskRepository, participation_repo: ProjectParticipationRepository,
                    member_repo: MemberRepository, project_repo: ProjectRepository, auth_controller: AuthController):
     bp = Blueprint("task", __name__)
@@ -36,7 +38,8 @@ def create_task_bp(*, task_repo: TaskRepository, participation_repo: ProjectPart
         if (task := task_repo.get_task_by_id(task_id)) is None:
             return abort(HTTPStatus.NOT_FOUND, description=f"Task with ID '{task_id}' not found")
 
-        update_schema = UpdateTaskSchema(**request.json)
+        with phase("validation"):
+            update_schema = UpdateTaskSchema(**request.json)
         updated_task = task_repo.update_task(task, update_schema)
         return TaskSchema.from_task(updated_task).model_dump()
 
@@ -69,7 +72,8 @@ def create_task_bp(*, task_repo: TaskRepository, participation_repo: ProjectPart
     @auth_controller.requires_permission(general="task:create")
     @transactional
     def create_task(slug):
-        task_data = TaskSchema(**request.json)
+        with phase("validation"):
+            task_data = TaskSchema(**request.json)
         _, _, participation = _resolve_targets(username=task_data.username, slug=slug)
 
         task = task_repo.create_task(Task.from_schema(schema=task_data, participation=participation))
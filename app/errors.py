@@ -2,6 +2,8 @@ import json
 
 from pydantic import ValidationError
 
+from app.password_hasher import PasswordHasherBusyError
+
 from http import HTTPStatus
 
 from flask import Response
@@ -38,3 +40,18 @@ def handle_validation_error(e: ValidationError):
         status=HTTPStatus.UNPROCESSABLE_ENTITY,
         content_type="application/json",
     )
+
+
+def handle_password_hasher_busy(e: PasswordHasherBusyError):
+    return Response(
+        response=json.dumps(
+            {
+                "code": HTTPStatus.SERVICE_UNAVAILABLE,
+                "name": "Service Unavailable",
+                "description": "Server is busy, try again later",
+            }
+        ),
+        status=HTTPStatus.SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+        content_type="application/json",
+    )
@@ -16,7 +16,26 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
 
-from flask_migrate import Migrate  # noqa: E402
+from app.password_hasher import PasswordHasher  # noqa: E402
 
-migrate = Migrate()
+password_hasher = PasswordHasher()
 
+from app.image_url_signer import ImageUrlSigner  # noqa: E402
+
+image_url_signer = ImageUrlSigner()
+
+from app.instrumentation.access_log import RequestIds  # noqa: E402
+from app.instrumentation.logs import LogPipeline  # noqa: E402
+from app.instrumentation.metrics import RequestMetrics  # noqa: E402
+from app.instrumentation.profiler import RequestProfiler  # noqa: E402
+from app.instrumentation.queries import QueryCounter  # noqa: E402
+from app.instrumentation.server_timing import ServerTiming  # noqa: E402
+from app.instrumentation.slow_queries import SlowQueryLog  # noqa: E402
+
+log_pipeline = LogPipeline()
+request_ids = RequestIds()
+profiler = RequestProfiler()
+request_metrics = RequestMetrics()
+query_counter = QueryCounter()
+server_timing = ServerTiming()
+slow_query_log = SlowQueryLog(log_pipeline=log_pipeline)
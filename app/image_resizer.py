@@ -0,0 +1,166 @@
+import base64
+import io
+import logging
+import os
+import threading
+import zlib
+from typing import Iterable
+
+import PIL.Image
+import PIL.ImageFilter
+import PIL.ImageOps
+
+from app.image_store import ImageStore
+from app.instrumentation.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class ImageResizeError(Exception):
+    """ Raised when the original image can't be decoded and resized. """
+
+
+# Pillow format names of the formats variants can be encoded in
+FORMATS = {"webp": "WEBP", "avif": "AVIF"}
+
+
+def variant_path(path: str, size: int | None, image_format: str | None = None) -> str:
+    """
+    Variants are stored beside their original, ``sha256/ab/cd/<digest>.png`` at 48px is
+    ``sha256/ab/cd/<digest>.48.png`` and encoded in WebP ``sha256/ab/cd/<digest>.48.webp``.
+    """
+    stem, ext = os.path.splitext(path)
+    return stem + (f".{size}" if size is not None else "") + (f".{image_format}" if image_format else ext)
+
+
+class ImageResizer:
+    """
+    Renders downscaled variants of stored images, at most ``size`` pixels wide and high keeping the aspect ratio.
+
+    Variants are rendered on their first request and stored beside the original, originals are named after their
+    content so a re-upload gets new variants and the old ones are deleted with the original they belong to.
+    Concurrent requests for a variant being rendered wait for it instead of rendering it again.
+
+    :param image_store: Store of the originals and variants.
+    :type image_store: ``app.image_store.ImageStore``
+    :param sizes: Sizes variants can be requested at.
+    :type sizes: Iterable[int]
+    :param max_pixels: Largest image decoded, in pixels. A few KiB of PNG can declare enough pixels to exhaust the
+        worker memory before Pillow's own decompression bomb check raises.
+    :type max_pixels: int
+    """
+
+    LOCK_STRIPES = 64
+    PLACEHOLDER_SIZE = 16
+
+    def __init__(self, *, image_store: ImageStore, sizes: Iterable[int] = (48, 128, 512),
+                 max_pixels: int = 25_000_000):
+        self.image_store = image_store
+        self.sizes = tuple(sorted(sizes))
+        self.max_pixels = max_pixels
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def get_variant(self, path: str, size: int) -> str:
+        """
+        Path of the variant of the image at ``path``, rendering it if it doesn't exist yet.
+
+        :raises ValueError: If ``size`` isn't one of the configured sizes.
+        :raises FileNotFoundError: If the original is missing.
+        :raises ImageResizeError: If the original can't be decoded.
+        """
+        if size not in self.sizes:
+            raise ValueError(f"Invalid image size '{size}', expected one of {list(self.sizes)}")
+
+        variant = variant_path(path, size)
+        if self.image_store.exists(variant):
+            CACHE_REQUESTS.labels("image_variant", "hit").inc()
+            return variant
+        CACHE_REQUESTS.labels("image_variant", "miss").inc()
+
+        # single flight per variant, other workers may still render it concurrently but writes are atomic
+        with self._locks[zlib.crc32(variant.encode("utf-8")) % self.LOCK_STRIPES]:
+            if not self.image_store.exists(variant):
+                self.image_store.put(self._render(path, size), variant)
+        return variant
+
+    def render_variant(self, path: str, size: int | None, image_format: str) -> str:
+        """
+        Render the image at ``path`` in another format, downscaled if ``size`` is given, replacing any existing
+        variant.
+
+        :raises FileNotFoundError: If the original is missing.
+        :raises ImageResizeError: If the original can't be decoded.
+        """
+        variant = variant_path(path, size, image_format)
+        self.image_store.put(self._render(path, size, image_format), variant)
+        return variant
+
+    def render_placeholder(self, path: str) -> str:
+        """
+        Tiny blurred thumbnail of the image at ``path`` as a ``data:`` URI, a few hundred bytes clients inline while
+        the image loads.
+
+        :raises FileNotFoundError: If the original is missing.
+        :raises ImageResizeError: If the original can't be decoded.
+        """
+        try:
+            with self._open(path) as original:
+                # JPEGs are decoded at a fraction of their size directly
+                original.draft("RGB", (self.PLACEHOLDER_SIZE, self.PLACEHOLDER_SIZE))
+                image = PIL.ImageOps.exif_transpose(original)
+                image.thumbnail((self.PLACEHOLDER_SIZE, self.PLACEHOLDER_SIZE), PIL.Image.Resampling.BILINEAR)
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+                image = image.filter(PIL.ImageFilter.GaussianBlur(1))
+                rendered = io.BytesIO()
+                image.save(rendered, format="WEBP", quality=40)
+        except FileNotFoundError:
+            raise
+        except (OSError, PIL.Image.DecompressionBombError) as e:
+            logger.warning(f"Failed rendering the placeholder of image '{path}': {e}")
+            raise ImageResizeError(f"Failed rendering the placeholder of image '{path}': {e}")
+        return "data:image/webp;base64," + base64.b64encode(rendered.getvalue()).decode("ascii")
+
+    def delete_variants(self, path: str, formats: Iterable[str] = ()):
+        for size in (None, *self.sizes):
+            for image_format in (None, *formats):
+                if size is not None or image_format is not None:
+                    self.image_store.delete(variant_path(path, size, image_format))
+
+    def _open(self, path: str) -> PIL.Image.Image:
+        # only the header is read until the image is loaded
+        original = PIL.Image.open(io.BytesIO(self.image_store.read(path)))
+        if original.width * original.height > self.max_pixels:
+            original.close()
+            raise PIL.Image.DecompressionBombError(
+                f"{original.width}x{original.height} pixels exceed the limit of {self.max_pixels}")
+        return original
+
+    def _render(self, path: str, size: int | None, image_format: str | None = None) -> io.BytesIO:
+        try:
+            with self._open(path) as original:
+                pil_format = FORMATS[image_format] if image_format else original.format
+                image = PIL.ImageOps.exif_transpose(original)
+                if size is not None:
+                    image.thumbnail((size, size), PIL.Image.Resampling.LANCZOS)
+                if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                elif pil_format in FORMATS.values() and image.mode not in ("RGB", "RGBA", "L"):
+                    image = image.convert("RGBA")
+                rendered = io.BytesIO()
+                image.save(rendered, format=pil_format, **self._encoder_options(pil_format))
+        except FileNotFoundError:
+            raise
+        except (OSError, PIL.Image.DecompressionBombError) as e:
+            logger.warning(f"Failed resizing image '{path}': {e}")
+            raise ImageResizeError(f"Failed resizing image '{path}': {e}")
+        rendered.seek(0)
+        return rendered
+
+    @staticmethod
+    def _encoder_options(pil_format: str) -> dict:
+        return {
+            "JPEG": {"quality": 85, "optimize": True},
+            "PNG": {"optimize": True},
+            "WEBP": {"quality": 80, "method": 4},
+            "AVIF": {"quality": 60, "speed": 6},
+        }.get(pil_format, {})
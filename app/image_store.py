@@ -0,0 +1,363 @@
+import hashlib
+import io
+import os
+import posixpath
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Mapping, Tuple
+
+CHUNK_SIZE = 64 * 1024
+BLOBS_DIRECTORY = "sha256"
+TMP_PREFIX = ".upload-"
+
+
+class ImageTooLargeError(Exception):
+    """ Raised when a stream is larger than the size allowed to store it. """
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    path: str
+    size: int
+    content_hash: str
+    mtime: float
+
+
+class ImageStore(ABC):
+    """
+    Stores image files by path, ``members/1.png``, in a storage backend, see ``LocalImageStore`` and
+    ``S3ImageStore``.
+
+    Writes are hashed and spooled to a temporary file before being published whole, so readers never see a partial
+    write. Uploads are content addressed, stored once at ``sha256/ab/cd/<digest>.<ext>`` however many images
+    reference them, blobs no image references anymore are removed by ``collect_garbage``.
+    """
+
+    def save(self, stream: BinaryIO, ext: str, max_size: int = None) -> StoredFile:
+        """
+        Write the stream to the blob named after its content, ``sha256/ab/cd/<digest><ext>``. A new upload never
+        overwrites the file it replaces while that one is still indexed, and identical uploads share a blob.
+
+        :raises ImageTooLargeError: If the stream is larger than ``max_size`` bytes, nothing is stored.
+        """
+        # an existing blob is replaced by identical bytes, which also refreshes its mtime against collect_garbage
+        return self._write(stream, f"{BLOBS_DIRECTORY}/", lambda digest: blob_path(digest, ext), max_size=max_size)
+
+    def put(self, stream: BinaryIO, path: str) -> StoredFile:
+        """ Write the stream to ``path``, replacing the file there if any. """
+        return self._write(stream, path, lambda digest: path)
+
+    @abstractmethod
+    def open(self, path: str) -> Tuple[BinaryIO, int]:
+        """
+        Open a stored file for streaming, the file is seekable so ranges of it can be read.
+
+        :return: The file and its size in bytes.
+        :raises FileNotFoundError: If there's no file at ``path``.
+        """
+
+    def read(self, path: str) -> bytes:
+        """
+        :raises FileNotFoundError: If there's no file at ``path``.
+        """
+        file, _ = self.open(path)
+        with file:
+            return file.read()
+
+    @abstractmethod
+    def exists(self, path: str) -> bool:
+        ...
+
+    @abstractmethod
+    def stat(self, path: str) -> StoredFile:
+        """ Describe a file already in the store, used to index files written before the index existed. """
+
+    @abstractmethod
+    def delete(self, path: str):
+        """ Delete the file at ``path``, if any. """
+
+    def collect_garbage(self, referenced: Iterable[str], grace_period: float = 3600, dry_run: bool = False) -> List[str]:
+        """
+        Delete the blobs, and the variants stored beside them, whose digest isn't in ``referenced`` along with
+        temporary files left by interrupted writes.
+
+        Files modified in the last ``grace_period`` seconds are kept, they may belong to an upload not committed yet.
+
+        :param referenced: Content hashes of the indexed images.
+        :return: Paths of the deleted files.
+        """
+        referenced, deleted = set(referenced), []
+        cutoff = time.time() - grace_period
+        for path, mtime in self._list():
+            filename = posixpath.basename(path)
+            if filename.startswith(TMP_PREFIX):
+                orphan = True
+            elif path.startswith(BLOBS_DIRECTORY + "/"):
+                orphan = filename.split(".", 1)[0] not in referenced
+            else:
+                continue  # named by owner before uploads were content addressed, kept while indexed
+            if orphan and mtime < cutoff:
+                if not dry_run:
+                    self.delete(path)
+                deleted.append(path)
+        return deleted
+
+    def _write(self, stream: BinaryIO, path_hint: str, name: Callable[[str], str], max_size: int = None) -> StoredFile:
+        digest, size = hashlib.sha256(), 0
+        with self._spool(path_hint) as tmp:
+            while chunk := stream.read(CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise ImageTooLargeError(f"Image larger than {max_size} bytes")
+                tmp.write(chunk)
+            path = name(digest.hexdigest())
+            mtime = self._publish(tmp, path)
+        return StoredFile(path=path, size=size, content_hash=digest.hexdigest(), mtime=mtime)
+
+    @abstractmethod
+    def _spool(self, path_hint: str):
+        """ Context manager of the temporary file a write is spooled to, removed when the context exits. """
+
+    @abstractmethod
+    def _publish(self, tmp: BinaryIO, path: str) -> float:
+        """ Make the spooled file readable at ``path``, replacing the file there, and return its mtime. """
+
+    @abstractmethod
+    def _list(self) -> Iterable[Tuple[str, float]]:
+        """ Paths and mtimes of every stored file. """
+
+
+class LocalImageStore(ImageStore):
+    """
+    Stores images under a root directory of the local filesystem, paths handled by callers are relative to it.
+
+    Files are spooled next to their destination and renamed into place once complete.
+
+    :param root: Directory the images are stored in, created if missing.
+    :type root: str
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def resolve(self, path: str) -> str:
+        """
+        Absolute path of a stored file.
+
+        :raises ValueError: If the path escapes the root directory.
+        """
+        absolute = os.path.abspath(os.path.join(self.root, path))
+        if os.path.commonpath([self.root, absolute]) != self.root:
+            raise ValueError(f"Image path outside of the images directory: '{path}'")
+        return absolute
+
+    def open(self, path: str) -> Tuple[BinaryIO, int]:
+        file = open(self.resolve(path), "rb")
+        return file, os.fstat(file.fileno()).st_size
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(self.resolve(path))
+
+    def stat(self, path: str) -> StoredFile:
+        absolute = self.resolve(path)
+        digest = hashlib.sha256()
+        with open(absolute, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                digest.update(chunk)
+        st = os.stat(absolute)
+        return StoredFile(path=path, size=st.st_size, content_hash=digest.hexdigest(), mtime=st.st_mtime)
+
+    def delete(self, path: str):
+        try:
+            os.remove(self.resolve(path))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def _spool(self, path_hint: str) -> Iterator[BinaryIO]:
+        directory = os.path.dirname(self.resolve(path_hint))
+        os.makedirs(directory, exist_ok=True)
+        tmp = tempfile.NamedTemporaryFile(dir=directory, prefix=TMP_PREFIX, delete=False)
+        try:
+            with tmp:
+                yield tmp
+        finally:
+            if os.path.exists(tmp.name):
+                os.remove(tmp.name)
+
+    def _publish(self, tmp: BinaryIO, path: str) -> float:
+        tmp.flush()
+        os.fsync(tmp.fileno())
+        destination = self.resolve(path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        # the spooled file was created in the images directory, the rename is atomic
+        os.replace(tmp.name, destination)
+        return os.stat(destination).st_mtime
+
+    def _list(self) -> Iterable[Tuple[str, float]]:
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                absolute = os.path.join(directory, filename)
+                try:
+                    mtime = os.stat(absolute).st_mtime
+                except FileNotFoundError:
+                    continue
+                yield os.path.relpath(absolute, self.root).replace(os.sep, "/"), mtime
+
+
+
+class S3ImageStore(ImageStore):
+    """
+    Stores images as objects of an S3 compatible bucket, AWS S3 or e.g. MinIO with ``endpoint_url``, so several API
+    nodes share them without a shared filesystem. Credentials are read by boto3 from the ``AWS_ACCESS_KEY_ID`` and
+    ``AWS_SECRET_ACCESS_KEY`` environment variables.
+
+    Files are spooled to a local temporary file while hashed and uploaded once complete with a single PUT, multipart
+    uploads only pay off for objects several times the 5 MiB minimum part size. Reads are streamed, seeking issues a
+    ranged GET.
+
+    :param bucket: Name of the bucket, it must exist.
+    :type bucket: str
+    :param prefix: Prepended to the paths to get the object keys, e.g. ``images/``.
+    :type prefix: str
+    :param client: boto3 S3 client, created from ``endpoint_url`` and ``region`` if not given.
+    """
+
+    def __init__(self, *, bucket: str, prefix: str = "", endpoint_url: str = None, region: str = None, client=None):
+        import boto3  # optional, only needed with this backend
+        from botocore.config import Config as BotoConfig
+
+        self.bucket = bucket
+        self.prefix = prefix
+        if client is None:
+            # plain payload checksums, S3 compatible stores don't all support the aws-chunked trailing ones
+            client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None,
+                                  config=BotoConfig(request_checksum_calculation="when_required",
+                                                    response_checksum_validation="when_required",
+                                                    retries={"mode": "standard"},
+                                                    s3={"addressing_style": "path" if endpoint_url else "auto"}))
+        self.client = client
+
+    def open(self, path: str) -> Tuple[BinaryIO, int]:
+        file = _S3ObjectReader(self, self.prefix + path)
+        return file, file.size
+
+    def exists(self, path: str) -> bool:
+        try:
+            self._head(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def stat(self, path: str) -> StoredFile:
+        head = self._head(path)
+        digest = hashlib.sha256()
+        file, size = self.open(path)
+        with file:
+            while chunk := file.read(CHUNK_SIZE):
+                digest.update(chunk)
+        return StoredFile(path=path, size=size, content_hash=digest.hexdigest(),
+                          mtime=head["LastModified"].timestamp())
+
+    def delete(self, path: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + path)  # no error if missing
+
+    @contextmanager
+    def _spool(self, path_hint: str) -> Iterator[BinaryIO]:
+        with tempfile.TemporaryFile(prefix=TMP_PREFIX) as tmp:
+            yield tmp
+
+    def _publish(self, tmp: BinaryIO, path: str) -> float:
+        tmp.seek(0)
+        # objects are only visible once complete
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + path, Body=tmp)
+        return time.time()
+
+    def _list(self) -> Iterable[Tuple[str, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][len(self.prefix):], obj["LastModified"].timestamp()
+
+    def _head(self, path: str) -> dict:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.prefix + path)
+        except self.client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                raise FileNotFoundError(path) from e
+            raise
+
+
+class _S3ObjectReader(io.RawIOBase):
+    """ Seekable stream of an S3 object, a GET from the position is issued on the first read after a seek. """
+
+    def __init__(self, store: S3ImageStore, key: str):
+        self._store = store
+        self._key = key
+        self._pos = 0
+        self._body = None
+        response = self._get(0)
+        self._body = response["Body"]
+        self.size = response["ContentLength"]
+
+    def _get(self, start: int, **kwargs) -> dict:
+        if start:
+            kwargs["Range"] = f"bytes={start}-"
+        try:
+            return self._store.client.get_object(Bucket=self._store.bucket, Key=self._key, **kwargs)
+        except self._store.client.exceptions.NoSuchKey as e:
+            raise FileNotFoundError(self._key) from e
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        pos = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence] + offset
+        if pos != self._pos:
+            self._close_body()
+            self._pos = pos
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        if self._pos >= self.size:
+            return 0
+        if self._body is None:
+            self._body = self._get(self._pos)["Body"]
+        data = self._body.read(len(buffer))
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def close(self):
+        self._close_body()
+        super().close()
+
+    def _close_body(self):
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+
+def image_store_from_config(config: Mapping) -> ImageStore:
+    """ Create the image store configured by ``IMAGES_STORAGE``. """
+    if config["IMAGES_STORAGE"] == "s3":
+        return S3ImageStore(bucket=config["IMAGES_S3_BUCKET"], prefix=config["IMAGES_S3_PREFIX"],
+                            endpoint_url=config["IMAGES_S3_ENDPOINT_URL"], region=config["IMAGES_S3_REGION"])
+    if config["IMAGES_STORAGE"] == "local":
+        return LocalImageStore(config["IMAGES_PATH"])
+    raise ValueError(f"Invalid images storage '{config['IMAGES_STORAGE']}', expected 'local' or 's3'")
+
+
+def blob_path(digest: str, ext: str) -> str:
+    return f"{BLOBS_DIRECTORY}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
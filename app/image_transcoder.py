@@ -0,0 +1,148 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from functools import partial
+from typing import Callable, Iterable, List, Set, Tuple
+
+import PIL.features
+
+from app.image_resizer import ImageResizer, ImageResizeError, variant_path
+from app.instrumentation.metrics import CACHE_REQUESTS, IMAGES_TRANSCODE_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+MIMETYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+}
+
+
+class ImageTranscoder:
+    """
+    Encodes stored images in modern formats, WebP and AVIF when Pillow was built with its codec, on a small bounded
+    thread pool so neither uploads nor downloads wait for an encoder. Requests are served the best already encoded
+    format their ``Accept`` header allows and the original until then. The placeholders of uploads are rendered on the
+    same pool.
+
+    Encodings beyond ``max_queue`` waiting ones are dropped, they are scheduled again by the next request missing them.
+    Dropped placeholders are left to ``flask render-placeholders``.
+
+    :param image_resizer: Renderer of the variants.
+    :type image_resizer: ``app.image_resizer.ImageResizer``
+    :param formats: Formats to encode in, by order of preference.
+    :type formats: Iterable[str]
+    :param max_workers: Number of threads encoding.
+    :type max_workers: int
+    :param max_queue: Number of encodings allowed to wait for a free thread.
+    :type max_queue: int
+    """
+
+    def __init__(self, *, image_resizer: ImageResizer, formats: Iterable[str] = ("avif", "webp"), max_workers: int = 1,
+                 max_queue: int = 64):
+        self.image_resizer = image_resizer
+        self.formats = tuple(f for f in formats if f in MIMETYPES and PIL.features.check(f))
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._executor = None  # lazily created, workers forked by gunicorn each get their own
+        self._pending: Set[Tuple[str, int | None, str]] = set()
+        self._futures: Set[Future] = set()
+
+    def negotiate(self, path: str, size: int | None, accepted: Iterable[str]) -> Tuple[str, str] | None:
+        """
+        Pick the encoded variant of the image at ``path`` to serve, scheduling the encodings of the accepted formats
+        missing.
+
+        :param accepted: Mimetypes explicitly listed in the request ``Accept`` header.
+        :return: The variant path and its format, or ``None`` to serve the original format.
+        """
+        accepted = set(accepted)
+        missing = []
+        for image_format in self.formats:
+            if MIMETYPES[image_format] not in accepted or path.endswith("." + image_format):
+                continue
+            variant = variant_path(path, size, image_format)
+            if self.image_resizer.image_store.exists(variant):
+                CACHE_REQUESTS.labels("image_encoding", "hit").inc()
+                self.schedule(path, size, missing)
+                return variant, image_format
+            missing.append(image_format)
+        if missing:
+            CACHE_REQUESTS.labels("image_encoding", "miss").inc()
+        self.schedule(path, size, missing)
+        return None
+
+    def schedule(self, path: str, size: int | None = None, formats: Iterable[str] = None):
+        """ Encode the image at ``path``, downscaled if ``size`` is given, in the background. """
+        for image_format in self.formats if formats is None else formats:
+            if path.endswith("." + image_format):
+                continue  # already uploaded in this format
+            self._submit((path, size, image_format), partial(self._encode, path, size, image_format))
+
+    def schedule_placeholder(self, path: str, save: Callable[[str], None]):
+        """ Render the placeholder of the image at ``path`` in the background, handing it to ``save``. """
+        self._submit((path, None, "placeholder"), partial(self._placeholder, path, save))
+
+    def _submit(self, key: Tuple[str, int | None, str], fn: Callable[[], None]):
+        with self._lock:
+            if key in self._pending or len(self._pending) >= self.max_queue + self.max_workers:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transcoder")
+            self._pending.add(key)
+            IMAGES_TRANSCODE_QUEUE_DEPTH.set(len(self._pending))
+            future = self._executor.submit(self._run, key, fn)
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+
+    def delete_variants(self, path: str):
+        self.image_resizer.delete_variants(path, formats=MIMETYPES)
+
+    def wait(self, timeout: float = None):
+        """ Wait for the scheduled encodings to finish. """
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures, timeout=timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def _encode(self, path: str, size: int | None, image_format: str):
+        if self.image_resizer.image_store.exists(variant_path(path, size, image_format)):
+            return  # shared with an identical upload
+        try:
+            variant = self.image_resizer.render_variant(path, size, image_format)
+            if not self.image_resizer.image_store.exists(path):
+                self.image_resizer.image_store.delete(variant)  # replaced while it was encoded
+        except FileNotFoundError:
+            logger.info(f"Image '{path}' was deleted before it was encoded in {image_format}")
+        except ImageResizeError:
+            pass  # logged by the resizer, served in its original format
+
+    def _placeholder(self, path: str, save: Callable[[str], None]):
+        try:
+            save(self.image_resizer.render_placeholder(path))
+        except FileNotFoundError:
+            logger.info(f"Image '{path}' was deleted before its placeholder was rendered")
+        except ImageResizeError:
+            pass  # logged by the resizer, listed without placeholder
+
+    def _run(self, key: Tuple[str, int | None, str], fn: Callable[[], None]):
+        try:
+            fn()
+        except Exception as e:
+            logger.error(f"Failed rendering the {key[2]} of image '{key[0]}': {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+                IMAGES_TRANSCODE_QUEUE_DEPTH.set(len(self._pending))
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    @staticmethod
+    def accepted_mimetypes(accept) -> List[str]:
+        """ Mimetypes listed explicitly in a parsed ``Accept`` header, wildcards don't tell whether a format decodes. """
+        return [value for value, quality in accept if quality > 0 and "*" not in value]
@@ -0,0 +1,147 @@
+"""
+Fields the API adds to the gunicorn access log, the request id and matched endpoint returned as response headers that
+``access_log_format`` logs along with the request duration, and the parsing of the log for ``flask latency-report``.
+"""
+import gzip
+import math
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from flask import Flask, Response, g, request
+
+REQUEST_ID_HEADER = "X-Request-Id"
+ENDPOINT_HEADER = "X-Endpoint"
+# ids set by the reverse proxy, e.g. nginx's $request_id, are kept if they look like one
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# access_log_format of gunicorn_conf.py, the duration, request id and endpoint are missing from older lines
+LINE = re.compile(r'(?P<client>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<target>\S+)[^"]*" '
+                  r'(?P<status>\d{3}) (?P<size>\S+) "(?P<referer>[^"]*)" "(?P<agent>[^"]*)"'
+                  r'(?: (?P<duration>\d+) (?P<request_id>\S+) (?P<endpoint>\S+))?')
+TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+
+class RequestIds:
+    """
+    Identifies every request with the ``X-Request-Id`` set by the reverse proxy, or a new one, kept in
+    ``g.request_id`` and returned with the matched endpoint as the ``X-Request-Id`` and ``X-Endpoint`` response
+    headers for gunicorn to log.
+    """
+
+    def init_app(self, app: Flask):
+        app.before_request(self._start)
+        app.after_request(self._add_headers)
+
+    def _start(self):
+        g.request_start = time.perf_counter()
+        request_id = request.headers.get(REQUEST_ID_HEADER, "")
+        g.request_id = request_id if VALID_REQUEST_ID.match(request_id) else uuid.uuid4().hex
+
+    def _add_headers(self, rsp: Response) -> Response:
+        rsp.headers[REQUEST_ID_HEADER] = g.get("request_id", "-")
+        rsp.headers[ENDPOINT_HEADER] = request.endpoint or "unmatched"
+        return rsp
+
+
+@dataclass
+class AccessLogEntry:
+    client: str
+    agent: str
+    time: datetime
+    method: str
+    target: str
+    status: int
+    # seconds, None for lines logged before the duration was
+    duration: Optional[float] = None
+    request_id: Optional[str] = None
+    endpoint: Optional[str] = None
+
+
+def parse_access_log(lines: Iterable[str]) -> Iterator[AccessLogEntry]:
+    """ Entries of the access log, lines in another format are skipped. """
+    for line in lines:
+        if (match := LINE.match(line)) is None:
+            continue
+        yield AccessLogEntry(client=match["client"], agent=match["agent"],
+                             time=datetime.strptime(match["time"], TIME_FORMAT), method=match["method"],
+                             target=match["target"], status=int(match["status"]),
+                             duration=int(match["duration"]) / 1_000_000 if match["duration"] else None,
+                             request_id=match["request_id"], endpoint=match["endpoint"])
+
+
+def read_access_logs(paths: Iterable[str]) -> Iterator[AccessLogEntry]:
+    """ Entries of the access logs, rotated ones compressed with gzip included. """
+    for path in paths:
+        with (gzip.open(path, "rt") if path.endswith(".gz") else open(path)) as f:
+            yield from parse_access_log(f)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """ Nearest-rank percentile, ``p`` between 0 and 100, shared with the benchmarks so their reports agree. """
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class EndpointLatency:
+    endpoint: str
+    requests: int
+    client_errors: int
+    server_errors: int
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+    @property
+    def error_rate(self) -> float:
+        """ Share of the requests the API failed, 5xx. """
+        return self.server_errors / self.requests
+
+
+@dataclass
+class LatencyReport:
+    endpoints: List[EndpointLatency] = field(default_factory=list)
+    slowest: List[AccessLogEntry] = field(default_factory=list)
+    # lines in the window logged without a duration
+    without_duration: int = 0
+
+
+def latency_report(entries: Iterable[AccessLogEntry], *, since: datetime = None, until: datetime = None,
+                   endpoint: str = None, slowest: int = 10) -> LatencyReport:
+    """
+    Latency percentiles, in seconds, and error counts of each endpoint, busiest first, and the ``slowest`` requests of
+    the ``[since, until)`` window.
+    """
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, List[int]] = {}
+    timed, without_duration = [], 0
+    for entry in entries:
+        if (since and entry.time < since) or (until and entry.time >= until):
+            continue
+        if endpoint and entry.endpoint != endpoint:
+            continue
+        if entry.duration is None:
+            without_duration += 1
+            continue
+        durations.setdefault(entry.endpoint, []).append(entry.duration)
+        counts = errors.setdefault(entry.endpoint, [0, 0])
+        counts[0] += 400 <= entry.status < 500
+        counts[1] += entry.status >= 500
+        timed.append(entry)
+
+    report = LatencyReport(without_duration=without_duration,
+                           slowest=sorted(timed, key=lambda e: e.duration, reverse=True)[:slowest])
+    for name, values in durations.items():
+        report.endpoints.append(EndpointLatency(endpoint=name, requests=len(values), client_errors=errors[name][0],
+                                                server_errors=errors[name][1], p50=percentile(values, 50),
+                                                p95=percentile(values, 95), p99=percentile(values, 99),
+                                                max=max(values)))
+    report.endpoints.sort(key=lambda e: e.requests, reverse=True)
+    return report
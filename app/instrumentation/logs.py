@@ -0,0 +1,232 @@
+"""
+Logging of the ``app`` loggers through a queue: request threads only enrich records with the request they were logged
+in and enqueue them, a listener thread formats them as JSON lines and does the file or stdout I/O.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from typing import Callable, Dict, Optional
+
+from flask import Flask, g, has_request_context, request
+from flask.logging import default_handler
+
+from app.instrumentation.metrics import LOG_RECORDS_DROPPED
+
+LOGGER = "app"
+# attributes every record has, the others were passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+TEXT_FORMAT = "[%(asctime)s] %(levelname)s %(request_id)s in %(name)s: %(message)s"
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Adds the request id, member id, endpoint, time since the request started and SQL statements executed so far to the
+    records logged during a request, on the request thread as the listener has no request context. Fields passed with
+    ``extra=`` are kept.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not has_request_context():
+            return True
+        fields = {"request_id": g.get("request_id"), "member_id": g.get("current_member_id"),
+                  "endpoint": request.endpoint, "method": request.method, "path": request.path}
+        if (start := g.get("request_start")) is not None:
+            fields["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        if (stats := g.get("query_stats")) is not None:
+            fields["sql_statements"] = stats.statements
+        for name, value in fields.items():
+            if not hasattr(record, name):
+                setattr(record, name, value)
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps the debug records of ``rate`` of the requests, all of a request or none, and of the records logged outside
+    requests. Other levels are always kept.
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        if request_id := getattr(record, "request_id", None):
+            return zlib.crc32(request_id.encode()) < self.rate * 2 ** 32
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """ A JSON object per line with the time, level, logger, message, exception and any other field of the record. """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+                 "level": record.levelname, "logger": record.name, "message": record.getMessage()}
+        entry.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        return super().format(record)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """ Writes to the current ``sys.stdout``, which test runners capturing it replace. """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+
+class _ExcludeLoggers(logging.Filter):
+    def __init__(self, names):
+        super().__init__()
+        self.names = tuple(names)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not any(record.name == name or record.name.startswith(name + ".") for name in self.names)
+
+
+class _RequestQueueHandler(QueueHandler):
+    """ Enqueues without blocking, records are dropped once the queue is full. """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the message is merged and the exception rendered here, arguments may not be safe to use from another thread
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class LogPipeline:
+    """
+    Sends the records of the ``app`` loggers through a queue of ``queue_size`` to a thread writing them to ``path``, or
+    stdout, as JSON lines or ``text``. Debug records are logged for ``debug_sample_rate`` of the requests. Loggers
+    given an output of their own with :meth:`route` are written by the same thread to that output only.
+
+    :param level: Level of the ``app`` loggers.
+    :type level: str
+    :param path: File the records are appended to, reopened when rotated, empty for stdout.
+    :type path: str
+    :param log_format: ``json`` or ``text``.
+    :type log_format: str
+    :param queue_size: Records waiting for the logging thread before new ones are dropped.
+    :type queue_size: int
+    :param debug_sample_rate: Share of the requests whose debug records are logged.
+    :type debug_sample_rate: float
+    """
+
+    def __init__(self, *, level: str = "INFO", path: str = "", log_format: str = "json", queue_size: int = 10000,
+                 debug_sample_rate: float = 1.0):
+        self.level = level
+        self.path = path
+        self.log_format = log_format
+        self.queue_size = queue_size
+        self.debug_sample_rate = debug_sample_rate
+        self._handler: Optional[QueueHandler] = None
+        self._listener: Optional[QueueListener] = None
+        self._routes: Dict[str, Callable[[], logging.Handler]] = {}
+        self._fork_hook = False
+
+    def init_app(self, app: Flask):
+        self.level = "DEBUG" if app.debug else app.config["LOG_LEVEL"].upper()
+        self.path = app.config["LOG_FILE"]
+        self.log_format = app.config["LOG_FORMAT"]
+        self.queue_size = app.config["LOG_QUEUE_SIZE"]
+        self.debug_sample_rate = 1.0 if app.debug else app.config["LOG_DEBUG_SAMPLE_RATE"]
+        # the records reach the queue through the app logger too
+        app.logger.removeHandler(default_handler)
+        self.start()
+        if not self._fork_hook:
+            # threads don't survive fork, e.g. gunicorn --preload, the workers start their own
+            os.register_at_fork(after_in_child=self._restart_in_child)
+            atexit.register(self.stop)
+            self._fork_hook = True
+
+    def route(self, name: str, output: Optional[Callable[[], logging.Handler]]):
+        """
+        Write the records of the logger ``name`` and its children with the handler ``output`` returns, created again
+        on every (re)start, instead of the pipeline output, or with the pipeline output again if ``None``. Restarts a
+        running pipeline.
+        """
+        if output is None and name not in self._routes:
+            return
+        if output is None:
+            del self._routes[name]
+        else:
+            self._routes[name] = output
+        if self._listener is not None:
+            self.start()
+
+    def start(self):
+        """ (Re)start the listener and attach the queue to the ``app`` logger, stopping the previous one. """
+        self.stop()
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            output = WatchedFileHandler(self.path, delay=True)
+        else:
+            output = _StdoutHandler()
+        output.setFormatter(_TextFormatter(TEXT_FORMAT) if self.log_format == "text" else JsonFormatter())
+        output.addFilter(_ExcludeLoggers(self._routes))
+        outputs = [output]
+        for name, route in self._routes.items():
+            outputs.append(routed := route())
+            routed.addFilter(logging.Filter(name))
+
+        records = queue.Queue(self.queue_size)
+        self._handler = _RequestQueueHandler(records)
+        self._handler.addFilter(RequestContextFilter())
+        self._handler.addFilter(DebugSampler(self.debug_sample_rate))
+        self._listener = QueueListener(records, *outputs)
+        self._listener.start()
+
+        logger = logging.getLogger(LOGGER)
+        logger.addHandler(self._handler)
+        logger.setLevel(self.level)
+
+    def stop(self):
+        """ Detach the queue and wait for the listener to write the records left. """
+        if self._handler is not None:
+            logging.getLogger(LOGGER).removeHandler(self._handler)
+            self._handler = None
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
+    def _restart_in_child(self):
+        if self._listener is None:
+            return
+        # the parent writes the records it queued, the copies and the dead listener thread are left behind
+        self._listener = None
+        self.start()
@@ -0,0 +1,122 @@
+"""
+Prometheus metrics of the API, served at ``/metrics``.
+
+Gunicorn workers are separate processes each with their own samples, with ``PROMETHEUS_MULTIPROC_DIR`` set, by
+``gunicorn_conf.py``, before ``prometheus_client`` is imported they write them to files in that directory which
+``/metrics`` aggregates, whichever worker answers the scrape.
+"""
+import os
+import time
+
+from flask import Flask, Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import generate_latest, multiprocess
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "hs_api_http_request_duration_seconds",
+    "Latency of the requests handled by the API, until the response is returned to the WSGI server",
+    ["blueprint", "endpoint", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+
+HTTP_RESPONSES = Counter(
+    "hs_api_http_responses_total",
+    "Responses returned by the API by status code",
+    ["blueprint", "endpoint", "method", "status"],
+)
+
+DB_REQUEST_DURATION = Histogram(
+    "hs_api_db_request_duration_seconds",
+    "Time spent running SQL statements per request",
+    ["endpoint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+DB_REQUEST_STATEMENTS = Histogram(
+    "hs_api_db_request_statements",
+    "SQL statements executed per request",
+    ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+
+SESSION_STORE_DURATION = Histogram(
+    "hs_api_session_store_duration_seconds",
+    "Latency of loading and saving server side sessions",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+FENIX_REQUEST_DURATION = Histogram(
+    "hs_api_fenix_request_duration_seconds",
+    "Latency of the requests made to Fénix, including retries",
+    ["operation", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+BCRYPT_QUEUE_DEPTH = Gauge(
+    "hs_api_bcrypt_queue_depth",
+    "Password hashes and verifications waiting for a free bcrypt thread",
+    multiprocess_mode="livesum",
+)
+
+IMAGES_TRANSCODE_QUEUE_DEPTH = Gauge(
+    "hs_api_images_transcode_queue_depth",
+    "Image encodings scheduled or running",
+    multiprocess_mode="livesum",
+)
+
+CACHE_REQUESTS = Counter(
+    "hs_api_cache_requests_total",
+    "Lookups of the API caches, image variants and encodings rendered on disk and client revalidations",
+    ["cache", "result"],
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "hs_api_log_records_dropped_total",
+    "Log records dropped as the queue to the logging thread was full",
+)
+
+
+def render_metrics() -> Response:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+class RequestMetrics:
+    """
+    Observes the latency and status code of every request, with the SQL statements and database time counted by
+    ``QueryCounter``. Requests matching no route are labelled ``unmatched`` instead of their path, every label value
+    is a distinct time series.
+    """
+
+    def init_app(self, app: Flask):
+        app.before_request(self._start)
+        app.after_request(self._observe_response)
+        app.teardown_request(self._observe_error)
+
+    def _start(self):
+        g.metrics_start = time.perf_counter()
+
+    def _observe_response(self, rsp: Response) -> Response:
+        self._observe(rsp.status_code)
+        return rsp
+
+    def _observe_error(self, exc):
+        if exc is not None:
+            self._observe(500)  # unhandled, after_request functions didn't run
+
+    def _observe(self, status: int):
+        if (start := g.pop("metrics_start", None)) is None:
+            return
+        blueprint, endpoint = request.blueprint or "", request.endpoint or "unmatched"
+        HTTP_REQUEST_DURATION.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - start)
+        HTTP_RESPONSES.labels(blueprint, endpoint, request.method, str(status)).inc()
+        if (stats := g.get("query_stats")) is not None:
+            DB_REQUEST_DURATION.labels(endpoint).observe(stats.duration)
+            DB_REQUEST_STATEMENTS.labels(endpoint).observe(stats.statements)
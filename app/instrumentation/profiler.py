@@ -0,0 +1,126 @@
+import io
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List
+
+from flask import Flask, Response, current_app, g, request
+
+from app.auth.utils import current_roles
+
+HEADER = "X-Profile"
+QUERY_FLAG = "_profile"
+
+
+@dataclass
+class ProfileInfo:
+    name: str
+    endpoint: str
+    created: float
+    total_time: float
+    calls: int
+
+
+def profile_authorized_request():
+    """ Called by the auth controller once a request passed its login and permission checks. """
+    if (profiler := current_app.extensions.get("request_profiler")) is not None:
+        profiler.start()
+
+
+class RequestProfiler:
+    """
+    Profiles single requests with cProfile on demand, those sent with an ``X-Profile: 1`` header or ``?_profile=1``
+    by a member with one of ``roles``. Captures are saved in ``path`` as ``<timestamp>-<endpoint>.prof``, named in the
+    ``X-Profile`` response header, and the oldest are deleted past ``max_profiles``.
+
+    The profiler starts once the request is authorized, see :func:`profile_authorized_request`, so anonymous clients
+    and members without one of ``roles`` can't make requests more expensive, and only covers the controller.
+    cProfile only traces the request thread.
+
+    :param path: Directory the captures are saved in.
+    :type path: str
+    :param roles: Roles allowed to profile requests, none disables profiling.
+    :type roles: Iterable[str]
+    :param max_profiles: Number of captures kept, 0 keeps all of them.
+    :type max_profiles: int
+    """
+
+    def __init__(self, *, path: str = "", roles: Iterable[str] = (), max_profiles: int = 100):
+        self.path = path
+        self.roles = set(roles)
+        self.max_profiles = max_profiles
+
+    def init_app(self, app: Flask):
+        self.path = app.config["PROFILES_PATH"]
+        self.roles = set(app.config["PROFILING_ROLES"])
+        self.max_profiles = app.config["PROFILES_MAX"]
+        app.extensions["request_profiler"] = self
+        app.after_request(self._stop)
+        app.teardown_request(self._discard)
+
+    def _requested(self) -> bool:
+        return bool(self.roles) and "1" in (request.headers.get(HEADER), request.args.get(QUERY_FLAG))
+
+    def start(self):
+        """ Start profiling the request if it asks to and the member it was authorized for has one of ``roles``. """
+        if not self._requested() or not self.roles.intersection(current_roles) or "profile" in g:
+            return
+        import cProfile  # on demand, like the profiles
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is already tracing this thread
+            return
+        g.profile = profile
+
+    def _stop(self, rsp: Response) -> Response:
+        if (profile := g.pop("profile", None)) is None:
+            return rsp
+        profile.disable()
+        os.makedirs(self.path, exist_ok=True)
+        endpoint = re.sub(r"[^A-Za-z0-9_.]", "_", request.endpoint or "unmatched")
+        name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{endpoint}.prof"
+        profile.dump_stats(os.path.join(self.path, name))
+        self._prune()
+        rsp.headers[HEADER] = name
+        return rsp
+
+    def _discard(self, exc):
+        if (profile := g.pop("profile", None)) is not None:
+            profile.disable()  # unhandled error, after_request functions didn't run
+
+    def _prune(self):
+        if not self.max_profiles:
+            return
+        for name in sorted(self._names())[:-self.max_profiles]:
+            os.remove(os.path.join(self.path, name))
+
+    def _names(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return [name for name in os.listdir(self.path) if name.endswith(".prof")]
+
+    def list_profiles(self) -> List[ProfileInfo]:
+        """ Saved captures, newest first. """
+        import pstats
+        profiles = []
+        for name in sorted(self._names(), reverse=True):
+            stats = pstats.Stats(os.path.join(self.path, name))
+            profiles.append(ProfileInfo(name=name, endpoint=name[:-len(".prof")].split("-", 1)[-1],
+                                        created=os.path.getmtime(os.path.join(self.path, name)),
+                                        total_time=stats.total_tt, calls=stats.total_calls))
+        return profiles
+
+    def summarize(self, name: str, *, sort: str = "cumulative", limit: int = 25) -> str:
+        """
+        Top ``limit`` functions of a capture by ``sort``, a ``pstats`` sort key.
+
+        :raises FileNotFoundError: If there's no capture named ``name``.
+        """
+        if os.path.basename(name) != name or not name.endswith(".prof"):
+            raise FileNotFoundError(f"Profile '{name}' not found")
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(os.path.join(self.path, name), stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
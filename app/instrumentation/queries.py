@@ -0,0 +1,114 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Tuple
+
+from flask import Flask, Response, g, request
+from sqlalchemy import Engine, event
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """ SQL statements executed while it was being counted and the time spent running them. """
+    statements: int = 0
+    duration: float = 0.0
+    # text of the statements, only kept when asked for as it may hold a lot of them
+    record: bool = False
+    executed: List[str] = field(default_factory=list)
+
+
+_active: ContextVar[Tuple[QueryStats, ...]] = ContextVar("active_query_stats", default=())
+
+
+@contextmanager
+def count_queries(*, record: bool = False) -> Iterator[QueryStats]:
+    """
+    Count the statements executed by the current thread, or task, within the block, blocks may be nested.
+
+    :param record: Keep the text of the statements, e.g. to show them when a budget is exceeded.
+    """
+    stats = QueryStats(record=record)
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if active := _active.get():
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+        for stats in active:
+            stats.statements += 1
+            if stats.record:
+                stats.executed.append(statement)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if (active := _active.get()) and conn.info.get("query_start"):
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        for stats in active:
+            stats.duration += duration
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # failed statements don't reach after_cursor_execute
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+class QueryCounter:
+    """
+    Counts the SQL statements each request executes and the time spent in the database, logged with every request and
+    as a warning once a request runs more than ``budget`` statements, usually a query per item of a list, N+1.
+
+    With ``headers`` the counts are also returned as ``X-SQL-Statements`` and ``X-SQL-Duration`` response headers,
+    meant for development only.
+
+    :param budget: Statements a request may execute before it's logged as a warning, 0 to disable.
+    :type budget: int
+    :param headers: Return the counts as response headers.
+    :type headers: bool
+    """
+
+    def __init__(self, *, budget: int = 20, headers: bool = False):
+        self.budget = budget
+        self.headers = headers
+
+    def init_app(self, app: Flask):
+        self.budget = app.config["SQL_STATEMENT_BUDGET"]
+        self.headers = app.config["SQL_STATS_HEADERS"] or app.debug
+        app.before_request(self._start)
+        app.after_request(self._report)
+        app.teardown_request(self._stop)
+
+    def _start(self):
+        g.query_stats_context = count_queries()
+        g.query_stats = g.query_stats_context.__enter__()
+
+    def _report(self, rsp: Response) -> Response:
+        if (stats := g.get("query_stats")) is None:
+            return rsp
+        extra = {"endpoint": request.endpoint, "sql_statements": stats.statements,
+                 "sql_duration_ms": round(stats.duration * 1000, 3)}
+        if self.budget and stats.statements > self.budget:
+            logger.warning(f"{request.method} {request.path} executed {stats.statements} SQL statements, over the "
+                           f"budget of {self.budget}", extra=extra)
+        else:
+            logger.debug(f"{request.method} {request.path} executed {stats.statements} SQL statements in "
+                         f"{extra['sql_duration_ms']}ms", extra=extra)
+        if self.headers:
+            rsp.headers["X-SQL-Statements"] = str(stats.statements)
+            rsp.headers["X-SQL-Duration"] = f"{stats.duration * 1000:.3f}"
+        return rsp
+
+    def _stop(self, exc):
+        if (context := g.pop("query_stats_context", None)) is not None:
+            context.__exit__(None, None, None)
@@ -0,0 +1,123 @@
+"""
+Phase timers of the request, reported in a ``Server-Timing`` header browser devtools show as a breakdown of the
+request time.
+
+Phases may overlap, e.g. ``auth`` includes the query loading the logged in member, also counted in ``db``.
+"""
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Iterable
+
+from flask import Flask, Response, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+from app.auth.utils import current_roles
+
+DESCRIPTIONS = {
+    "session": "Session load",
+    "auth": "Authentication and authorization",
+    "validation": "Request validation",
+    "db": "SQL statements",
+    "schema": "Response schemas",
+    "json": "JSON encoding",
+    "app": "Total in the app",
+}
+
+
+def _timings() -> dict | None:
+    if not has_request_context():
+        return None
+    if "server_timing" not in g:
+        g.server_timing = {}
+        g.server_timing_started = {}
+    return g.server_timing
+
+
+def start_phase(name: str):
+    """ Start, or resume, timing ``name`` until :func:`stop_phase`, if it isn't running already. """
+    if _timings() is not None:
+        g.server_timing_started.setdefault(name, time.perf_counter())
+
+
+def stop_phase(name: str):
+    if (timings := _timings()) is not None and (start := g.server_timing_started.pop(name, None)) is not None:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def phase(name: str):
+    """ Time the block as part of ``name``, nested blocks of the same phase are counted once. """
+    running = has_request_context() and name in g.get("server_timing_started", {})
+    start_phase(name)
+    try:
+        yield
+    finally:
+        if not running:
+            stop_phase(name)
+
+
+def timed_phase(name: str):
+    """ Decorator timing the function as part of ``name``. """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_phase(name: str, duration: float):
+    if (timings := _timings()) is not None:
+        timings[name] = timings.get(name, 0.0) + duration
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """ Times encoding the values returned by the controllers as JSON responses. """
+
+    def response(self, *args, **kwargs) -> Response:
+        with phase("json"):
+            return super().response(*args, **kwargs)
+
+
+class ServerTiming:
+    """
+    Adds the ``Server-Timing`` header to the responses, for every request with ``enabled`` or for members with one of
+    ``roles`` only, it tells how the API is built.
+
+    :param enabled: Send the header on every response.
+    :type enabled: bool
+    :param roles: Roles the header is sent to when not enabled for everyone.
+    :type roles: Iterable[str]
+    """
+
+    def __init__(self, *, enabled: bool = False, roles: Iterable[str] = ()):
+        self.enabled = enabled
+        self.roles = set(roles)
+
+    def init_app(self, app: Flask):
+        self.enabled = app.config["SERVER_TIMING"]
+        self.roles = set(app.config["SERVER_TIMING_ROLES"])
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._start)
+        app.after_request(self._emit)
+
+    def _start(self):
+        start_phase("app")
+
+    def _emit(self, rsp: Response) -> Response:
+        if not self.enabled and not self.roles.intersection(current_roles):
+            return rsp
+        for name in list(g.get("server_timing_started", {})):
+            stop_phase(name)  # e.g. authentication that aborted the request
+
+        timings = dict(_timings())
+        if (stats := g.get("query_stats")) is not None:
+            timings["db"] = stats.duration
+        metrics = []
+        for name, duration in timings.items():
+            description = DESCRIPTIONS.get(name, name) + (f" ({stats.statements})" if name == "db" else "")
+            metrics.append(f'{name};dur={duration * 1000:.2f};desc="{description}"')
+        rsp.headers["Server-Timing"] = ", ".join(metrics)
+        return rsp
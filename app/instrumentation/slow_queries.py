@@ -0,0 +1,197 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+from typing import TYPE_CHECKING, Dict, List
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import Engine, event
+
+from app.instrumentation.logs import JsonFormatter
+
+if TYPE_CHECKING:
+    from app.instrumentation.logs import LogPipeline
+
+logger = logging.getLogger(__name__)
+
+# statements worth an EXPLAIN, others e.g. PRAGMA or COMMIT have no plan
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+REPOSITORIES_DIR = os.path.join("app", "repositories") + os.sep
+
+
+def normalize_sql(statement: str) -> str:
+    """ Statement on a single line with expanded ``IN`` lists collapsed, so repetitions of a query group together. """
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return re.sub(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)", "(?, ...)", statement)
+
+
+def parameter_shape(parameters, executemany: bool) -> str:
+    """ Types of the bound parameters, their values may be personal data or password hashes. """
+    if executemany:
+        return f"{len(parameters)} x {parameter_shape(parameters[0], False)}" if parameters else "[]"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in parameters or ()) + ")"
+
+
+def calling_repository_method() -> str | None:
+    """ ``Repository.method`` the statement was executed from, the nearest repository frame of the stack. """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if REPOSITORIES_DIR in frame.f_code.co_filename:
+            return frame.f_code.co_qualname
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog:
+    """
+    Logs the SQL statements running longer than ``threshold`` milliseconds as JSON lines to ``path``, with the
+    statement normalized, the types of its parameters, the route and repository method it was executed from and its
+    SQLite query plan. Records go through the queue of ``log_pipeline``, its thread writes them to the file.
+
+    Plans are captured once per normalized statement, the slowest ones tend to repeat, by a background thread on a
+    connection of its own so the request doesn't wait for them. Statements beyond ``MAX_PENDING`` waiting for their
+    plan are logged without, as are those of in-memory databases no other connection sees.
+
+    :param log_pipeline: Pipeline the records are queued to.
+    :type log_pipeline: ``app.instrumentation.logs.LogPipeline``
+    :param threshold: Duration in milliseconds from which a statement is logged, 0 disables the log.
+    :type threshold: float
+    :param path: Log file, rotated every 10 MiB keeping 5 old files.
+    :type path: str
+    """
+
+    MAX_BYTES = 10 * 1024 * 1024
+    BACKUP_COUNT = 5
+    MAX_PLANS = 256
+    MAX_PENDING = 64
+
+    def __init__(self, *, log_pipeline: "LogPipeline", threshold: float = 0, path: str = ""):
+        self.log_pipeline = log_pipeline
+        self.threshold = threshold
+        self.path = path
+        self._plans: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._executor = None  # lazily created, workers forked by gunicorn each get their own
+        self._pending = 0
+        self._fork_hook = False
+
+    def init_app(self, app: Flask, engines=()):
+        self.threshold = app.config["SLOW_QUERY_THRESHOLD_MS"]
+        self.path = app.config["SLOW_QUERY_LOG"]
+        self._plans = {}  # of another database
+        self.log_pipeline.route(logger.name, self._output if self.threshold else None)
+        if not self.threshold:
+            return
+        logger.setLevel(logging.INFO)  # whatever the level of the app logs
+        if not self._fork_hook:
+            # threads don't survive fork, e.g. gunicorn --preload
+            os.register_at_fork(after_in_child=self._reset_in_child)
+            self._fork_hook = True
+        for engine in engines:
+            self.listen(engine)
+
+    def listen(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _output(self) -> logging.Handler:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # opened on the first slow statement
+        handler = RotatingFileHandler(self.path, maxBytes=self.MAX_BYTES, backupCount=self.BACKUP_COUNT, delay=True)
+        handler.setFormatter(JsonFormatter())
+        return handler
+
+    def wait(self):
+        """ Wait for the statements waiting for their plan to be logged. """
+        with self._lock:
+            executor = self._executor
+        if executor is not None:
+            executor.submit(lambda: None).result()  # a single thread, queued after them
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    def _handle_error(self, context):
+        if context.connection is not None and context.connection.info.get("slow_query_start"):
+            context.connection.info["slow_query_start"].pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not (starts := conn.info.get("slow_query_start")):
+            return
+        duration = (time.perf_counter() - starts.pop()) * 1000
+        if duration < self.threshold:
+            return
+
+        normalized = normalize_sql(statement)
+        fields = {
+            "query_duration_ms": round(duration, 3),
+            "statement": normalized,
+            "parameters": parameter_shape(parameters, executemany),
+            "route": f"{request.method} {request.url_rule or request.path}" if has_request_context() else None,
+            "endpoint": request.endpoint if has_request_context() else None,
+            "repository": calling_repository_method(),
+        }
+        if has_request_context():
+            # logged from the background thread, which has no request context
+            fields.update(request_id=g.get("request_id"), member_id=g.get("current_member_id"))
+
+        if normalized in self._plans or not self._explainable(conn.engine, normalized):
+            self._log(fields, self._plans.get(normalized))
+            return
+        with self._lock:
+            if self._pending >= self.MAX_PENDING:
+                queued = False
+            else:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-plans")
+                self._pending += 1
+                self._executor.submit(self._explain, conn.engine, statement,
+                                      parameters[0] if executemany and parameters else parameters, fields)
+                queued = True
+        if not queued:
+            self._log(fields, None)
+
+    @staticmethod
+    def _explainable(engine: Engine, normalized: str) -> bool:
+        return (engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:")
+                and normalized.upper().startswith(EXPLAINABLE))
+
+    def _explain(self, engine: Engine, statement: str, parameters, fields: dict):
+        plan = None
+        try:
+            # a raw connection of the pool, its statements aren't instrumented
+            connection = engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                # rows of id, parent id, unused and the step, e.g. "SEARCH members USING INDEX ..."
+                cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+                plan = [row[3] for row in cursor.fetchall()]
+                cursor.close()
+            finally:
+                connection.close()
+            with self._lock:
+                if len(self._plans) >= self.MAX_PLANS:
+                    self._plans.pop(next(iter(self._plans)))
+                self._plans[fields["statement"]] = plan
+        except Exception as e:
+            plan = [f"EXPLAIN failed: {e}"]
+        finally:
+            self._log(fields, plan)
+            with self._lock:
+                self._pending -= 1
+
+    @staticmethod
+    def _log(fields: dict, plan: List[str] | None):
+        logger.info(f"Slow query of {fields['query_duration_ms']} ms", extra={**fields, "plan": plan})
+
+    def _reset_in_child(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
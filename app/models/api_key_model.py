@@ -0,0 +1,75 @@
+import hashlib
+import secrets
+from datetime import datetime, timezone
+from typing import List, TYPE_CHECKING
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, validates, relationship
+
+from app.extensions import db
+
+if TYPE_CHECKING:
+    from app.models.member_model import Member
+
+API_KEY_PREFIX = "hs_"
+
+
+def generate_api_key() -> str:
+    # 256 bits of entropy, a fast digest is enough to store it safely
+    return API_KEY_PREFIX + secrets.token_urlsafe(32)
+
+
+def hash_api_key(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class ApiKey(db.Model):
+    __tablename__ = "api_keys"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column()
+    prefix: Mapped[str] = mapped_column()
+    key_hash: Mapped[str] = mapped_column(unique=True, index=True)
+    _permissions: Mapped[str] = mapped_column("permissions")
+    created_at: Mapped[str] = mapped_column()
+
+    member_id: Mapped[int] = mapped_column(ForeignKey("members.id", ondelete="CASCADE"))
+
+    member: Mapped["Member"] = relationship("Member", back_populates="api_keys", lazy="joined")
+
+    def __init__(self, *, member: "Member", key: str, name=None, permissions=None):
+        self.member = member
+        self.name = name
+        self.permissions = permissions
+        self.prefix = key[:len(API_KEY_PREFIX) + 6]
+        self.key_hash = hash_api_key(key)
+        self.created_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    @property
+    def permissions(self) -> List[str]:
+        if "," not in self._permissions:
+            return [] if self._permissions == "" else [self._permissions]
+        return self._permissions.split(",")
+
+    @permissions.setter
+    def permissions(self, v: List[str]):
+        if v is None:
+            self._permissions = ""
+            return
+        if not isinstance(v, list):
+            raise ValueError(f"Invalid permissions type: '{type(v)}'")
+        self._permissions = ",".join(v)
+
+    @validates("name")
+    def validate_name(self, k, v):
+        if not isinstance(v, str):
+            raise ValueError(f"Invalid name type: '{type(v)}'")
+        if not 1 <= len(v) <= 64:
+            raise ValueError(f"Invalid name length, minimum 1 and maximum 64 characters: '{v}'")
+        return v
+
+    def grants(self, permission: str) -> bool:
+        return permission in self.permissions
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(id={self.id!r}, name={self.name!r}, prefix={self.prefix!r})>"
@@ -0,0 +1,44 @@
+from sqlalchemy import CheckConstraint, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.extensions import db
+
+MIMETYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg"
+}
+
+
+class Image(db.Model):
+    """ Index entry of a stored member or project image, the file itself lives under ``IMAGES_PATH``. """
+    __tablename__ = "images"
+    __table_args__ = (
+        CheckConstraint("(member_id IS NULL) != (project_id IS NULL)", name="ck_images_single_owner"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    path: Mapped[str] = mapped_column(index=True)
+    mimetype: Mapped[str] = mapped_column()
+    size: Mapped[int] = mapped_column()
+    content_hash: Mapped[str] = mapped_column()
+    mtime: Mapped[float] = mapped_column()
+    # tiny blurred thumbnail as a data URI, only loaded for the images manifest
+    placeholder: Mapped[str | None] = mapped_column(nullable=True, deferred=True)
+
+    member_id: Mapped[int] = mapped_column(ForeignKey("members.id", ondelete="CASCADE"), nullable=True, unique=True)
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id", ondelete="CASCADE"), nullable=True, unique=True)
+
+    def __init__(self, *, path=None, mimetype=None, size=None, content_hash=None, mtime=None, placeholder=None,
+                 member_id=None, project_id=None):
+        self.path = path
+        self.mimetype = mimetype
+        self.size = size
+        self.content_hash = content_hash
+        self.mtime = mtime
+        self.placeholder = placeholder
+        self.member_id = member_id
+        self.project_id = project_id
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}(id={self.id!r}, path={self.path!r}, content_hash={self.content_hash!r})>"
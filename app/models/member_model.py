@@ -1,21 +1,16 @@
 import re
 from typing import List, TYPE_CHECKING
 
-import bcrypt
 from sqlalchemy.orm import Mapped, mapped_column, validates, relationship
 
-from app.extensions import db
+from app.extensions import db, password_hasher, image_url_signer
 from app.utils import is_valid_datestring
 
 if TYPE_CHECKING:
     from app.schemas.member_schema import MemberSchema
     from app.models.project_participation_model import ProjectParticipation
-
-def _hash_password(password) -> str:
-    # salted encrypted password
-    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-    return hashed.decode("utf-8")
-
+    from app.models.api_key_model import ApiKey
+    from app.models.image_model import Image
 
 class Member(db.Model):
     __tablename__ = "members"
@@ -40,9 +35,15 @@ class Member(db.Model):
                                                                                 cascade="all, delete-orphan",
                                                                                 passive_deletes=True)
 
+    api_keys: Mapped[List["ApiKey"]] = relationship("ApiKey", back_populates="member", cascade="all, delete-orphan",
+                                                    passive_deletes=True)
+
+    image: Mapped["Image"] = relationship("Image", uselist=False, lazy="joined", cascade="all, delete-orphan",
+                                          passive_deletes=True)
+
     @classmethod
     def from_schema(cls, schema: "MemberSchema"):
-        return cls(**schema.model_dump())
+        return cls(**schema.model_dump(exclude={"image_hash", "image_url"}))
 
     def __init__(self, *, ist_id=None, username=None, name=None, email=None, password=None, member_number=None,
                  course=None, roles=None, join_date=None, exit_date=None, description=None, extra=None):
@@ -72,7 +73,7 @@ class Member(db.Model):
             raise ValueError(f"Invalid password type: '{type(v)}'")
         if not 6 <= len(v) <= 256:
             raise ValueError("Invalid password length, minimum 6 and maximum 256 characters")
-        self._password = _hash_password(v)
+        self._password = password_hasher.hash(v)  # salted encrypted password
 
     @property
     def roles(self) -> List[str]:
@@ -89,6 +90,16 @@ class Member(db.Model):
             raise ValueError(f"Invalid roles type: '{type(v)}'")
         self._roles = ",".join(v)
 
+    @property
+    def image_hash(self) -> str | None:
+        """ Content hash of the member image, versions the image URL so it can be cached. """
+        return self.image.content_hash if self.image is not None else None
+
+    @property
+    def image_url(self) -> str | None:
+        """ Short lived signed URL of the member image, served without the session, see ``ImageUrlSigner``. """
+        return image_url_signer.url_for(self.image)
+
     @validates("ist_id")
     def validate_ist_id(self, k, v):
         if v is None:
@@ -158,7 +169,10 @@ class Member(db.Model):
         return v
 
     def matches_password(self, password: str):
-        return bcrypt.checkpw(password.encode("utf-8"), self.password.encode("utf-8"))
+        return password_hasher.verify(password, self.password)
+
+    def password_needs_rehash(self) -> bool:
+        return self.password is not None and password_hasher.needs_rehash(self.password)
 
     def __repr__(self):
         return f"<{self.__class__.__name__}({', '.join(f'{k}={v!r}' for k, v in self.__dict__.items())})>"
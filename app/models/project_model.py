@@ -2,13 +2,14 @@ from typing import TYPE_CHECKING, List
 from sqlalchemy.orm import Mapped, mapped_column, validates, relationship
 from sqlalchemy import select, Enum
 
-from app.extensions import db
+from app.extensions import db, image_url_signer
 
 from app.utils import is_valid_datestring, slugify, ProjectStateEnum
 
 if TYPE_CHECKING:
     from app.schemas.project_schema import ProjectSchema
     from app.models.project_participation_model import ProjectParticipation
+    from app.models.image_model import Image
 
 
 class Project(db.Model):
@@ -28,11 +29,14 @@ class Project(db.Model):
                                                                                 cascade="all, delete-orphan",
                                                                                 passive_deletes=True)
 
+    image: Mapped["Image"] = relationship("Image", uselist=False, lazy="joined", cascade="all, delete-orphan",
+                                          passive_deletes=True)
+
     @classmethod
     def from_schema(cls, schema: "ProjectSchema"):
         data = schema.model_dump()
-        if "slug" in data:
-            del data["slug"]
+        for read_only in ("slug", "image_hash", "image_url"):
+            data.pop(read_only, None)
         return cls(**data)
 
     def __init__(self, *, name=None, state=None, start_date=None, end_date=None, description=None):
@@ -51,6 +55,16 @@ class Project(db.Model):
         self._name = self.validate_name("name", value)
         self.slug = slugify(value)
 
+    @property
+    def image_hash(self) -> str | None:
+        """ Content hash of the project image, versions the image URL so it can be cached. """
+        return self.image.content_hash if self.image is not None else None
+
+    @property
+    def image_url(self) -> str | None:
+        """ Short lived signed URL of the project image, served without the session, see ``ImageUrlSigner``. """
+        return image_url_signer.url_for(self.image)
+
     @validates("name")
     def validate_name(self, k, v):
         if not isinstance(v, str):
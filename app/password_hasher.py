@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from flask import Flask
+
+from app.instrumentation.metrics import BCRYPT_QUEUE_DEPTH
+
+
+class PasswordHasherBusyError(Exception):
+    """ Raised when every worker is busy and the waiting queue is full. """
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords with bcrypt on a small bounded thread pool, bcrypt releases the GIL so
+    the pool caps how many cores login bursts can take from the other requests of the worker.
+
+    Calls beyond ``max_workers`` wait in a queue of at most ``max_queue`` calls, any call beyond that fails
+    immediately with :class:`PasswordHasherBusyError` instead of stalling the request thread.
+
+    :param rounds: bcrypt cost factor for new hashes, hashes with a different cost should be rehashed.
+    :type rounds: int
+    :param max_workers: Number of threads running bcrypt.
+    :type max_workers: int
+    :param max_queue: Number of calls allowed to wait for a free thread.
+    :type max_queue: int
+    """
+
+    def __init__(self, *, rounds: int = 12, max_workers: int = 2, max_queue: int = 32):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+        self.configure(rounds=rounds, max_workers=max_workers, max_queue=max_queue)
+
+    def init_app(self, app: Flask):
+        self.configure(rounds=app.config["BCRYPT_ROUNDS"], max_workers=app.config["BCRYPT_MAX_WORKERS"],
+                       max_queue=app.config["BCRYPT_MAX_QUEUE"])
+
+    def configure(self, *, rounds: int = None, max_workers: int = None, max_queue: int = None):
+        with self._lock:
+            self.rounds = rounds if rounds is not None else self.rounds
+            self.max_workers = max_workers if max_workers is not None else self.max_workers
+            self.max_queue = max_queue if max_queue is not None else self.max_queue
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None  # lazily created, workers don't exist until the first hash
+            self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+
+    @property
+    def queue_depth(self) -> int:
+        """ Number of calls waiting for a free thread. """
+        return max(0, self._in_flight - self.max_workers)
+
+    def hash(self, password: str) -> str:
+        hashed = self._run(bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt(self.rounds))
+        return hashed.decode("utf-8")
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._run(bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        # bcrypt hashes are formatted as $<version>$<cost>$<salt+hash>
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def _run(self, fn, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusyError("Too many password operations in progress")
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+                executor = self._executor
+                self._in_flight += 1
+                BCRYPT_QUEUE_DEPTH.set(self.queue_depth)
+            try:
+                return executor.submit(fn, *args).result()
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    BCRYPT_QUEUE_DEPTH.set(self.queue_depth)
+        finally:
+            slots.release()
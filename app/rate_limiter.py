@@ -0,0 +1,164 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from typing import TYPE_CHECKING, Callable, Dict, Tuple
+
+from flask import request
+from werkzeug.exceptions import TooManyRequests
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# refills the bucket for the elapsed time and takes one token, atomically
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / refill_rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+@lru_cache(maxsize=64)
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """
+    Parse rates formatted as ``<count>/<period>``, e.g. ``10/minute``, into the bucket capacity and its refill
+    rate in tokens per second.
+
+    :raises ValueError: If the rate is malformed.
+    """
+    count, _, period = rate.partition("/")
+    if not count.strip().isdigit() or int(count) < 1 or period.strip() not in PERIODS:
+        raise ValueError(f"Invalid rate '{rate}', expected '<count>/<{'|'.join(PERIODS)}>'")
+    return int(count), int(count) / PERIODS[period.strip()]
+
+
+def client_ip() -> str | None:
+    """ Rate limit key by client address, see ``PROXY_FIX_X_FOR`` when running behind a reverse proxy. """
+    return request.remote_addr
+
+
+def json_field(field: str) -> Callable[[], str | None]:
+    """ Rate limit key by a field of the JSON body, e.g. the username in a login attempt. """
+    def key():
+        if not isinstance(body := request.get_json(silent=True), dict) or not isinstance(body.get(field), str):
+            return None
+        return body[field].lower()
+    key.__name__ = field
+    return key
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter for controllers. Each bucket holds up to ``capacity`` tokens, refilled continuously,
+    and every request takes one token or is rejected with ``429 Too Many Requests`` and a ``Retry-After`` header.
+
+    Buckets are kept in Redis when a client is provided, shared by every worker, and in process memory otherwise
+    or while Redis is unreachable. In memory, each limit keeps its ``MAX_LOCAL_BUCKETS`` most recently used buckets.
+
+    Example::
+
+        @bp.route("/login", methods=["POST"])
+        @rate_limiter.limit("login-ip", key=client_ip, rate="30/minute")
+        def login():
+            ...
+
+    :param redis: Optional Redis client to keep the buckets in.
+    :type redis: ``redis.Redis``
+    :param key_prefix: Prefix of the Redis keys.
+    :type key_prefix: str
+    :param clock: Time source, in seconds.
+    :type clock: function
+    """
+
+    MAX_LOCAL_BUCKETS = 10000
+
+    def __init__(self, *, redis: "Redis | None" = None, key_prefix: str = "hs-api:rate-limit:", clock=time.time):
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self.clock = clock
+        self._script = redis.register_script(_TOKEN_BUCKET_SCRIPT) if redis is not None else None
+        self._buckets: Dict[str, OrderedDict[str, Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, name: str, *, key: Callable[[], str | None], rate: str | Callable[[], str]):
+        """
+        Decorate controllers to rate limit them, the limit is checked before the controller does any work.
+
+        :param name: Name of the limit, buckets of different limits are independent.
+        :type name: str
+        :param key: Function returning the bucket key of the current request, e.g. :func:`client_ip`.
+            Requests without a key are not limited.
+        :type key: function
+        :param rate: Rate formatted as ``<count>/<period>`` or a function returning it, resolved on each request
+            so it can come from the app config. An empty rate disables the limit.
+        :type rate: str or function
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                rate_value = rate() if callable(rate) else rate
+                if rate_value and (key_value := key()) is not None:
+                    capacity, refill_rate = parse_rate(rate_value)
+                    allowed, retry_after = self.consume(name, key_value, capacity, refill_rate)
+                    if not allowed:
+                        raise TooManyRequests(description="Too many requests, try again later", retry_after=retry_after)
+                return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def consume(self, name: str, key: str, capacity: int, refill_rate: float) -> Tuple[bool, int]:
+        """
+        Take a token from the bucket of ``key`` in the limit ``name``.
+
+        :return: Whether the token was taken and, if not, the seconds until the next one.
+        :rtype: Tuple[bool, int]
+        """
+        if self._script is not None:
+            from redis import RedisError  # optional, imported with the client
+            try:
+                allowed, tokens = self._script(keys=[f"{self.key_prefix}{name}:{key}"],
+                                               args=[capacity, refill_rate, self.clock()])
+                return bool(allowed), self._retry_after(float(tokens), refill_rate)
+            except RedisError as e:
+                logger.warning(f"Rate limiter falling back to process memory, Redis failed: {e}")
+        return self._consume_local(name, key, capacity, refill_rate)
+
+    def _consume_local(self, name: str, key: str, capacity: int, refill_rate: float) -> Tuple[bool, int]:
+        now = self.clock()
+        with self._lock:
+            buckets = self._buckets.setdefault(name, OrderedDict())
+            if (bucket := buckets.get(key)) is not None:
+                buckets.move_to_end(key)
+                tokens, ts = bucket
+            else:
+                if len(buckets) >= self.MAX_LOCAL_BUCKETS:
+                    buckets.popitem(last=False)  # the least recently used
+                tokens, ts = capacity, now
+            tokens = min(capacity, tokens + max(0.0, now - ts) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            buckets[key] = (tokens, now)
+        return allowed, self._retry_after(tokens, refill_rate)
+
+    @staticmethod
+    def _retry_after(tokens: float, refill_rate: float) -> int:
+        return 0 if tokens >= 1 else max(1, math.ceil((1 - tokens) / refill_rate))
@@ -0,0 +1,29 @@
+from typing import List
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select, delete
+
+from app.models.api_key_model import ApiKey
+
+
+class ApiKeyRepository:
+    def __init__(self, *, db: SQLAlchemy):
+        self.db = db
+
+    def create_api_key(self, api_key: ApiKey) -> ApiKey:
+        self.db.session.add(api_key)
+        self.db.session.flush()  # assign the id, keys are revoked by it
+        return api_key
+
+    def get_api_key_by_id(self, id: int) -> ApiKey | None:
+        return self.db.session.execute(select(ApiKey).where(ApiKey.id == id)).scalars().one_or_none()
+
+    def get_api_key_by_hash(self, key_hash: str) -> ApiKey | None:
+        return self.db.session.execute(select(ApiKey).where(ApiKey.key_hash == key_hash)).scalars().one_or_none()
+
+    def get_api_keys_by_member_id(self, member_id: int) -> List[ApiKey]:
+        return self.db.session.execute(select(ApiKey).where(ApiKey.member_id == member_id)).scalars().fetchall()
+
+    def delete_api_key(self, api_key: ApiKey) -> int:
+        self.db.session.execute(delete(ApiKey).where(ApiKey.id == api_key.id))
+        return api_key.id
@@ -0,0 +1,59 @@
+from typing import List, Tuple
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select, delete, func, update
+from sqlalchemy.orm import undefer
+
+from app.models.image_model import Image
+from app.models.member_model import Member
+from app.models.project_model import Project
+
+
+class ImageRepository:
+    def __init__(self, *, db: SQLAlchemy):
+        self.db = db
+
+    def save_image(self, image: Image) -> Image:
+        self.db.session.add(image)
+        self.db.session.flush()  # surface constraint violations before the file is published
+        return image
+
+    def get_images(self) -> List[Image]:
+        return self.db.session.execute(select(Image)).scalars().fetchall()
+
+    def get_image_by_member_id(self, member_id: int) -> Image | None:
+        return self.db.session.execute(select(Image).where(Image.member_id == member_id)).scalars().one_or_none()
+
+    def get_image_by_project_id(self, project_id: int) -> Image | None:
+        return self.db.session.execute(select(Image).where(Image.project_id == project_id)).scalars().one_or_none()
+
+    def get_image_by_username(self, username: str) -> Image | None:
+        return self.db.session.execute(
+            select(Image).join(Member, Image.member_id == Member.id).where(Member.username == username)
+        ).scalars().one_or_none()
+
+    def get_image_by_project_slug(self, slug: str) -> Image | None:
+        return self.db.session.execute(
+            select(Image).join(Project, Image.project_id == Project.id).where(Project.slug == slug)
+        ).scalars().one_or_none()
+
+    def get_member_images(self, *, placeholders: bool = False) -> List[Tuple[str, Image | None]]:
+        """ Username of every member with their image, or ``None``, in a single query. """
+        query = select(Member.username, Image).outerjoin(Image, Image.member_id == Member.id).order_by(Member.username)
+        if placeholders:
+            query = query.options(undefer(Image.placeholder))
+        return [tuple(row) for row in self.db.session.execute(query)]
+
+    def count_images_by_path(self, path: str) -> int:
+        """ Number of images referencing the stored file at ``path``, identical uploads share one. """
+        return self.db.session.execute(select(func.count()).where(Image.path == path)).scalar_one()
+
+    def set_placeholder(self, path: str, placeholder: str) -> int:
+        """ Set the placeholder of every image referencing the stored file at ``path``. """
+        return self.db.session.execute(
+            update(Image).where(Image.path == path).values(placeholder=placeholder)
+        ).rowcount
+
+    def delete_image(self, image: Image) -> int:
+        self.db.session.execute(delete(Image).where(Image.id == image.id))
+        return image.id
@@ -0,0 +1,25 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.instrumentation.server_timing import timed_phase
+
+from app.models.api_key_model import ApiKey
+
+
+class ApiKeySchema(BaseModel):
+    id: Optional[int] = Field(default=None, gt=0)
+    name: str = Field(..., min_length=1, max_length=64)
+    permissions: List[str] = Field(..., min_length=1)
+
+    prefix: Optional[str] = Field(default=None)
+    created_at: Optional[str] = Field(default=None)
+
+    @classmethod
+    @timed_phase("schema")
+    def from_api_key(cls, api_key: ApiKey):
+        api_key_data = {}
+        for field in cls.model_fields:
+            if hasattr(api_key, field):
+                api_key_data[field] = getattr(api_key, field)
+        return cls(**api_key_data)
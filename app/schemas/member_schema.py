@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 
+from app.instrumentation.server_timing import timed_phase
 from app.utils import is_valid_datestring
 from app.models.member_model import Member
 
@@ -20,6 +21,9 @@ class MemberSchema(BaseModel):
     description: Optional[str] = Field(default=None, max_length=2048)
     extra: Optional[str] = Field(default=None, max_length=2048)
 
+    image_hash: Optional[str] = Field(default=None)
+    image_url: Optional[str] = Field(default=None)
+
     @field_validator("join_date", "exit_date")
     @classmethod
     def validate_datestring(cls, v: str):
@@ -32,6 +36,7 @@ class MemberSchema(BaseModel):
         return v
 
     @classmethod
+    @timed_phase("schema")
     def from_member(cls, member: Member):
         member_data = {}
         for field in cls.model_fields:
@@ -2,6 +2,8 @@ from typing import Optional, List
 
 from pydantic import BaseModel, Field, field_validator
 
+from app.instrumentation.server_timing import timed_phase
+
 from app.utils import is_valid_datestring
 from app.utils import ProjectStateEnum
 
@@ -23,6 +25,7 @@ class ProjectParticipationSchema(BaseModel):
         return v
 
     @classmethod
+    @timed_phase("schema")
     def from_participation(cls, participation: ProjectParticipation):
         participation_data = {
             "username": participation.member.username,
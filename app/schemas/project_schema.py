@@ -2,6 +2,8 @@ from typing import Optional
 
 from pydantic import BaseModel, Field, field_validator
 
+from app.instrumentation.server_timing import timed_phase
+
 from app.utils import is_valid_datestring
 from app.utils import ProjectStateEnum
 
@@ -16,6 +18,9 @@ class ProjectSchema(BaseModel):
     end_date: Optional[str] = Field(default=None)
     description: Optional[str] = Field(default=None)
 
+    image_hash: Optional[str] = Field(default=None)
+    image_url: Optional[str] = Field(default=None)
+
     @field_validator("start_date")
     @classmethod
     def validate_start_datestring(cls, v: str):
@@ -39,6 +44,7 @@ class ProjectSchema(BaseModel):
         return v
 
     @classmethod
+    @timed_phase("schema")
     def from_project(cls, project: Project):
         project_data = {}
         for field in cls.model_fields:
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 
+from app.instrumentation.server_timing import timed_phase
 from app.utils import is_valid_datestring, PointTypeEnum
 from app.models.task_model import Task
 
@@ -28,6 +29,7 @@ class TaskSchema(BaseModel):
         return v
 
     @classmethod
+    @timed_phase("schema")
     def from_task(cls, task: Task):
         data = {
             "id": task.id,
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 
+from app.instrumentation.server_timing import timed_phase
 from app.utils import is_valid_datestring, PointTypeEnum
 from app.models.task_model import Task
 
@@ -27,6 +28,7 @@ class UpdateTaskSchema(BaseModel):
         return v
 
     @classmethod
+    @timed_phase("schema")
     def from_task(cls, task: Task):
         data = {"point_type": task.point_type, "points": task.points, "description": task.description,
         "finished_at": task.finished_at, "username": task.participation.member.username, 
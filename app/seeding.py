@@ -0,0 +1,135 @@
+import itertools
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, select
+
+from app.auth.scopes.system_scopes import Scope, SystemScopes
+from app.models.member_model import Member
+from app.models.project_model import Project
+from app.models.project_participation_model import ProjectParticipation
+from app.models.task_model import Task
+from app.utils import PointTypeEnum, ProjectStateEnum, slugify
+
+FIRST_NAMES = ["Ana", "Beatriz", "Carolina", "Diogo", "Duarte", "Francisco", "Gonçalo", "Inês", "João", "Leonor",
+               "Mariana", "Martim", "Matilde", "Miguel", "Pedro", "Rafael", "Rita", "Rodrigo", "Sofia", "Tomás"]
+LAST_NAMES = ["Almeida", "Carvalho", "Costa", "Ferreira", "Gomes", "Lopes", "Marques", "Martins", "Oliveira",
+              "Pereira", "Ribeiro", "Rodrigues", "Santos", "Silva", "Sousa"]
+COURSES = ["LEIC-A", "LEIC-T", "LEEC", "LEMec", "LEAer", "MEIC-A", "MEIC-T", "MEEC"]
+PROJECT_ADJECTIVES = ["Autonomous", "Open", "Tiny", "Distributed", "Quantum", "Solar", "Rusty", "Smart", "Retro"]
+PROJECT_NOUNS = ["Rover", "Compiler", "Drone", "Badge", "Website", "Kernel", "Synth", "Robot", "Game", "Satellite"]
+# oldest join and task dates, spread over the following FIRST_DATE_SPAN days
+FIRST_DATE = date(2018, 9, 1)
+FIRST_DATE_SPAN = 7 * 365
+
+
+@dataclass
+class SeedCounts:
+    members: int
+    projects: int
+    participations: int
+    tasks: int
+
+
+def _role_mixer(scope: Scope | None, rng: random.Random, *, base: str, exclude=("sysadmin",)):
+    """
+    Roles of a generated member or participation, ``base``, or else the least privileged role of the scope, with
+    another role of up to its privilege for 1 in 10 and a more privileged one for 1 in 100.
+    """
+    roles = sorted((r for r in scope.roles if r.name not in exclude), key=lambda r: (r.name != base, r.privilege)) \
+        if scope else []
+    if not roles:
+        return lambda: []
+    base = roles[0]
+    common = [r.name for r in roles[1:] if r.privilege <= base.privilege]
+    privileged = [r.name for r in roles[1:] if r.privilege > base.privilege]
+
+    def mix() -> List[str]:
+        r = rng.random()
+        if r < 0.01 and privileged:
+            return [base.name, rng.choice(privileged)]
+        if r < 0.1 and common:
+            return [base.name, rng.choice(common)]
+        return [base.name]
+    return mix
+
+
+def _bulk_insert(db: SQLAlchemy, model, rows: Iterable[dict], chunk_size: int):
+    # straight to the driver's executemany, the ORM and Core bind processing is most of the time of a million rows
+    connection = db.session.connection()
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        columns = list(chunk[0])
+        connection.exec_driver_sql(f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) "
+                                   f"VALUES ({', '.join(':' + c for c in columns)})", chunk)
+
+
+def _next_id(db: SQLAlchemy, model) -> int:
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def seed_database(db: SQLAlchemy, *, system_scopes: SystemScopes, password_hash: str, members: int, projects: int,
+                  participations_per_member: int = 2, tasks_per_participation: int = 5, seed: int = 0,
+                  chunk_size: int = 50_000) -> SeedCounts:
+    """
+    Generate members, projects, their participations and tasks, valid as if created through the API, and bulk insert
+    them bypassing the models. The same ``seed`` on the same database generates the same data. Usernames, IST IDs and
+    project names are numbered after the ids, so seeding again adds to what's there.
+
+    :param system_scopes: Roles of the members and participations are mixed from the ``general`` and ``project``
+        scopes, except ``sysadmin``.
+    :param password_hash: Password of every member, hashed once by the caller since bcrypt is deliberately slow.
+    :param participations_per_member: Distinct projects each member participates in, at most ``projects``.
+    :param tasks_per_participation: Tasks of each participation.
+    :param chunk_size: Rows inserted per statement.
+    """
+    rng = random.Random(seed)
+    dates = [(FIRST_DATE + timedelta(days=days)).isoformat() for days in range(FIRST_DATE_SPAN)]
+    first_member, first_project = _next_id(db, Member), _next_id(db, Project)
+    first_participation, first_task = _next_id(db, ProjectParticipation), _next_id(db, Task)
+    member_roles = _role_mixer(system_scopes.get_scope("general"), rng, base="member")
+    participation_roles = _role_mixer(system_scopes.get_scope("project"), rng, base="participant")
+
+    def generate_members() -> Iterator[dict]:
+        for member_id in range(first_member, first_member + members):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            username = slugify(f"{first}{last}")[:24] + str(member_id)
+            yield {"id": member_id, "username": username, "name": f"{first} {last}",
+                   "email": f"{username}@example.com", "ist_id": f"ist1{100000 + member_id}",
+                   "password": password_hash, "roles": ",".join(member_roles()), "member_number": member_id,
+                   "course": rng.choice(COURSES), "join_date": rng.choice(dates)}
+
+    def generate_projects() -> Iterator[dict]:
+        for project_id in range(first_project, first_project + projects):
+            name = f"{rng.choice(PROJECT_ADJECTIVES)} {rng.choice(PROJECT_NOUNS)} {project_id}"
+            yield {"id": project_id, "name": name, "slug": slugify(name), "state": rng.choice(list(ProjectStateEnum)).name,
+                   "start_date": rng.choice(dates), "description": f"The {name} project."}
+
+    def generate_participations() -> Iterator[dict]:
+        participation_id = first_participation
+        for member_id in range(first_member, first_member + members):
+            for project in rng.sample(range(projects), min(participations_per_member, projects)):
+                yield {"id": participation_id, "member_id": member_id, "project_id": first_project + project,
+                       "join_date": rng.choice(dates), "roles": ",".join(participation_roles())}
+                participation_id += 1
+
+    participations = members * min(participations_per_member, projects)
+    point_types = [t.name for t in PointTypeEnum]
+
+    def generate_tasks() -> Iterator[dict]:
+        r = rng.random  # picking by hand, choice() and randrange() are most of the time of a million tasks
+        for i in range(participations * tasks_per_participation):
+            yield {"id": first_task + i, "participation_id": first_participation + i // tasks_per_participation,
+                   "point_type": point_types[int(r() * len(point_types))], "points": int(r() * 100) + 1,
+                   "description": f"Task {first_task + i}", "finished_at": dates[int(r() * len(dates))]}
+
+    _bulk_insert(db, Member, generate_members(), chunk_size)
+    _bulk_insert(db, Project, generate_projects(), chunk_size)
+    _bulk_insert(db, ProjectParticipation, generate_participations(), chunk_size)
+    _bulk_insert(db, Task, generate_tasks(), chunk_size)
+    db.session.commit()
+    return SeedCounts(members=members, projects=projects, participations=participations,
+                      tasks=participations * tasks_per_participation)
@@ -0,0 +1,73 @@
+import time
+from typing import Iterable
+
+from flask import Flask, Request, Response
+from flask.sessions import SessionInterface, SessionMixin
+
+from app.instrumentation.metrics import SESSION_STORE_DURATION
+from app.instrumentation.server_timing import record_phase
+
+
+class TimedSessionInterface(SessionInterface):
+    """
+    Wraps the session interface to observe how long loading and saving sessions takes, a round trip to the session
+    store, Redis or the filesystem, on most requests.
+
+    :param interface: Session interface timed.
+    :type interface: ``flask.sessions.SessionInterface``
+    """
+
+    def __init__(self, interface: SessionInterface):
+        self.interface = interface
+
+    def open_session(self, app: Flask, request: Request) -> SessionMixin | None:
+        start = time.perf_counter()
+        try:
+            return self.interface.open_session(app, request)
+        finally:
+            SESSION_STORE_DURATION.labels("open").observe(duration := time.perf_counter() - start)
+            record_phase("session", duration)
+
+    def save_session(self, app: Flask, session: SessionMixin, response: Response):
+        start = time.perf_counter()
+        try:
+            return self.interface.save_session(app, session, response)
+        finally:
+            SESSION_STORE_DURATION.labels("save").observe(time.perf_counter() - start)
+
+    def make_null_session(self, app: Flask):
+        return self.interface.make_null_session(app)
+
+    def is_null_session(self, obj: object) -> bool:
+        return self.interface.is_null_session(obj)
+
+
+class SessionlessPathsInterface(SessionInterface):
+    """
+    Wraps the session interface to skip loading and saving the session of requests whose path starts with one of
+    ``prefixes``, with server side sessions that saves a storage read on requests authorized by other means, e.g.
+    signed image URLs. Those requests get a null session.
+
+    :param interface: Session interface used for every other request.
+    :type interface: ``flask.sessions.SessionInterface``
+    :param prefixes: Path prefixes of the requests without session.
+    :type prefixes: Iterable[str]
+    """
+
+    def __init__(self, interface: SessionInterface, prefixes: Iterable[str]):
+        self.interface = interface
+        self.prefixes = tuple(prefixes)
+
+    def open_session(self, app: Flask, request: Request) -> SessionMixin | None:
+        if request.path.startswith(self.prefixes):
+            return self.make_null_session(app)
+        return self.interface.open_session(app, request)
+
+    def save_session(self, app: Flask, session: SessionMixin, response: Response):
+        return self.interface.save_session(app, session, response)
+
+    def make_null_session(self, app: Flask):
+        return self.interface.make_null_session(app)
+
+    def is_null_session(self, obj: object) -> bool:
+        return self.interface.is_null_session(obj)
@@ -0,0 +1,544 @@
+"""
+Latency, throughput and peak memory of every API route on seeded datasets of increasing size, written as JSON so the
+runs of two commits can be compared.
+
+Each dataset is seeded once, by the generator of ``flask seed``, into a SQLite file cached in ``--data-dir`` and copied
+for every run since the write routes change it. Routes run one after the other, reads first, then uploads, creates,
+updates and deletes, each for ``--requests`` requests or ``--seconds`` seconds, whichever ends first, logged in as a
+sysadmin. Routes listing every member or task get slow on the largest dataset, the time limit keeps them from taking
+the whole run.
+
+By default requests go through the Flask test client, which leaves out the network and WSGI server and measures the
+app alone. ``--gunicorn WORKERS`` starts gunicorn on the dataset instead, and drives it with ``--concurrency`` clients.
+Peak RSS is the high water mark of the process, or largest worker, reset before each route on Linux.
+
+Routes without a case are reported as not benchmarked, add one to ``build_cases`` along with new routes.
+
+Usage::
+
+    python -m benchmarks.endpoints --sizes 1k,10k --json before.json
+    python -m benchmarks.endpoints --sizes 1k,10k --json after.json --compare before.json
+    python -m benchmarks.endpoints --sizes 100k --gunicorn 4 --concurrency 8 --seconds 20
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import resource
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from benchmarks.stats import summarize
+
+ADMIN_USERNAME = "admin"
+PASSWORD = "password"
+
+# members, projects and tasks per participation of each dataset, seeded by app.seeding, every member participates
+# in PARTICIPATIONS_PER_MEMBER projects
+SIZES = {
+    "1k": (1_000, 100, 5),
+    "10k": (10_000, 1_000, 5),
+    "100k": (100_000, 1_000, 5),
+}
+PARTICIPATIONS_PER_MEMBER = 2
+
+# settings of the API under benchmark, the environment is read when app.config is imported
+ENVIRONMENT = {
+    "LOGIN_RATE_LIMIT_IP": "",
+    "LOGIN_RATE_LIMIT_USERNAME": "",
+    "SESSION_COOKIE_SECURE": "False",
+    "ENABLED_ACCESS_CONTROL": "True",
+    "SESSION_TYPE": "cachelib",
+    "SLOW_QUERY_THRESHOLD_MS": "0",
+    "SQL_STATEMENT_BUDGET": "0",
+    "IMAGES_STORAGE": "local",
+    "IMAGES_URL_KEY": "benchmark",
+    "IMAGES_TRANSCODE_FORMATS": "",
+    "ORIGINS_WHITELIST": "http://localhost:5173",
+}
+
+# routes left out, with why
+SKIPPED = {
+    "static": "Flask's static files, unused",
+    "auth.fenix_auth_callback": "calls Fénix, see benchmarks.fenix_login",
+}
+
+
+@dataclass
+class Dataset:
+    """ What a seeded database holds, to point the requests at. """
+    usernames: List[str]
+    slugs: List[str]
+    # (username, slug) of every participation
+    participations: List[Tuple[str, str]]
+    tasks: int
+
+
+def seed_dataset(path: str, name: str, *, seed: int):
+    """ Seed a database in ``path`` with ``flask seed``'s generator and a sysadmin to run the requests as. """
+    from app import create_app
+    from app.auth.scopes.system_scopes import SystemScopes
+    from app.config import Config
+    from app.extensions import db, password_hasher
+    from app.models.member_model import Member
+    from app.seeding import seed_database
+
+    members, projects, tasks_per_participation = SIZES[name]
+    Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + path
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed_database(db, system_scopes=SystemScopes.from_yaml_config(app.config["ROLES_PATH"]),
+                      password_hash=password_hasher.hash(PASSWORD), members=members, projects=projects,
+                      participations_per_member=PARTICIPATIONS_PER_MEMBER,
+                      tasks_per_participation=tasks_per_participation, seed=seed)
+        db.session.add(Member(username=ADMIN_USERNAME, password=PASSWORD, name="Admin", email="admin@example.com",
+                              roles=["sysadmin"]))
+        db.session.commit()
+        db.engine.dispose()
+
+
+def load_dataset(path: str) -> Dataset:
+    with closing(sqlite3.connect(path)) as connection:
+        return Dataset(
+            usernames=[row[0] for row in connection.execute(
+                "SELECT username FROM members WHERE username != ? ORDER BY id", (ADMIN_USERNAME,))],
+            slugs=[row[0] for row in connection.execute("SELECT slug FROM projects ORDER BY id")],
+            participations=connection.execute(
+                "SELECT members.username, projects.slug FROM project_participations "
+                "JOIN members ON members.id = member_id JOIN projects ON projects.id = project_id "
+                "ORDER BY project_participations.id").fetchall(),
+            # seeded from 1 on
+            tasks=connection.execute("SELECT count(*) FROM tasks").fetchone()[0],
+        )
+
+
+def png_image(size: int = 256) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), (200, 40, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# clients, the test client of an app in this process or HTTP to a running server
+
+class TestClient:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, *, json=None, files=None) -> Tuple[int, object]:
+        data = None
+        if files is not None:
+            data = {name: (io.BytesIO(content), filename) for name, (filename, content) in files.items()}
+        rsp = self._client.open(path, method=method, json=json, data=data)
+        try:
+            return rsp.status_code, rsp.get_json(silent=True)
+        finally:
+            rsp.close()
+
+
+class HttpClient:
+    def __init__(self, api: str, session: requests.Session = None):
+        self.api = api
+        self._session = session or requests.Session()
+
+    def request(self, method: str, path: str, *, json=None, files=None) -> Tuple[int, object]:
+        rsp = self._session.request(method, self.api + path, json=json, files=files, allow_redirects=False)
+        try:
+            return rsp.status_code, rsp.json()
+        except ValueError:
+            return rsp.status_code, None
+
+    def copy(self) -> "HttpClient":
+        session = requests.Session()
+        session.cookies.update(self._session.cookies)
+        return HttpClient(self.api, session)
+
+
+# request cases of the routes
+
+@dataclass
+class Case:
+    method: str
+    rule: str
+    endpoint: str
+    # i-th request as keyword arguments of Client.request, None once there's nothing left to request
+    make: Callable[[int], Optional[dict]]
+    # called with i and the response status and JSON body, e.g. to keep the ids of what was created
+    after: Optional[Callable[[int, int, object], None]] = None
+    # untimed preparation of the i-th request with its client, e.g. logging in before logging out
+    prepare: Optional[Callable[[int, object], None]] = None
+    # runs on its own client, not the logged in one shared by the other cases
+    own_client: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.rule}"
+
+
+def build_cases(data: Dataset) -> List[Case]:
+    image = png_image()
+    created = {"members": [], "projects": [], "participations": [], "api_keys": [], "image_urls": []}
+    lock = threading.Lock()
+
+    def member(i: int) -> str:
+        return data.usernames[i % len(data.usernames)]
+
+    def project(i: int) -> str:
+        return data.slugs[i % len(data.slugs)]
+
+    def pair(i: int) -> Tuple[str, str]:
+        return data.participations[i % len(data.participations)]
+
+    def take(kind: str, i: int):
+        with lock:
+            return created[kind][i] if i < len(created[kind]) else None
+
+    def keep(kind: str, value=lambda i, body: body):
+        def after(i: int, status: int, body):
+            if 200 <= status < 300:
+                kept = value(i, body)
+                with lock:
+                    created[kind].append(kept)
+        return after
+
+    def path(template: str, *values):
+        def make(i: int):
+            args = [value(i) for value in values]
+            return None if None in args else {"path": template.format(*args)}
+        return make
+
+    def login(i: int, client):
+        client.request("POST", "/login", json={"username": ADMIN_USERNAME, "password": PASSWORD})
+
+    def signed_image_url(i: int, status: int, body):
+        if status == 200 and body.get("image_url") and body["image_url"].startswith("/images/"):
+            with lock:
+                created["image_urls"].append(body["image_url"])
+
+    def created_pair(i: int):
+        # each bench member joins a bench project, so the pair doesn't exist yet
+        if (username := take("members", i)) is None or not created["projects"]:
+            return None
+        return username, created["projects"][i % len(created["projects"])]
+
+    return [
+        # reads
+        Case("GET", "/me", "auth.me", lambda i: {"path": "/me"}),
+        Case("GET", "/members", "member.get_members", lambda i: {"path": "/members"}),
+        Case("GET", "/members/<username>", "member.get_member_by_username", path("/members/{}", member)),
+        Case("GET", "/members/<username>/participations", "participation.get_member_participations",
+             path("/members/{}/participations", member)),
+        Case("GET", "/members/<username>/tasks", "task.get_member_tasks", path("/members/{}/tasks", member)),
+        Case("GET", "/members/<username>/api-keys", "api_keys.get_api_keys",
+             lambda i: {"path": f"/members/{ADMIN_USERNAME}/api-keys"}),
+        Case("GET", "/projects", "projects.get_projects", lambda i: {"path": "/projects"}),
+        Case("GET", "/projects/<slug>", "projects.get_project_by_slug", path("/projects/{}", project)),
+        Case("GET", "/projects/<slug>/participations", "participation.get_participations",
+             path("/projects/{}/participations", project)),
+        Case("GET", "/projects/<slug>/participations/<username>", "participation.get_participation_by_username",
+             lambda i: {"path": "/projects/{1}/participations/{0}".format(*pair(i))}),
+        Case("GET", "/projects/<slug>/tasks", "task.get_project_tasks", path("/projects/{}/tasks", project)),
+        Case("GET", "/tasks", "task.get_tasks", lambda i: {"path": "/tasks"}),
+        Case("GET", "/tasks/<int:task_id>", "task.get_task_by_id",
+             lambda i: {"path": f"/tasks/{i % data.tasks + 1}"}),
+        Case("GET", "/metrics", "metrics.get_metrics", lambda i: {"path": "/metrics"}),
+        # images
+        Case("POST", "/members/<username>/image", "images.upload_member_image",
+             lambda i: {"path": f"/members/{member(i)}/image", "files": {"file": ("image.png", image)}}),
+        Case("POST", "/projects/<slug>/image", "images.upload_project_image",
+             lambda i: {"path": f"/projects/{project(i)}/image", "files": {"file": ("image.png", image)}}),
+        Case("GET", "/members/<username>/image", "images.get_member_image",
+             lambda i: {"path": f"/members/{member(i)}/image"}),
+        Case("GET", "/projects/<slug>/image", "images.get_project_image",
+             lambda i: {"path": f"/projects/{project(i)}/image"}),
+        Case("GET", "/members/images/manifest", "images.get_member_images_manifest",
+             lambda i: {"path": "/members/images/manifest"}),
+        Case("GET", "/images/<path:path>", "images.get_signed_image",
+             lambda i: None if (url := take("image_urls", i)) is None else {"path": url},
+             prepare=lambda i, client: signed_image_url(i, *client.request("GET", f"/members/{member(i)}"))),
+        # creates
+        Case("POST", "/members", "member.create_member",
+             lambda i: {"path": "/members", "json": {"username": f"bench{i}", "name": f"Bench {i}",
+                                                     "email": f"bench{i}@example.com", "roles": ["member"]}},
+             after=keep("members", lambda i, body: f"bench{i}")),
+        Case("POST", "/members/<username>/api-keys", "api_keys.create_api_key",
+             lambda i: {"path": f"/members/{ADMIN_USERNAME}/api-keys",
+                        "json": {"name": f"bench {i}", "permissions": ["member:read"]}},
+             after=keep("api_keys", lambda i, body: body["id"])),
+        Case("POST", "/projects", "projects.create_project",
+             lambda i: {"path": "/projects", "json": {"name": f"Bench {i}", "state": "active",
+                                                      "start_date": "2025-01-01"}},
+             after=keep("projects", lambda i, body: f"bench-{i}")),
+        Case("POST", "/projects/<slug>/participations", "participation.create_participation",
+             lambda i: None if (p := created_pair(i)) is None else {
+                 "path": f"/projects/{p[1]}/participations", "json": {"username": p[0], "join_date": "2025-01-01"}},
+             after=keep("participations", lambda i, body: created_pair(i))),
+        Case("POST", "/projects/<slug>/tasks", "task.create_task",
+             lambda i: {"path": "/projects/{1}/tasks".format(*pair(i)),
+                        "json": {"username": pair(i)[0], "point_type": "pj", "points": 10, "description": f"Bench {i}"}}),
+        # updates
+        Case("PUT", "/members/<username>", "member.update_member_by_username",
+             lambda i: {"path": f"/members/{member(i)}", "json": {"description": f"Updated {i}"}}),
+        Case("PUT", "/projects/<slug>", "projects.update_project_by_slug",
+             lambda i: {"path": f"/projects/{project(i)}", "json": {"description": f"Updated {i}"}}),
+        Case("PUT", "/projects/<slug>/participations/<username>", "participation.update_participation_by_username",
+             lambda i: {"path": "/projects/{1}/participations/{0}".format(*pair(i)),
+                        "json": {"roles": ["participant"]}}),
+        Case("PUT", "/tasks/<int:task_id>", "task.update_task_by_id",
+             lambda i: {"path": f"/tasks/{i % data.tasks + 1}", "json": {"points": i % 100 + 1}}),
+        # deletes, of what was created, tasks are created without their id in the response so seeded ones go instead
+        Case("DELETE", "/tasks/<int:task_id>", "task.delete_task_by_id",
+             lambda i: {"path": f"/tasks/{data.tasks - i % data.tasks}"}),
+        Case("DELETE", "/projects/<slug>/participations/<username>",
+             "participation.delete_participation_by_username",
+             lambda i: None if (p := take("participations", i)) is None else {
+                 "path": f"/projects/{p[1]}/participations/{p[0]}"}),
+        Case("DELETE", "/projects/<slug>", "projects.delete_project_by_slug",
+             path("/projects/{}", lambda i: take("projects", i))),
+        Case("DELETE", "/members/<username>/api-keys/<int:key_id>", "api_keys.delete_api_key",
+             path(f"/members/{ADMIN_USERNAME}/api-keys/{{}}", lambda i: take("api_keys", i))),
+        Case("DELETE", "/members/<username>", "member.delete_member_by_username",
+             path("/members/{}", lambda i: take("members", i))),
+        # sessions
+        Case("POST", "/login", "auth.login",
+             lambda i: {"path": "/login", "json": {"username": member(i), "password": PASSWORD}}, own_client=True),
+        Case("GET", "/logout", "auth.logout", lambda i: {"path": "/logout"}, prepare=login, own_client=True),
+        Case("GET", "/fenix-login", "auth.fenix_login", lambda i: {"path": "/fenix-login?next=http://localhost:5173/"}, own_client=True),
+    ]
+
+
+def uncovered_routes(url_map, cases: List[Case]) -> List[str]:
+    covered = {(case.method, case.endpoint) for case in cases}
+    return sorted(f"{method} {rule.rule}" for rule in url_map.iter_rules() if rule.endpoint not in SKIPPED
+                  for method in rule.methods - {"HEAD", "OPTIONS"} if (method, rule.endpoint) not in covered)
+
+
+# peak memory, VmHWM is reset by writing 5 to clear_refs, elsewhere only the process' lifetime peak is known
+
+def reset_peak_rss(pids: List[int]):
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+
+
+def peak_rss_mb(pids: List[int]) -> float:
+    peaks = []
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                peaks += [int(line.split()[1]) / 1024 for line in f if line.startswith("VmHWM:")]
+        except OSError:
+            pass
+    if not peaks and pids == [os.getpid()]:
+        # kilobytes on Linux, bytes on macOS
+        peaks = [resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1024 ** 2)]
+    return max(peaks, default=float("nan"))
+
+
+def run_case(case: Case, clients: list, *, requests_per_case: int, seconds: float, pids: List[int]) -> dict:
+    latencies, statuses, errors = [], {}, 0
+    lock = threading.Lock()
+    counter = itertools.count()
+    deadline = time.perf_counter() + seconds
+
+    def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline and (i := next(counter)) < requests_per_case:
+            if case.prepare is not None:
+                case.prepare(i, client)
+            if (kwargs := case.make(i)) is None:
+                return
+            start = time.perf_counter()
+            try:
+                status, body = client.request(case.method, **kwargs)
+            except requests.RequestException:
+                status, body = 0, None
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if 200 <= status < 400:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+            if case.after is not None:
+                case.after(i, status, body)
+
+    reset_peak_rss(pids)
+    start = time.perf_counter()
+    if len(clients) == 1:
+        worker(clients[0])
+    else:
+        with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+            list(executor.map(worker, clients))
+    result = summarize(latencies, elapsed=time.perf_counter() - start, errors=errors)
+    result["status"] = statuses
+    result["peak_rss_mb"] = round(peak_rss_mb(pids), 1)
+    return result
+
+
+def run_cases(cases: List[Case], logged_in, new_client: Callable[[], object], *, concurrency: int,
+              requests_per_case: int, seconds: float, pids: List[int]) -> Dict[str, dict]:
+    results = {}
+    for case in cases:
+        if case.own_client:
+            clients = [new_client() for _ in range(concurrency)]
+        else:
+            clients = [logged_in] if concurrency == 1 else [logged_in.copy() for _ in range(concurrency)]
+        results[case.name] = r = run_case(case, clients, requests_per_case=requests_per_case, seconds=seconds,
+                                          pids=pids)
+        print(f"  {case.name:<52} {r['requests']:>6} {r['throughput']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f}"
+              f" {r['p99_ms']:>9.2f} {r['errors']:>7} {r['peak_rss_mb']:>8.1f}", flush=True)
+    return results
+
+
+def run_in_process(database: str, images: str, cases: List[Case], **options) -> Tuple[Dict[str, dict], List[str]]:
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db
+
+    Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + database
+    Config.IMAGES_PATH = images
+    app = create_app()
+    client = TestClient(app)
+    client.request("POST", "/login", json={"username": ADMIN_USERNAME, "password": PASSWORD})
+    uncovered = uncovered_routes(app.url_map, cases)
+    results = run_cases(cases, client, lambda: TestClient(app), concurrency=1, pids=[os.getpid()], **options)
+    with app.app_context():
+        db.engine.dispose()
+    return results, uncovered
+
+
+def run_gunicorn(database: str, images: str, cases: List[Case], *, workers: int, concurrency: int,
+                 **options) -> Tuple[Dict[str, dict], List[str]]:
+    from app import create_app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI=database, IMAGES_PATH=images)
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+                               "--log-level", "warning", "app:create_app()"], env=env)
+    api = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):  # until a worker answers
+            try:
+                requests.get(api + "/me", timeout=5)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+        client = HttpClient(api)
+        client.request("POST", "/login", json={"username": ADMIN_USERNAME, "password": PASSWORD})
+        try:
+            with open(f"/proc/{server.pid}/task/{server.pid}/children") as f:
+                pids = [int(pid) for pid in f.read().split()]
+        except OSError:
+            pids = []
+        results = run_cases(cases, client, lambda: HttpClient(api), concurrency=concurrency, pids=pids, **options)
+    finally:
+        server.terminate()
+        server.wait()
+    return results, uncovered_routes(create_app().url_map, cases)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict):
+    """ Print the p95 latency and throughput change of every route measured in both runs. """
+    print(f"\ncompared with {previous.get('commit') or 'previous run'}, p95 latency and throughput")
+    for name, data in current["datasets"].items():
+        if (before := previous.get("datasets", {}).get(name)) is None:
+            continue
+        print(f"{name}:")
+        for route, r in data["routes"].items():
+            if (b := before["routes"].get(route)) is None or not b["p95_ms"] or not b["throughput"]:
+                continue
+            print(f"  {route:<52} {b['p95_ms']:>9.2f} -> {r['p95_ms']:>9.2f} ms ({r['p95_ms'] / b['p95_ms'] - 1:+.0%})"
+                  f"  {b['throughput']:>9.1f} -> {r['throughput']:>9.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API routes benchmark on seeded datasets")
+    parser.add_argument("--sizes", default="1k,10k,100k", help=f"comma separated datasets of {', '.join(SIZES)}")
+    parser.add_argument("--requests", type=int, default=200, help="maximum requests per route")
+    parser.add_argument("--seconds", type=float, default=10.0, help="maximum seconds per route")
+    parser.add_argument("--gunicorn", type=int, metavar="WORKERS", help="benchmark gunicorn with this many workers")
+    parser.add_argument("--concurrency", type=int, default=1, help="concurrent clients, with --gunicorn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "hs-api-benchmarks"),
+                        help="where the seeded datasets are cached")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results of a previous run to compare with")
+    args = parser.parse_args()
+    if args.gunicorn is None and args.concurrency != 1:
+        parser.error("--concurrency needs --gunicorn, the test client runs one request at a time")
+
+    os.environ.update(ENVIRONMENT)
+    os.environ["SESSION_DIR"] = tempfile.mkdtemp(prefix="hs-api-sessions-")
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {"commit": git_commit(), "mode": f"gunicorn -w {args.gunicorn}" if args.gunicorn else "test client",
+               "concurrency": args.concurrency, "python": sys.version.split()[0], "datasets": {}}
+
+    for name in args.sizes.split(","):
+        cached = os.path.join(args.data_dir, f"{name}-{args.seed}.sqlite3")
+        seeded_in = None
+        if not os.path.exists(cached):
+            start = time.perf_counter()
+            seed_dataset(cached + ".tmp", name, seed=args.seed)
+            os.replace(cached + ".tmp", cached)
+            seeded_in = time.perf_counter() - start
+        data = load_dataset(cached)
+
+        print(f"{name}: {len(data.usernames)} members, {len(data.slugs)} projects, {len(data.participations)} "
+              f"participations, {data.tasks} tasks" + (f", seeded in {seeded_in:.1f}s" if seeded_in is not None else ""))
+        print(f"  {'route':<52} {'reqs':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+              f" {'rss MB':>8}")
+        with tempfile.TemporaryDirectory(prefix="hs-api-benchmark-") as workdir:
+            database = shutil.copy(cached, os.path.join(workdir, "db.sqlite3"))
+            images = os.path.join(workdir, "images") + os.sep
+            options = {"requests_per_case": args.requests, "seconds": args.seconds}
+            if args.gunicorn:
+                routes, uncovered = run_gunicorn(database, images, build_cases(data), workers=args.gunicorn,
+                                                 concurrency=args.concurrency, **options)
+            else:
+                routes, uncovered = run_in_process(database, images, build_cases(data), **options)
+        if uncovered:
+            print(f"  not benchmarked: {', '.join(uncovered)}")
+        results["datasets"][name] = {"members": len(data.usernames), "projects": len(data.slugs),
+                                     "participations": len(data.participations), "tasks": data.tasks,
+                                     "seed_seconds": seeded_in, "routes": routes, "not_benchmarked": uncovered}
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Drives full Fénix login flows, ``/fenix-login`` → ``oauth/userdialog`` → ``/fenix-login-callback``, concurrently
+against a running API, and reports throughput and latency for each concurrency level. The API must be configured
+with ``FENIX_BASE_URL`` pointing at :mod:`benchmarks.fenix_stub` and ``ROOT_URI`` pointing at itself, so the stub
+redirects back to it, with ``LOGIN_RATE_LIMIT_IP`` empty since every flow comes from the same address and with
+``SESSION_COOKIE_SECURE=False`` when served over plain HTTP.
+
+Workers are saturated once adding concurrency stops adding throughput, from there extra clients only queue and
+latency grows. The report flags the first level where that happens, with the average number of flows in flight
+(throughput × mean latency, Little's law) which estimates how many workers were busy.
+
+The stub identities, ``ist1100000`` onwards, must exist as members. ``--create-members`` creates them through the
+API with an admin account.
+
+Usage::
+
+    FENIX_BASE_URL=http://127.0.0.1:8001 ROOT_URI=http://127.0.0.1:5000 LOGIN_RATE_LIMIT_IP= SESSION_COOKIE_SECURE=False \\
+        gunicorn -w 4 "app:create_app()"
+    python -m benchmarks.fenix_stub --latency 0.05
+    python -m benchmarks.fenix_login --users 100 --create-members admin:password --concurrency 1,4,16,32
+"""
+import argparse
+import json
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse, parse_qs
+
+import requests
+
+from benchmarks.fenix_stub import stub_ist_id
+from benchmarks.stats import summarize
+
+
+def create_members(api: str, admin: str, users: int):
+    username, _, password = admin.partition(":")
+    with requests.Session() as session:
+        rsp = session.post(api + "/login", json={"username": username, "password": password})
+        rsp.raise_for_status()
+        for i in range(users):
+            rsp = session.post(api + "/members", json={"username": f"stub{i}", "ist_id": stub_ist_id(i),
+                                                       "name": f"Stub {i}", "email": f"stub{i}@example.com",
+                                                       "roles": ["member"]})
+            if rsp.status_code not in (200, 409):
+                rsp.raise_for_status()
+
+
+def login_flow(api: str, next_url: str, ist_id: str) -> bool:
+    with requests.Session() as session:
+        rsp = session.get(api + "/fenix-login?" + urlencode({"next": next_url}), allow_redirects=False)
+        if rsp.status_code != 302:
+            return False
+        # the stub authorizes straight away, choose which identity
+        rsp = session.get(rsp.headers["Location"] + "&" + urlencode({"username": ist_id}), allow_redirects=False)
+        if rsp.status_code != 302:
+            return False
+        rsp = session.get(rsp.headers["Location"], allow_redirects=False)
+        if rsp.status_code != 302:
+            return False
+        return parse_qs(urlparse(rsp.headers["Location"]).query).get("login") == ["success"]
+
+
+def run_level(api: str, next_url: str, users: int, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(n: int):
+        nonlocal errors
+        i = n
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = login_flow(api, next_url, stub_ist_id(i % users))
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+            i += concurrency
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client, range(concurrency)))
+    result = summarize(latencies, elapsed=time.perf_counter() - start, errors=errors)
+    result["concurrency"] = concurrency
+    mean = sum(latencies) / len(latencies) if latencies else 0.0
+    result["in_flight"] = result["throughput"] * mean
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fénix login flow load benchmark")
+    parser.add_argument("--api", default="http://127.0.0.1:5000")
+    parser.add_argument("--next", default="http://localhost:5173/", help="must be in the API ORIGINS_WHITELIST")
+    parser.add_argument("--users", type=int, default=100, help="stub identities logged in, from ist1100000")
+    parser.add_argument("--create-members", metavar="USERNAME:PASSWORD",
+                        help="create the stub identities as members with this admin account first")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    if args.create_members:
+        create_members(args.api, args.create_members, args.users)
+
+    results, saturated_at = [], None
+    print(f"{'clients':>8} {'flows/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'in flight':>10}")
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        r = run_level(args.api, args.next, args.users, concurrency, args.duration)
+        if saturated_at is None and results and r["throughput"] < results[-1]["throughput"] * 1.1:
+            saturated_at = concurrency
+        results.append(r)
+        print(f"{concurrency:>8} {r['throughput']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}"
+              f" {r['errors']:>7} {r['in_flight']:>10.1f}")
+
+    if saturated_at is not None:
+        print(f"workers saturated at {saturated_at} concurrent clients, throughput stopped scaling")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"levels": results, "saturated_at": saturated_at}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
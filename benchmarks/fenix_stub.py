@@ -0,0 +1,98 @@
+"""
+Local stand-in for the Fénix OAuth endpoints used by :class:`app.auth.fenix.fenix_service.FenixService`, to load test
+the login flow without hitting the real Fénix. Point the API at it with ``FENIX_BASE_URL``.
+
+Every user is authorized straight away. The identity is picked with the ``username`` query param of
+``/oauth/userdialog`` or at random from ``ist1100000`` onwards, and is carried by the code and the access token
+so the stub keeps no state and can run with several processes.
+
+Usage::
+
+    python -m benchmarks.fenix_stub --port 8001 --latency 0.05 --jitter 0.02 --failure-rate 0.01
+"""
+import argparse
+import random
+import secrets
+import time
+
+from http import HTTPStatus
+from urllib.parse import urlencode
+
+from flask import Flask, abort, redirect, request
+
+
+def stub_ist_id(i: int) -> str:
+    return f"ist1{100000 + i}"
+
+
+def create_stub_app(*, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, hang_rate: float = 0.0,
+                    hang_seconds: float = 30.0, users: int = 1000) -> Flask:
+    """
+    :param latency: Seconds added to every API call.
+    :param jitter: Maximum seconds randomly added or removed from the latency.
+    :param failure_rate: Fraction of API calls answered with ``503 Service Unavailable``.
+    :param hang_rate: Fraction of API calls that hang for ``hang_seconds``, to exercise client timeouts.
+    :param users: Number of identities picked from when the user dialog doesn't choose one.
+    """
+    app = Flask(__name__)
+
+    def inject_faults():
+        r = random.random()
+        if r < failure_rate:
+            abort(HTTPStatus.SERVICE_UNAVAILABLE)
+        if r < failure_rate + hang_rate:
+            time.sleep(hang_seconds)
+        if latency or jitter:
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+    @app.route("/oauth/userdialog")
+    def userdialog():
+        if "redirect_uri" not in request.args or "client_id" not in request.args:
+            abort(HTTPStatus.BAD_REQUEST)
+        ist_id = request.args.get("username") or stub_ist_id(random.randrange(users))
+        params = {"code": f"{ist_id}.{secrets.token_hex(8)}"}
+        if "state" in request.args:
+            params["state"] = request.args["state"]
+        return redirect(request.args["redirect_uri"] + "?" + urlencode(params))
+
+    @app.route("/oauth/access_token", methods=["POST"])
+    def access_token():
+        inject_faults()
+        code = request.args.get("code", "")
+        if request.args.get("grant_type") != "authorization_code" or "." not in code:
+            return {"error": "invalid_grant"}, HTTPStatus.BAD_REQUEST
+        ist_id, _ = code.split(".", 1)
+        return {"access_token": f"{ist_id}.{secrets.token_hex(16)}", "refresh_token": secrets.token_hex(16),
+                "expires_in": 3600}
+
+    @app.route("/api/fenix/v1/person")
+    def person():
+        inject_faults()
+        token = request.args.get("access_token", "")
+        if "." not in token:
+            return {"error": "invalid_token"}, HTTPStatus.UNAUTHORIZED
+        ist_id, _ = token.split(".", 1)
+        return {"username": ist_id, "name": f"Stub {ist_id}", "email": f"{ist_id}@tecnico.ulisboa.pt"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fénix OAuth stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every API call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- seconds on the latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of API calls failing with 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of API calls hanging")
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--users", type=int, default=1000, help="identities picked from, starting at ist1100000")
+    args = parser.parse_args()
+
+    app = create_stub_app(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                          hang_rate=args.hang_rate, hang_seconds=args.hang_seconds, users=args.users)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
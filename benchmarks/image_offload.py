@@ -0,0 +1,173 @@
+"""
+Measures how long image downloads hold API workers, with and without offloading the transfer to the reverse proxy
+(``IMAGES_OFFLOAD``, see ``deploy/nginx/hs-api.conf``).
+
+Slow clients download a member image over sockets with a small receive buffer, reading at ``--read-rate`` bytes per
+second like a poor mobile connection, while a probe keeps requesting a cheap JSON endpoint. When the image bytes
+stream from the worker, every slow client pins a worker until its download ends and the probe queues behind them.
+When the proxy streams them, workers are free as soon as the headers are sent.
+
+The report shows the probe latency, which is the user visible cost of busy workers, and for the image downloads the
+time to the response headers and to the last byte. The time between both is spent streaming the body, which holds a
+worker unless it is offloaded: the rate of downloads × that time (Little's law) is the number of workers kept busy
+streaming. Compare the probe latency of a run streaming from the workers with one offloaded to the proxy.
+
+Usage, with few workers so they saturate::
+
+    SESSION_COOKIE_SECURE=False gunicorn -w 2 -b 127.0.0.1:5000 "app:create_app()"
+    python -m benchmarks.image_offload --api http://127.0.0.1:5000 --login admin:password --upload --label direct
+
+    # same API behind nginx with IMAGES_OFFLOAD=x-accel
+    python -m benchmarks.image_offload --api http://127.0.0.1:8080 --login admin:password --upload --label x-accel
+"""
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+
+from urllib.parse import urlparse
+
+import requests
+
+from benchmarks.stats import percentile, summarize
+
+
+def slow_download(url: str, cookie: str, *, read_rate: int, chunk_size: int = 4096,
+                  rcvbuf: int = 16384) -> tuple[float, float, int]:
+    """
+    Download with a raw socket, reading ``chunk_size`` bytes at a time at ``read_rate`` bytes per second.
+
+    :return: Seconds to the end of the response headers, seconds to the last byte and body bytes read.
+    """
+    parsed = urlparse(url)
+    start = time.perf_counter()
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        # a small receive buffer keeps the kernel from absorbing the whole image on the client's behalf
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        sock.connect((parsed.hostname, parsed.port or 80))
+        sock.sendall((f"GET {parsed.path}?{parsed.query} HTTP/1.1\r\nHost: {parsed.netloc}\r\nCookie: {cookie}\r\n"
+                      f"Connection: close\r\n\r\n").encode("ascii"))
+
+        buffer = b""
+        while b"\r\n\r\n" not in buffer:
+            if not (data := sock.recv(chunk_size)):
+                raise ConnectionError("Connection closed before the response headers")
+            buffer += data
+        headers_at = time.perf_counter() - start
+        head, body = buffer.split(b"\r\n\r\n", 1)
+        if not head.startswith(b"HTTP/1.1 200"):
+            raise ConnectionError(f"Unexpected response: {head.splitlines()[0].decode()}")
+
+        received = len(body)
+        while data := sock.recv(chunk_size):
+            received += len(data)
+            time.sleep(len(data) / read_rate)
+    return headers_at, time.perf_counter() - start, received
+
+
+def run(api: str, cookie: str, member: str, *, slow_clients: int, read_rate: int, duration: float,
+        image_hash: str) -> dict:
+    image_url = f"{api}/members/{member}/image?v={image_hash}"
+    deadline = time.perf_counter() + duration
+    downloads, errors = [], 0
+    lock = threading.Lock()
+
+    def slow_client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            try:
+                result = slow_download(image_url, cookie, read_rate=read_rate)
+            except OSError:
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                downloads.append(result)
+
+    threads = [threading.Thread(target=slow_client, daemon=True) for _ in range(slow_clients)]
+    for t in threads:
+        t.start()
+
+    probe_latencies, probe_errors = [], 0
+    start = time.perf_counter()
+    with requests.Session() as session:
+        session.headers["Cookie"] = cookie
+        while time.perf_counter() < deadline:
+            probe_start = time.perf_counter()
+            try:
+                ok = session.get(f"{api}/members/{member}", timeout=30).ok
+            except requests.RequestException:
+                ok = False
+            if ok:
+                probe_latencies.append(time.perf_counter() - probe_start)
+            else:
+                probe_errors += 1
+            time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    for t in threads:
+        t.join()
+
+    headers_times = [d[0] for d in downloads]
+    body_times = [d[1] for d in downloads]
+    streaming_times = [d[1] - d[0] for d in downloads]
+    download_rate = len(downloads) / elapsed if elapsed else 0.0
+    return {
+        "probe": summarize(probe_latencies, elapsed=elapsed, errors=probe_errors),
+        "downloads": len(downloads),
+        "download_errors": errors,
+        "headers_p50_ms": percentile(headers_times, 50) * 1000,
+        "last_byte_p50_ms": percentile(body_times, 50) * 1000,
+        "bytes_per_download": downloads[0][2] if downloads else 0,
+        "streaming_p50_ms": percentile(streaming_times, 50) * 1000,
+        # workers held by the body transfers when the worker streams them, offloaded the proxy holds them instead
+        "streaming_occupancy": download_rate * sum(streaming_times) / len(streaming_times) if streaming_times else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image delivery worker occupancy benchmark")
+    parser.add_argument("--api", default="http://127.0.0.1:5000")
+    parser.add_argument("--login", required=True, metavar="USERNAME:PASSWORD")
+    parser.add_argument("--member", help="member whose image is downloaded, the logged in member by default")
+    parser.add_argument("--upload", action="store_true", help="upload a random image of --image-size bytes first")
+    parser.add_argument("--image-size", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--slow-clients", type=int, default=8)
+    parser.add_argument("--read-rate", type=int, default=256 * 1024, help="bytes per second read by each slow client")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--label", default="", help="name of the run in the report, e.g. direct or x-accel")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    username, _, password = args.login.partition(":")
+    member = args.member or username
+    with requests.Session() as session:
+        session.post(args.api + "/login", json={"username": username, "password": password}).raise_for_status()
+        if args.upload:
+            content = b"\x89PNG\r\n\x1a\n" + os.urandom(args.image_size)
+            session.post(f"{args.api}/members/{member}/image",
+                         files={"file": ("bench.png", content, "image/png")}).raise_for_status()
+        image_hash = session.get(f"{args.api}/members/{member}").json()["image_hash"]
+        cookie = "; ".join(f"{c.name}={c.value}" for c in session.cookies)
+    if image_hash is None:
+        parser.error(f"member '{member}' has no image, pass --upload")
+
+    r = run(args.api, cookie, member, slow_clients=args.slow_clients, read_rate=args.read_rate,
+            duration=args.duration, image_hash=image_hash)
+    r["label"] = args.label
+
+    print(f"{args.label or args.api}: {r['downloads']} downloads of {r['bytes_per_download']} bytes"
+          f" ({r['download_errors']} errors) by {args.slow_clients} clients reading {args.read_rate} B/s")
+    print(f"  image headers p50 {r['headers_p50_ms']:.1f} ms, last byte p50 {r['last_byte_p50_ms']:.1f} ms,"
+          f" streaming p50 {r['streaming_p50_ms']:.1f} ms")
+    print(f"  probe p50 {r['probe']['p50_ms']:.1f} ms, p99 {r['probe']['p99_ms']:.1f} ms,"
+          f" {r['probe']['errors']} errors")
+    print(f"  connections busy streaming {r['streaming_occupancy']:.2f} on average, held by workers unless offloaded")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(r, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
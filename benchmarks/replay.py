@@ -0,0 +1,262 @@
+"""
+Replays the traffic of a gunicorn access log, in the ``access_log_format`` of ``gunicorn_conf.py``, against a local API
+serving a seeded dataset, to load test it with the production request mix.
+
+Usernames, slugs and task ids of the logged paths are remapped onto the dataset, the same original always to the same
+seeded one, and requests are sent at their logged times sped up ``--speed`` times by up to ``--concurrency`` threads.
+When the API can't keep up, requests queue for a free thread and start late: the report shows that lag with the
+latency and status codes of each endpoint.
+
+The log has no request bodies, so besides the reads only logins, updates and image uploads are replayed, with bodies
+made up for the dataset. Creates and deletes would conflict with or wipe the dataset and are counted as skipped.
+
+Every client of the log, by address and user agent, gets its own session: clients that wrote anything log in as the
+``--admin`` sysadmin, the others as a seeded member, all with ``--password``. Logging in costs a bcrypt hash per
+client, ``--cookies`` keeps the session cookies in a file to reuse them on the next replay. Server side sessions
+expire, and the filesystem session store keeps at most 500, delete the file when the replay starts getting 401s.
+
+Usage::
+
+    SQLALCHEMY_DATABASE_URI=/tmp/replay.sqlite3 flask --app app:create_app db upgrade
+    SQLALCHEMY_DATABASE_URI=/tmp/replay.sqlite3 flask --app app:create_app seed --members 10000 --projects 500
+    SQLALCHEMY_DATABASE_URI=/tmp/replay.sqlite3 flask --app app:create_app create-admin admin password ist1000000
+    SQLALCHEMY_DATABASE_URI=/tmp/replay.sqlite3 ENABLED_ACCESS_CONTROL=True LOGIN_RATE_LIMIT_IP= \\
+        LOGIN_RATE_LIMIT_USERNAME= SESSION_COOKIE_SECURE=False gunicorn -w 4 -b 127.0.0.1:5000 "app:create_app()"
+    python -m benchmarks.replay access.log --database /tmp/replay.sqlite3 --speed 10 --concurrency 32 \\
+        --cookies /tmp/replay-cookies.json --json replay.json
+"""
+import argparse
+import io
+import json
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+from app.instrumentation.access_log import AccessLogEntry, read_access_logs
+from benchmarks.endpoints import Dataset, load_dataset, png_image
+from benchmarks.stats import percentile, summarize
+
+WRITES = {"POST", "PUT", "PATCH", "DELETE"}
+# bodies made up for the writes replayed, by endpoint
+BODIES = {
+    "member.update_member_by_username": lambda args: {"description": "Replayed"},
+    "projects.update_project_by_slug": lambda args: {"description": "Replayed"},
+    "participation.update_participation_by_username": lambda args: {"roles": ["participant"]},
+    "task.update_task_by_id": lambda args: {"description": "Replayed"},
+}
+UPLOADS = {"images.upload_member_image", "images.upload_project_image"}
+# endpoints whose requests can't be replayed onto the dataset
+UNREPLAYABLE = {"images.get_signed_image": "signed URLs", "auth.fenix_auth_callback": "Fénix OAuth codes"}
+
+
+@dataclass
+class Replayed:
+    offset: float
+    client: str
+    method: str
+    target: str
+    endpoint: str
+    json: Optional[dict] = None
+    upload: bool = False
+
+
+class Remapper:
+    """ Rewrites logged paths onto the seeded dataset, consistently, through the API's routes. """
+
+    def __init__(self, url_map, data: Dataset):
+        self.adapter = url_map.bind("localhost")
+        self.data = data
+        self._usernames: Dict[str, str] = {}
+        self._slugs: Dict[str, str] = {}
+
+    def _map(self, mapping: Dict[str, str], pool: List[str], original: str) -> str:
+        if original not in mapping:
+            mapping[original] = pool[len(mapping) % len(pool)]
+        return mapping[original]
+
+    def remap(self, method: str, target: str) -> tuple[str, str, dict]:
+        """
+        :return: Endpoint, ``unmatched`` for paths matching no route which are replayed unchanged, the path and query
+            on the dataset and the view arguments.
+        """
+        parts = urlsplit(target)
+        try:
+            endpoint, args = self.adapter.match(parts.path, method=method)
+        except (HTTPException, RequestRedirect):
+            return "unmatched", target, {}
+        if "username" in args:
+            args["username"] = self._map(self._usernames, self.data.usernames, args["username"])
+        if "slug" in args:
+            args["slug"] = self._map(self._slugs, self.data.slugs, args["slug"])
+        if "task_id" in args:
+            args["task_id"] = args["task_id"] % self.data.tasks + 1
+        path = self.adapter.build(endpoint, args)
+        return endpoint, path + (f"?{parts.query}" if parts.query else ""), args
+
+
+def plan(entries: Iterable[AccessLogEntry], remapper: Remapper, *, speed: float,
+         limit: Optional[int] = None) -> tuple[List[Replayed], Dict[str, int]]:
+    """ Requests to replay, at their offset from the first one sped up ``speed`` times, and those skipped by reason. """
+    replayed, skipped, start = [], {}, None
+    for entry in entries:
+        if limit is not None and len(replayed) >= limit:
+            break
+        start = start or entry.time
+        endpoint, target, args = remapper.remap(entry.method, entry.target)
+        if endpoint in UNREPLAYABLE:
+            reason = f"{endpoint}, {UNREPLAYABLE[endpoint]}"
+        elif entry.method in WRITES and endpoint not in BODIES and endpoint not in UPLOADS and endpoint != "auth.login":
+            reason = f"{endpoint}, creates or deletes"
+        else:
+            replayed.append(Replayed(offset=(entry.time - start).total_seconds() / speed,
+                                     client=f"{entry.client} {entry.agent}", method=entry.method, target=target, endpoint=endpoint,
+                                     json=BODIES[endpoint](args) if endpoint in BODIES else None,
+                                     upload=endpoint in UPLOADS))
+            continue
+        skipped[reason] = skipped.get(reason, 0) + 1
+    return replayed, skipped
+
+
+class Clients:
+    """ A logged in session per client of the log, with cookies kept in ``cookies_path`` between replays. """
+
+    def __init__(self, api: str, data: Dataset, *, admin: str, password: str, cookies_path: Optional[str] = None):
+        self.api = api
+        self.data = data
+        self.admin = admin
+        self.password = password
+        self.cookies_path = cookies_path
+        self.sessions: Dict[str, requests.Session] = {}
+        self.usernames: Dict[str, str] = {}
+
+    def assign(self, replayed: List[Replayed]):
+        writers = {r.client for r in replayed if r.method in WRITES and r.endpoint != "auth.login"}
+        for r in replayed:
+            if r.client not in self.usernames:
+                self.usernames[r.client] = self.admin if r.client in writers else \
+                    self.data.usernames[len(self.usernames) % len(self.data.usernames)]
+
+    def login(self, concurrency: int) -> int:
+        """ Log in every client without a recorded cookie, returns the number of logins. """
+        recorded = {}
+        if self.cookies_path:
+            try:
+                with open(self.cookies_path) as f:
+                    recorded = json.load(f)
+            except FileNotFoundError:
+                pass
+
+        def login(client: str) -> bool:
+            session = self.sessions[client] = requests.Session()
+            if client in recorded:
+                session.cookies.update(recorded[client])
+                return False
+            rsp = session.post(self.api + "/login", json={"username": self.usernames[client], "password": self.password})
+            rsp.raise_for_status()
+            return True
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            logins = sum(executor.map(login, self.usernames))
+        if self.cookies_path:
+            with open(self.cookies_path, "w") as f:
+                json.dump({client: session.cookies.get_dict() for client, session in self.sessions.items()}, f)
+        return logins
+
+
+def replay(replayed: List[Replayed], clients: Clients, *, concurrency: int) -> dict:
+    image = png_image()
+    results: Dict[str, dict] = {}
+    lock = threading.Lock()
+
+    def send(r: Replayed, due: float):
+        lag = time.perf_counter() - due
+        start = time.perf_counter()
+        json_body = r.json
+        if r.endpoint == "auth.login":
+            json_body = {"username": clients.usernames[r.client], "password": clients.password}
+        files = {"file": ("image.png", io.BytesIO(image), "image/png")} if r.upload else None
+        try:
+            status = clients.sessions[r.client].request(r.method, clients.api + r.target, json=json_body, files=files,
+                                                        allow_redirects=False).status_code
+        except requests.RequestException:
+            status = 0
+        elapsed = time.perf_counter() - start
+        with lock:
+            result = results.setdefault(r.endpoint, {"latencies": [], "lags": [], "status": {}})
+            result["latencies"].append(elapsed)
+            result["lags"].append(lag)
+            result["status"][str(status)] = result["status"].get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for r in replayed:
+            due = start + r.offset
+            if (wait := due - time.perf_counter()) > 0:
+                time.sleep(wait)
+            executor.submit(send, r, due)
+    elapsed = time.perf_counter() - start
+
+    report = {}
+    for endpoint, result in results.items():
+        errors = sum(n for status, n in result["status"].items() if not 200 <= int(status) < 400)
+        report[endpoint] = summarize(result["latencies"], elapsed=elapsed)
+        report[endpoint].update(errors=errors, error_rate=errors / len(result["latencies"]), status=result["status"],
+                                lag_p50_ms=percentile(result["lags"], 50) * 1000,
+                                lag_p95_ms=percentile(result["lags"], 95) * 1000)
+    return {"elapsed": elapsed, "endpoints": report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a gunicorn access log against a seeded API")
+    parser.add_argument("log", help="access log, in the access_log_format of gunicorn_conf.py")
+    parser.add_argument("--database", required=True, help="SQLite database of the API, seeded by flask seed")
+    parser.add_argument("--api", default="http://127.0.0.1:5000")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression, 10 replays 10x faster")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at most")
+    parser.add_argument("--limit", type=int, help="replay the first requests only")
+    parser.add_argument("--admin", default="admin", help="sysadmin the clients that wrote anything log in as")
+    parser.add_argument("--password", default="password", help="password of the admin and seeded members")
+    parser.add_argument("--cookies", help="file keeping the session cookies of the clients between replays")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    data = load_dataset(args.database)
+    # gunicorn logs requests as they end, slightly out of order
+    entries = sorted(read_access_logs([args.log]), key=lambda entry: entry.time)
+    replayed, skipped = plan(entries, Remapper(create_app().url_map, data), speed=args.speed, limit=args.limit)
+    if not replayed:
+        parser.error("no requests to replay in the log")
+
+    clients = Clients(args.api, data, admin=args.admin, password=args.password, cookies_path=args.cookies)
+    clients.assign(replayed)
+    logins = clients.login(args.concurrency)
+    print(f"replaying {len(replayed)} requests of {len(clients.sessions)} clients ({logins} logged in now) over "
+          f"{replayed[-1].offset:.1f}s at {args.speed}x, {sum(skipped.values())} skipped")
+
+    results = replay(replayed, clients, concurrency=args.concurrency)
+    print(f"{'endpoint':<48} {'reqs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'lag p95':>9}")
+    for endpoint, r in sorted(results["endpoints"].items(), key=lambda item: -item[1]["requests"]):
+        print(f"{endpoint:<48} {r['requests']:>6} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}"
+              f" {r['errors']:>7} {r['lag_p95_ms']:>9.1f}")
+    print(f"replayed in {results['elapsed']:.1f}s, the log took {replayed[-1].offset:.1f}s at {args.speed}x")
+    for reason, n in sorted(skipped.items()):
+        print(f"skipped {n} {reason}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"speed": args.speed, "concurrency": args.concurrency, "skipped": skipped, **results}, f,
+                      indent=2)
+
+
+if __name__ == "__main__":
+    main()
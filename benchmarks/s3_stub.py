@@ -0,0 +1,163 @@
+"""
+Local stand-in for an S3 compatible object store, MinIO style, to run the API with ``IMAGES_STORAGE=s3`` and its tests
+without AWS or a MinIO server. Objects are kept in memory, requests aren't authenticated.
+
+It implements the path style subset of the S3 API used by :class:`app.image_store.S3ImageStore`: creating buckets,
+put, ranged get, head and delete of objects, ``ListObjectsV2`` and multipart uploads.
+
+Usage::
+
+    python -m benchmarks.s3_stub --port 9000 --bucket hs-api-images
+
+    IMAGES_STORAGE=s3 IMAGES_S3_BUCKET=hs-api-images IMAGES_S3_ENDPOINT_URL=http://127.0.0.1:9000 \\
+        AWS_ACCESS_KEY_ID=stub AWS_SECRET_ACCESS_KEY=stub IMAGES_S3_REGION=us-east-1 flask run
+"""
+import argparse
+import hashlib
+import secrets
+import threading
+import time
+
+from dataclasses import dataclass
+from email.utils import formatdate
+from http import HTTPStatus
+from typing import Dict
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from flask import Flask, Response, request
+from werkzeug.http import parse_range_header
+
+NAMESPACE = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+@dataclass
+class StubObject:
+    data: bytes
+    etag: str
+    mtime: float
+
+
+def create_stub_app(*, buckets=()) -> Flask:
+    """
+    :param buckets: Names of the buckets created at startup.
+    """
+    app = Flask(__name__)
+    lock = threading.Lock()
+    store: Dict[str, Dict[str, StubObject]] = {bucket: {} for bucket in buckets}
+    uploads: Dict[str, Dict[int, bytes]] = {}
+
+    def xml(root: str, body: str, status: int = HTTPStatus.OK) -> Response:
+        return Response(f'<?xml version="1.0" encoding="UTF-8"?><{root} xmlns="{NAMESPACE}">{body}</{root}>',
+                        status=status, mimetype="application/xml")
+
+    def error(code: str, status: int) -> Response:
+        return Response(f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code><Message>{code}</Message>'
+                        f'</Error>', status=status, mimetype="application/xml")
+
+    def put_object(bucket: str, key: str, data: bytes) -> StubObject:
+        obj = StubObject(data=data, etag=f'"{hashlib.md5(data).hexdigest()}"', mtime=time.time())
+        with lock:
+            store[bucket][key] = obj
+        return obj
+
+    @app.route("/<bucket>", methods=["PUT"])
+    def create_bucket(bucket):
+        with lock:
+            store.setdefault(bucket, {})
+        return Response(status=HTTPStatus.OK)
+
+    @app.route("/<bucket>", methods=["GET"])
+    def list_objects(bucket):
+        if bucket not in store:
+            return error("NoSuchBucket", HTTPStatus.NOT_FOUND)
+        prefix = request.args.get("prefix", "")
+        max_keys = request.args.get("max-keys", 1000, type=int)
+        after = request.args.get("continuation-token") or request.args.get("start-after", "")
+        with lock:
+            keys = sorted(k for k in store[bucket] if k.startswith(prefix) and k > after)
+            page = [(k, store[bucket][k]) for k in keys[:max_keys]]
+        truncated = len(keys) > max_keys
+        contents = "".join(
+            f"<Contents><Key>{escape(k)}</Key><Size>{len(o.data)}</Size><ETag>{escape(o.etag)}</ETag>"
+            f"<LastModified>{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(o.mtime))}.000Z</LastModified></Contents>"
+            for k, o in page)
+        token = f"<NextContinuationToken>{escape(page[-1][0])}</NextContinuationToken>" if truncated else ""
+        return xml("ListBucketResult", f"<Name>{bucket}</Name><Prefix>{escape(prefix)}</Prefix>"
+                                       f"<KeyCount>{len(page)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>"
+                                       f"<IsTruncated>{str(truncated).lower()}</IsTruncated>{token}{contents}")
+
+    @app.route("/<bucket>/<path:key>", methods=["PUT"])
+    def put(bucket, key):
+        if bucket not in store:
+            return error("NoSuchBucket", HTTPStatus.NOT_FOUND)
+        if "uploadId" in request.args:
+            with lock:
+                if (parts := uploads.get(request.args["uploadId"])) is None:
+                    return error("NoSuchUpload", HTTPStatus.NOT_FOUND)
+                data = request.get_data()
+                parts[request.args.get("partNumber", type=int)] = data
+            return Response(headers={"ETag": f'"{hashlib.md5(data).hexdigest()}"'})
+        return Response(headers={"ETag": put_object(bucket, key, request.get_data()).etag})
+
+    @app.route("/<bucket>/<path:key>", methods=["POST"])
+    def multipart(bucket, key):
+        if bucket not in store:
+            return error("NoSuchBucket", HTTPStatus.NOT_FOUND)
+        if "uploads" in request.args:
+            upload_id = secrets.token_hex(16)
+            with lock:
+                uploads[upload_id] = {}
+            return xml("InitiateMultipartUploadResult",
+                       f"<Bucket>{bucket}</Bucket><Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId>")
+        with lock:
+            parts = uploads.pop(request.args.get("uploadId", ""), None)
+        if parts is None:
+            return error("NoSuchUpload", HTTPStatus.NOT_FOUND)
+        numbers = [int(e.text) for e in ElementTree.fromstring(request.get_data()).iter(f"{{{NAMESPACE}}}PartNumber")]
+        if not numbers or any(n not in parts for n in numbers):
+            return error("InvalidPart", HTTPStatus.BAD_REQUEST)
+        obj = put_object(bucket, key, b"".join(parts[n] for n in sorted(numbers)))
+        return xml("CompleteMultipartUploadResult",
+                   f"<Bucket>{bucket}</Bucket><Key>{escape(key)}</Key><ETag>{escape(obj.etag)}</ETag>")
+
+    @app.route("/<bucket>/<path:key>", methods=["GET", "HEAD"])
+    def get(bucket, key):
+        with lock:
+            obj = store.get(bucket, {}).get(key)
+        if obj is None:
+            return error("NoSuchKey", HTTPStatus.NOT_FOUND)
+
+        headers = {"ETag": obj.etag, "Last-Modified": formatdate(obj.mtime, usegmt=True), "Accept-Ranges": "bytes"}
+        data, status = obj.data, HTTPStatus.OK
+        if request.headers.get("Range"):
+            byte_range = parse_range_header(request.headers["Range"])
+            if byte_range is None or (bounds := byte_range.range_for_length(len(obj.data))) is None:
+                return error("InvalidRange", HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            data, status = obj.data[bounds[0]:bounds[1]], HTTPStatus.PARTIAL_CONTENT
+            headers["Content-Range"] = f"bytes {bounds[0]}-{bounds[1] - 1}/{len(obj.data)}"
+        return Response(data, status=status, headers=headers, mimetype="application/octet-stream")
+
+    @app.route("/<bucket>/<path:key>", methods=["DELETE"])
+    def delete(bucket, key):
+        with lock:
+            if "uploadId" in request.args:
+                uploads.pop(request.args["uploadId"], None)
+            else:
+                store.get(bucket, {}).pop(key, None)
+        return Response(status=HTTPStatus.NO_CONTENT)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="S3 compatible object store stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--bucket", action="append", default=[], help="bucket created at startup, repeatable")
+    args = parser.parse_args()
+    create_stub_app(buckets=args.bucket).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
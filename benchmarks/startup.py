@@ -0,0 +1,126 @@
+"""
+Startup time of an API worker, importing the app and ``create_app()``, measured in fresh interpreters with
+``python -X importtime`` as the modules a running interpreter already imported would hide it.
+
+Reports the median import and ``create_app()`` times of ``--runs`` interpreters, the modules taking the most time to
+import themselves, and which optional integrations were imported although they aren't configured.
+
+Usage::
+
+    python -m benchmarks.startup --runs 10 --top 25 --json startup.json
+    python -m benchmarks.startup --compare startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.endpoints import git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# last line of the output, the rest may be logs
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_app_ms": (created - imported) * 1000,
+                  "modules": sorted(sys.modules)}))
+"""
+# imported on demand only, e.g. sentry_sdk with SENTRY_DSN and alembic by the flask db commands
+OPTIONAL_MODULES = ["sentry_sdk", "redis", "flask_migrate", "alembic", "boto3", "cProfile"]
+
+
+@dataclass
+class StartupSample:
+    import_ms: float
+    create_app_ms: float
+    # microseconds importing each module itself and with the modules it imported
+    import_times: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    modules: List[str] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        return self.import_ms + self.create_app_ms
+
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, int]]:
+    """ Self and cumulative microseconds of each module in the ``-X importtime`` output. """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def measure_startup(env: Optional[Dict[str, str]] = None) -> StartupSample:
+    """ Import the app and create it in a new interpreter, with ``env`` added to the environment. """
+    with tempfile.TemporaryDirectory(prefix="hs-api-startup-") as workdir:
+        env = {"SQLALCHEMY_DATABASE_URI": os.path.join(workdir, "db.sqlite3"), "SENTRY_DSN": "",
+               "SESSION_TYPE": "cachelib", "SESSION_DIR": os.path.join(workdir, "sessions"), "RATE_LIMIT_REDIS": "",
+               "IMAGES_STORAGE": "local", "LOG_FILE": "", **(env or {})}
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", SCRIPT], cwd=ROOT, text=True,
+                                 capture_output=True, env={**os.environ, **env})
+    if process.returncode != 0:
+        raise RuntimeError(f"starting the app failed:\n{process.stderr[-2000:]}")
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    return StartupSample(import_ms=result["import_ms"], create_app_ms=result["create_app_ms"],
+                         import_times=parse_importtime(process.stderr), modules=result["modules"])
+
+
+def summarize_runs(samples: List[StartupSample], *, top: int) -> dict:
+    """ Medians of the runs and the ``top`` modules by median self import time, in milliseconds. """
+    modules = {name for s in samples for name in s.import_times}
+    own = {name: statistics.median(s.import_times.get(name, (0, 0))[0] for s in samples) / 1000 for name in modules}
+    return {
+        "runs": len(samples),
+        "import_ms": statistics.median(s.import_ms for s in samples),
+        "create_app_ms": statistics.median(s.create_app_ms for s in samples),
+        "total_ms": statistics.median(s.total_ms for s in samples),
+        "modules_imported": len(samples[0].modules),
+        "slowest_modules": dict(sorted(own.items(), key=lambda item: item[1], reverse=True)[:top]),
+        "optional_imported": [name for name in OPTIONAL_MODULES if name in samples[0].modules],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API worker startup benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="interpreters started")
+    parser.add_argument("--top", type=int, default=25, help="slowest modules to list")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results of a previous run to compare with")
+    args = parser.parse_args()
+
+    measure_startup()  # warm the filesystem and bytecode caches
+    results = {"commit": git_commit(), **summarize_runs([measure_startup() for _ in range(args.runs)], top=args.top)}
+
+    print(f"median of {results['runs']} runs: import {results['import_ms']:.1f} ms, create_app "
+          f"{results['create_app_ms']:.1f} ms, total {results['total_ms']:.1f} ms, "
+          f"{results['modules_imported']} modules")
+    print(f"optional integrations imported: {', '.join(results['optional_imported']) or 'none'}")
+    print(f"\n  {'module':<60} {'self ms':>9}")
+    for name, ms in results["slowest_modules"].items():
+        print(f"  {name:<60} {ms:>9.2f}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\ncompared with {previous.get('commit') or 'previous run'}")
+        for key in ("import_ms", "create_app_ms", "total_ms"):
+            print(f"  {key:<16} {previous[key]:>9.1f} -> {results[key]:>9.1f} ({results[key] / previous[key] - 1:+.0%})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
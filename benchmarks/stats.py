@@ -0,0 +1,19 @@
+from typing import Dict, List
+
+# the same percentiles as flask latency-report
+from app.instrumentation.access_log import percentile
+
+
+def summarize(latencies: List[float], *, elapsed: float, errors: int = 0) -> Dict[str, float]:
+    """ Latency distribution in milliseconds and throughput of a run. """
+    count = len(latencies) + errors
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=float("nan")) * 1000,
+    }
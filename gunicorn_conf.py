@@ -1,8 +1,27 @@
 # gunicorn_config.py
+import os
+import shutil
+
 bind = "0.0.0.0:5000"
 accesslog = "/hs-api/resources/access.log"
 errorlog = "/hs-api/resources/error.log"
 loglevel = "info"
+# then the duration in microseconds, and the request id and matched endpoint the API returns, for flask latency-report
 access_log_format = (
-    '%({X-Forwarded-For}i)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+    '%({X-Forwarded-For}i)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" '
+    '%(D)s %({X-Request-Id}o)s %({X-Endpoint}o)s'
 )
+
+# workers write their Prometheus samples there for /metrics to aggregate, set before they import prometheus_client
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/hs-api/resources/prometheus")
+
+
+def on_starting(server):
+    # samples of the workers of a previous run would be summed with the new ones
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
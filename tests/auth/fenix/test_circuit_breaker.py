@@ -0,0 +1,62 @@
+import pytest
+
+from app.auth.fenix.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise ConnectionError("down")
+
+def succeed():
+    return "ok"
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+def test_opens_after_consecutive_failures(breaker: CircuitBreaker):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(succeed)
+
+def test_success_resets_failures(breaker: CircuitBreaker):
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.call(succeed) == "ok"
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_trial_closes(breaker: CircuitBreaker, clock: FakeClock):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    clock.now += 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.call(succeed) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_trial_reopens(breaker: CircuitBreaker, clock: FakeClock):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    clock.now += 10
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(succeed)
@@ -0,0 +1,68 @@
+import json
+
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from app.auth.fenix.circuit_breaker import CircuitBreaker
+from app.auth.fenix.fenix_service import FenixService, FenixUnavailableError
+
+
+def response(status_code: int, body=None) -> requests.Response:
+    rsp = requests.Response()
+    rsp.status_code = status_code
+    rsp._content = b"" if body is None else json.dumps(body).encode()
+    return rsp
+
+@pytest.fixture
+def fenix_service():
+    service = FenixService(client_id="id", client_secret="secret", root_uri="http://localhost:5000",
+                           redirect_endpoint="/fenix-login-callback", pool_size=4, connect_timeout=1,
+                           read_timeout=2, circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    service.session = MagicMock()
+    return service
+
+def test_session_configuration():
+    service = FenixService(client_id="id", client_secret="secret", root_uri="http://localhost:5000",
+                           redirect_endpoint="/fenix-login-callback", pool_size=4, max_retries=3)
+    adapter = service.session.get_adapter("https://fenix.tecnico.ulisboa.pt")
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 3
+    assert "POST" not in adapter.max_retries.allowed_methods
+    assert "GET" in adapter.max_retries.allowed_methods
+
+def test_fetch_access_token(fenix_service: FenixService):
+    fenix_service.session.request.return_value = response(200, {"access_token": "token"})
+    assert fenix_service.fetch_access_token(redirect_endpoint="/fenix-login-callback", code="code") == "token"
+    args, kwargs = fenix_service.session.request.call_args
+    assert args[0] == "POST"
+    assert kwargs["timeout"] == (1, 2)
+
+def test_fetch_access_token_rejected(fenix_service: FenixService):
+    fenix_service.session.request.return_value = response(400)
+    with pytest.raises(ValueError) as exc_info:
+        fenix_service.fetch_access_token(redirect_endpoint="/fenix-login-callback", code="code")
+    assert not isinstance(exc_info.value, FenixUnavailableError)
+    assert fenix_service.circuit_breaker.state == CircuitBreaker.CLOSED
+
+def test_fetch_user_info(fenix_service: FenixService):
+    fenix_service.session.request.return_value = response(200, {"username": "ist100000"})
+    assert fenix_service.fetch_user_info("token") == {"username": "ist100000"}
+
+def test_fetch_user_info_timeout(fenix_service: FenixService):
+    fenix_service.session.request.side_effect = requests.exceptions.ReadTimeout("timed out")
+    with pytest.raises(FenixUnavailableError):
+        fenix_service.fetch_user_info("token")
+
+def test_circuit_opens_on_server_errors(fenix_service: FenixService):
+    fenix_service.session.request.return_value = response(503)
+    for _ in range(2):
+        with pytest.raises(FenixUnavailableError):
+            fenix_service.fetch_user_info("token")
+    fenix_service.session.request.reset_mock()
+
+    with pytest.raises(FenixUnavailableError) as exc_info:
+        fenix_service.fetch_user_info("token")
+    assert "circuit is open" in str(exc_info.value)
+    fenix_service.session.request.assert_not_called()
@@ -48,3 +48,14 @@ def test_has_priority_multiple_roles_invalid_false(system_scopes: SystemScopes):
 
 
 
+
+def test_from_yaml_config_parsed_once_per_version(tmp_path):
+    roles_path = tmp_path / "roles.yaml"
+    roles_path.write_text("scopes:\n  - name: general\n    roles:\n      - name: member\n        privilege: 1\n"
+                          "        permissions:\n")
+    first = SystemScopes.from_yaml_config(str(roles_path))
+    assert SystemScopes.from_yaml_config(str(roles_path)) is first
+
+    roles_path.write_text(roles_path.read_text().replace("member", "participant"))
+    os.utime(roles_path, ns=(0, os.stat(roles_path).st_mtime_ns + 1))
+    assert SystemScopes.from_yaml_config(str(roles_path)).get_scope("general").roles[0].name == "participant"
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from app.password_hasher import PasswordHasher, PasswordHasherBusyError
+
+
+@pytest.fixture
+def hasher():
+    return PasswordHasher(rounds=4, max_workers=1, max_queue=0)
+
+def test_hash_and_verify(hasher: PasswordHasher):
+    hashed = hasher.hash("password")
+    assert hashed != "password"
+    assert hasher.verify("password", hashed)
+    assert not hasher.verify("invalid_password", hashed)
+
+def test_hash_uses_configured_cost(hasher: PasswordHasher):
+    assert hasher.hash("password").startswith("$2b$04$")
+    hasher.configure(rounds=5)
+    assert hasher.hash("password").startswith("$2b$05$")
+
+def test_needs_rehash(hasher: PasswordHasher):
+    hashed = hasher.hash("password")
+    assert not hasher.needs_rehash(hashed)
+    hasher.configure(rounds=5)
+    assert hasher.needs_rehash(hashed)
+    assert hasher.needs_rehash("not a bcrypt hash")
+
+def test_busy_when_saturated(hasher: PasswordHasher):
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait()
+
+    thread = threading.Thread(target=hasher._run, args=(blocking,))
+    thread.start()
+    started.wait()
+    try:
+        with pytest.raises(PasswordHasherBusyError):
+            hasher.hash("password")
+    finally:
+        release.set()
+        thread.join()
+
+    assert hasher.verify("password", hasher.hash("password"))
+
+def test_queue_depth(hasher: PasswordHasher):
+    hasher.configure(max_workers=1, max_queue=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait()
+
+    threads = [threading.Thread(target=hasher._run, args=(blocking,)) for _ in range(2)]
+    threads[0].start()
+    started.wait()
+    threads[1].start()
+    while hasher.queue_depth == 0:
+        pass
+    assert hasher.queue_depth == 1
+    release.set()
+    for t in threads:
+        t.join()
+    assert hasher.queue_depth == 0
@@ -0,0 +1,121 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from flask import Flask
+from redis import RedisError
+
+from app.errors import handle_http_exception
+from app.rate_limiter import RateLimiter, parse_rate, client_ip, json_field
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def rate_limiter(clock):
+    return RateLimiter(clock=clock)
+
+@pytest.fixture
+def app(rate_limiter):
+    from werkzeug.exceptions import HTTPException
+    app = Flask(__name__)
+    app.register_error_handler(HTTPException, handle_http_exception)
+
+    @app.route("/login", methods=["POST"])
+    @rate_limiter.limit("login-ip", key=client_ip, rate="3/minute")
+    @rate_limiter.limit("login-username", key=json_field("username"), rate=lambda: "2/minute")
+    def login():
+        return {"description": "ok"}
+
+    return app
+
+@pytest.mark.parametrize("rate, expected", [("10/minute", (10, 10 / 60)), ("1/second", (1, 1.0)),
+                                            ("24/day", (24, 24 / 86400))])
+def test_parse_rate(rate, expected):
+    assert parse_rate(rate) == expected
+
+@pytest.mark.parametrize("rate", ["10", "0/minute", "ten/minute", "10/week"])
+def test_parse_invalid_rate(rate):
+    with pytest.raises(ValueError):
+        parse_rate(rate)
+
+def test_token_bucket(rate_limiter: RateLimiter, clock: FakeClock):
+    for _ in range(3):
+        assert rate_limiter.consume("limit", "bucket", 3, 1.0)[0]
+    allowed, retry_after = rate_limiter.consume("limit", "bucket", 3, 1.0)
+    assert not allowed
+    assert retry_after == 1
+
+    clock.now += 1
+    assert rate_limiter.consume("limit", "bucket", 3, 1.0)[0]
+    assert not rate_limiter.consume("limit", "bucket", 3, 1.0)[0]
+    assert rate_limiter.consume("limit", "other_bucket", 3, 1.0)[0]
+
+def test_token_bucket_refill_capped(rate_limiter: RateLimiter, clock: FakeClock):
+    rate_limiter.consume("limit", "bucket", 2, 1.0)
+    clock.now += 3600
+    assert rate_limiter.consume("limit", "bucket", 2, 1.0)[0]
+    assert rate_limiter.consume("limit", "bucket", 2, 1.0)[0]
+    assert not rate_limiter.consume("limit", "bucket", 2, 1.0)[0]
+
+def test_limits_bucketed_separately(rate_limiter: RateLimiter):
+    assert rate_limiter.consume("limit", "bucket", 1, 1.0)[0]
+    assert rate_limiter.consume("other_limit", "bucket", 1, 1.0)[0]
+    assert not rate_limiter.consume("limit", "bucket", 1, 1.0)[0]
+
+def test_local_buckets_bounded_by_recent_use(rate_limiter: RateLimiter, monkeypatch):
+    monkeypatch.setattr(RateLimiter, "MAX_LOCAL_BUCKETS", 2)
+    rate_limiter.consume("limit", "a", 1, 1.0)
+    rate_limiter.consume("limit", "b", 1, 1.0)
+    assert not rate_limiter.consume("limit", "a", 1, 1.0)[0]  # a is the most recently used
+    rate_limiter.consume("limit", "c", 1, 1.0)  # evicts b
+
+    assert list(rate_limiter._buckets["limit"]) == ["a", "c"]
+    assert not rate_limiter.consume("limit", "a", 1, 1.0)[0]
+    assert rate_limiter.consume("limit", "b", 1, 1.0)[0]
+
+def test_limit_by_username(app: Flask):
+    with app.test_client() as client:
+        for _ in range(2):
+            assert client.post("/login", json={"username": "user"}).status_code == 200
+        rsp = client.post("/login", json={"username": "USER"})
+        assert rsp.status_code == 429
+        assert rsp.mimetype == "application/json"
+        assert int(rsp.headers["Retry-After"]) > 0
+
+def test_limit_by_ip(app: Flask):
+    with app.test_client() as client:
+        for i in range(3):
+            assert client.post("/login", json={"username": f"user{i}"}).status_code == 200
+        assert client.post("/login", json={"username": "user3"}).status_code == 429
+        assert client.post("/login", json={"username": "user3"},
+                           environ_base={"REMOTE_ADDR": "10.0.0.1"}).status_code == 200
+
+def test_redis_backend():
+    redis = MagicMock()
+    redis.register_script.return_value = MagicMock(return_value=[0, "0.25"])
+    rate_limiter = RateLimiter(redis=redis)
+
+    allowed, retry_after = rate_limiter.consume("limit", "bucket", 10, 0.5)
+    assert not allowed
+    assert retry_after == 2
+    keys = redis.register_script.return_value.call_args.kwargs["keys"]
+    assert keys == ["hs-api:rate-limit:limit:bucket"]
+
+def test_redis_failure_falls_back_to_process_memory():
+    redis = MagicMock()
+    redis.register_script.return_value = MagicMock(side_effect=RedisError("down"))
+    rate_limiter = RateLimiter(redis=redis)
+
+    assert rate_limiter.consume("limit", "bucket", 1, 0.5)[0]
+    assert not rate_limiter.consume("limit", "bucket", 1, 0.5)[0]
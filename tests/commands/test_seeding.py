@@ -0,0 +1,74 @@
+import re
+
+import pytest
+from flask import Flask
+from sqlalchemy import func, select
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models.member_model import Member
+from app.models.project_model import Project
+from app.models.project_participation_model import ProjectParticipation
+from app.models.task_model import Task
+from app.schemas.member_schema import MemberSchema
+from app.schemas.project_schema import ProjectSchema
+from app.schemas.task_schema import TaskSchema
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+
+def seed(app: Flask, *args):
+    result = app.test_cli_runner().invoke(args=["seed", "--members", "20", "--projects", "4",
+                                                "--participations-per-member", "2", "--tasks-per-participation", "3",
+                                                *args])
+    assert result.exit_code == 0, result.output
+    return result
+
+
+def count(model) -> int:
+    return db.session.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_seed_counts(app: Flask):
+    assert "Seeded 20 members, 4 projects, 40 participations and 120 tasks." in seed(app).output
+    assert (count(Member), count(Project), count(ProjectParticipation), count(Task)) == (20, 4, 40, 120)
+
+
+def test_seeded_data_is_valid(app: Flask):
+    seed(app)
+    roles = {"member", "dev", "president", "vice", "rh", "finance", "marketing", "lab", "hook"}
+    for member in db.session.execute(select(Member)).unique().scalars():
+        MemberSchema.from_member(member)
+        assert re.match(r"^ist1[0-9]{5,7}$", member.ist_id)
+        assert "member" in member.roles and set(member.roles) <= roles
+        assert member.matches_password("password")
+    for project in db.session.execute(select(Project)).unique().scalars():
+        ProjectSchema.from_project(project)
+    for task in db.session.execute(select(Task)).unique().scalars():
+        TaskSchema.from_task(task)
+    assert db.session.execute(select(func.count(func.distinct(ProjectParticipation.project_id)))
+                              .group_by(ProjectParticipation.member_id)).scalars().all() == [2] * 20
+
+
+def test_seed_is_deterministic(app: Flask):
+    seed(app, "--seed", "7")
+    first = db.session.execute(select(Member.username, Member._roles, Member.course)).all()
+    db.drop_all()
+    db.create_all()
+    seed(app, "--seed", "7")
+    assert db.session.execute(select(Member.username, Member._roles, Member.course)).all() == first
+
+
+def test_seed_again_adds_to_the_database(app: Flask):
+    seed(app)
+    seed(app)
+    assert (count(Member), count(Project), count(Task)) == (40, 8, 240)
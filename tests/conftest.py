@@ -0,0 +1,66 @@
+import threading
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from werkzeug.serving import make_server
+
+from app.config import Config
+from app.extensions import log_pipeline, password_hasher
+from app.image_store import S3ImageStore
+from app.instrumentation.queries import count_queries
+
+# the benchmarks package is a test dependency, see [tool.pytest.ini_options] in pyproject.toml
+from benchmarks.s3_stub import create_stub_app
+
+# bcrypt's cost is deliberately slow, tests only need valid hashes
+Config.BCRYPT_ROUNDS = 4
+password_hasher.configure(rounds=Config.BCRYPT_ROUNDS)
+
+
+@pytest.fixture(autouse=True)
+def log_to_file(tmp_path, monkeypatch):
+    """
+    Apps log to files of the test, the logging thread would write to stdout after pytest stopped capturing it.
+    Stopping the pipeline writes the records left.
+    """
+    monkeypatch.setattr(Config, "LOG_FILE", str(tmp_path / "logs" / "app.log"))
+    monkeypatch.setattr(Config, "SLOW_QUERY_LOG", str(tmp_path / "logs" / "slow_queries.log"))
+    yield
+    log_pipeline.stop()
+
+
+@pytest.fixture()
+def assert_max_queries():
+    """
+    Fail when the block runs more than ``n`` SQL statements, to catch N+1 regressions::
+
+        with assert_max_queries(3):
+            client.get("/members")
+    """
+    @contextmanager
+    def assert_max_queries(n: int):
+        with count_queries(record=True) as stats:
+            yield stats
+        assert stats.statements <= n, \
+            f"{stats.statements} SQL statements executed, expected at most {n}:\n" + "\n".join(stats.executed)
+    return assert_max_queries
+
+
+@pytest.fixture(scope="session")
+def s3_endpoint():
+    """ URL of an in memory S3 compatible stand-in with an ``images`` bucket. """
+    server = make_server("127.0.0.1", 0, create_stub_app(buckets=["images"]), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.port}"
+    server.shutdown()
+    thread.join()
+
+
+@pytest.fixture()
+def s3_image_store(s3_endpoint, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "stub")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "stub")
+    # unique prefix, the stand-in keeps the objects for the whole session
+    return S3ImageStore(bucket="images", prefix=f"{uuid.uuid4()}/", endpoint_url=s3_endpoint, region="us-east-1")
@@ -0,0 +1,120 @@
+import base64
+import io
+import threading
+
+import PIL.Image
+import pytest
+
+from app.image_resizer import ImageResizer, ImageResizeError, variant_path
+from app.image_store import LocalImageStore
+
+
+def encode(width: int, height: int, image_format: str = "PNG") -> io.BytesIO:
+    buffer = io.BytesIO()
+    PIL.Image.new("RGB", (width, height), color=(200, 30, 30)).save(buffer, format=image_format)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def image_store(tmp_path):
+    return LocalImageStore(str(tmp_path))
+
+
+@pytest.fixture
+def resizer(image_store):
+    return ImageResizer(image_store=image_store, sizes=(48, 128))
+
+
+def test_variant_path():
+    assert variant_path("sha256/01/23/0123456789abcdef.png", 48) == "sha256/01/23/0123456789abcdef.48.png"
+
+
+def test_get_variant_downscales_keeping_aspect_ratio(image_store: LocalImageStore, resizer: ImageResizer):
+    stored = image_store.save(encode(400, 200), ".png")
+
+    variant = resizer.get_variant(stored.path, 48)
+    assert variant == variant_path(stored.path, 48)
+    with PIL.Image.open(image_store.resolve(variant)) as image:
+        assert image.size == (48, 24)
+        assert image.format == "PNG"
+
+
+def test_get_variant_keeps_jpeg_format(image_store: LocalImageStore, resizer: ImageResizer):
+    stored = image_store.save(encode(300, 300, "JPEG"), ".jpg")
+
+    with PIL.Image.open(image_store.resolve(resizer.get_variant(stored.path, 128))) as image:
+        assert image.size == (128, 128)
+        assert image.format == "JPEG"
+
+
+def test_get_variant_invalid_size(image_store: LocalImageStore, resizer: ImageResizer):
+    stored = image_store.save(encode(100, 100), ".png")
+    with pytest.raises(ValueError):
+        resizer.get_variant(stored.path, 64)
+
+
+def test_get_variant_undecodable_image(image_store: LocalImageStore, resizer: ImageResizer):
+    stored = image_store.save(io.BytesIO(b"not an image"), ".png")
+    with pytest.raises(ImageResizeError):
+        resizer.get_variant(stored.path, 48)
+
+
+def test_get_variant_renders_once(image_store: LocalImageStore, resizer: ImageResizer, monkeypatch):
+    stored = image_store.save(encode(400, 400), ".png")
+    renders = []
+    render = resizer._render
+
+    def counting_render(path, size):
+        renders.append(size)
+        return render(path, size)
+
+    monkeypatch.setattr(resizer, "_render", counting_render)
+    barrier = threading.Barrier(8)
+
+    def request_variant():
+        barrier.wait()
+        resizer.get_variant(stored.path, 48)
+
+    threads = [threading.Thread(target=request_variant) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert renders == [48]
+
+
+def test_delete_variants(image_store: LocalImageStore, resizer: ImageResizer):
+    stored = image_store.save(encode(400, 400), ".png")
+    variants = [resizer.get_variant(stored.path, size) for size in (48, 128)]
+
+    resizer.delete_variants(stored.path)
+    assert not any(image_store.exists(v) for v in variants)
+    assert image_store.exists(stored.path)
+
+
+def test_render_placeholder(image_store: LocalImageStore, resizer: ImageResizer):
+    stored = image_store.save(encode(1200, 600, "JPEG"), ".jpg")
+
+    placeholder = resizer.render_placeholder(stored.path)
+    assert placeholder.startswith("data:image/webp;base64,")
+    assert len(placeholder) < 1024
+    with PIL.Image.open(io.BytesIO(base64.b64decode(placeholder.split(",", 1)[1]))) as image:
+        assert image.size == (16, 8)
+
+
+def test_render_placeholder_undecodable(image_store: LocalImageStore, resizer: ImageResizer):
+    stored = image_store.save(io.BytesIO(b"\x89PNG\r\n\x1a\nnot an image"), ".png")
+    with pytest.raises(ImageResizeError):
+        resizer.render_placeholder(stored.path)
+
+
+def test_images_above_pixel_limit_not_decoded(image_store: LocalImageStore):
+    resizer = ImageResizer(image_store=image_store, sizes=(48,), max_pixels=100 * 100)
+    stored = image_store.save(encode(200, 100), ".png")
+    with pytest.raises(ImageResizeError, match="exceed the limit"):
+        resizer.get_variant(stored.path, 48)
+    with pytest.raises(ImageResizeError, match="exceed the limit"):
+        resizer.render_placeholder(stored.path)
+    assert not image_store.exists(variant_path(stored.path, 48))
@@ -0,0 +1,101 @@
+import io
+import os
+import time
+
+import pytest
+
+from app.image_store import ImageStore, LocalImageStore, ImageTooLargeError, S3ImageStore
+
+
+@pytest.fixture
+def image_store(tmp_path):
+    return LocalImageStore(str(tmp_path))
+
+
+def test_save_is_content_addressed(image_store: LocalImageStore):
+    first = image_store.save(io.BytesIO(b"image"), ".png")
+    second = image_store.save(io.BytesIO(b"image"), ".png")
+
+    assert first.path == second.path
+    assert first.path == f"sha256/{first.content_hash[:2]}/{first.content_hash[2:4]}/{first.content_hash}.png"
+    with open(image_store.resolve(first.path), "rb") as f:
+        assert f.read() == b"image"
+
+
+def test_save_too_large(image_store: LocalImageStore, tmp_path):
+    with pytest.raises(ImageTooLargeError):
+        image_store.save(io.BytesIO(bytes(1024)), ".png", max_size=1000)
+    assert [files for _, _, files in os.walk(tmp_path) if files] == []
+
+
+def test_collect_garbage(image_store: LocalImageStore):
+    kept = image_store.save(io.BytesIO(b"kept"), ".png")
+    orphan = image_store.save(io.BytesIO(b"orphan"), ".png")
+    image_store.put(io.BytesIO(b"variant"), orphan.path.replace(".png", ".48.webp"))
+    image_store.put(io.BytesIO(b"legacy"), "members/ist100000.png")
+    with open(image_store.resolve("sha256/.upload-interrupted"), "wb") as f:
+        f.write(b"partial")
+
+    assert image_store.collect_garbage([kept.content_hash]) == []
+
+    past = time.time() - 7200
+    for directory, _, files in os.walk(image_store.root):
+        for filename in files:
+            os.utime(os.path.join(directory, filename), (past, past))
+
+    assert sorted(image_store.collect_garbage([kept.content_hash], dry_run=True)) == sorted([
+        orphan.path, orphan.path.replace(".png", ".48.webp"), "sha256/.upload-interrupted"])
+    assert image_store.exists(orphan.path)
+
+    image_store.collect_garbage([kept.content_hash])
+    assert not image_store.exists(orphan.path)
+    assert not image_store.exists("sha256/.upload-interrupted")
+    assert image_store.exists(kept.path)
+    assert image_store.exists("members/ist100000.png")
+
+
+def test_s3_save_and_open(s3_image_store: S3ImageStore):
+    stored = s3_image_store.save(io.BytesIO(b"image"), ".png")
+    assert stored.path == f"sha256/{stored.content_hash[:2]}/{stored.content_hash[2:4]}/{stored.content_hash}.png"
+    assert s3_image_store.exists(stored.path)
+    assert s3_image_store.read(stored.path) == b"image"
+
+    file, size = s3_image_store.open(stored.path)
+    with file:
+        assert size == 5
+        file.seek(2)
+        assert file.read() == b"age"
+        file.seek(1)
+        assert file.read(2) == b"ma"
+
+
+def test_image_store_is_abstract():
+    with pytest.raises(TypeError):
+        ImageStore()
+
+
+def test_s3_missing_file(s3_image_store: S3ImageStore):
+    assert not s3_image_store.exists("members/1.png")
+    with pytest.raises(FileNotFoundError):
+        s3_image_store.open("members/1.png")
+    s3_image_store.delete("members/1.png")
+
+
+def test_s3_upload_of_largest_image(s3_image_store: S3ImageStore):
+    content = os.urandom(5 * 1024 * 1024)
+
+    stored = s3_image_store.put(io.BytesIO(content), "members/1.png")
+    assert stored.size == len(content)
+    assert s3_image_store.read("members/1.png") == content
+    assert s3_image_store.stat("members/1.png").content_hash == stored.content_hash
+
+
+def test_s3_collect_garbage(s3_image_store: S3ImageStore):
+    kept = s3_image_store.save(io.BytesIO(b"kept"), ".png")
+    orphan = s3_image_store.save(io.BytesIO(b"orphan"), ".png")
+    s3_image_store.put(io.BytesIO(b"legacy"), "members/ist100000.png")
+
+    assert s3_image_store.collect_garbage([kept.content_hash], grace_period=-60) == [orphan.path]
+    assert not s3_image_store.exists(orphan.path)
+    assert s3_image_store.exists(kept.path)
+    assert s3_image_store.exists("members/ist100000.png")
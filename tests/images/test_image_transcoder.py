@@ -0,0 +1,88 @@
+import io
+import threading
+
+import PIL.Image
+import pytest
+
+from app.image_resizer import ImageResizer, variant_path
+from app.image_store import LocalImageStore
+from app.image_transcoder import ImageTranscoder
+
+
+def encode(width: int, height: int) -> io.BytesIO:
+    buffer = io.BytesIO()
+    PIL.Image.new("RGBA", (width, height), color=(200, 30, 30, 128)).save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def image_store(tmp_path):
+    return LocalImageStore(str(tmp_path))
+
+
+@pytest.fixture
+def transcoder(image_store):
+    transcoder = ImageTranscoder(image_resizer=ImageResizer(image_store=image_store, sizes=(48,)), formats=("webp",))
+    yield transcoder
+    transcoder.wait()
+
+
+def test_unknown_formats_skipped(image_store: LocalImageStore):
+    transcoder = ImageTranscoder(image_resizer=ImageResizer(image_store=image_store), formats=("webp", "jxl"))
+    assert transcoder.formats == ("webp",)
+
+
+def test_schedule_encodes_in_background(image_store: LocalImageStore, transcoder: ImageTranscoder):
+    stored = image_store.save(encode(100, 50), ".png")
+
+    transcoder.schedule(stored.path)
+    transcoder.wait()
+    with PIL.Image.open(image_store.resolve(variant_path(stored.path, None, "webp"))) as image:
+        assert image.format == "WEBP"
+        assert image.size == (100, 50)
+        assert image.mode == "RGBA"
+
+
+def test_placeholder_rendered_in_background(image_store: LocalImageStore, transcoder: ImageTranscoder):
+    stored = image_store.save(encode(100, 50), ".png")
+    saved = []
+
+    transcoder.schedule_placeholder(stored.path, lambda placeholder: saved.append(
+        (placeholder, threading.current_thread().name)))
+    transcoder.wait()
+    [(placeholder, thread)] = saved
+    assert placeholder.startswith("data:image/webp;base64,")
+    assert thread.startswith("transcoder")
+
+
+def test_negotiate_serves_original_until_encoded(image_store: LocalImageStore, transcoder: ImageTranscoder):
+    stored = image_store.save(encode(100, 100), ".png")
+
+    assert transcoder.negotiate(stored.path, 48, ["image/webp"]) is None
+    transcoder.wait()
+    assert transcoder.negotiate(stored.path, 48, ["image/webp"]) == (variant_path(stored.path, 48, "webp"), "webp")
+    assert transcoder.negotiate(stored.path, 48, ["image/png"]) is None
+
+
+def test_queue_is_bounded(image_store: LocalImageStore, transcoder: ImageTranscoder, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(transcoder, "_encode", lambda *args: release.wait())
+    transcoder.max_queue = 2
+
+    for i in range(5):
+        transcoder.schedule(f"members/{i}.png")
+    transcoder.schedule("members/0.png")  # already pending
+    assert transcoder.queue_depth == 3
+
+    release.set()
+    transcoder.wait()
+    assert transcoder.queue_depth == 0
+
+
+def test_undecodable_image_not_encoded(image_store: LocalImageStore, transcoder: ImageTranscoder):
+    stored = image_store.save(io.BytesIO(b"not an image"), ".png")
+
+    transcoder.schedule(stored.path)
+    transcoder.wait()
+    assert not image_store.exists(variant_path(stored.path, None, "webp"))
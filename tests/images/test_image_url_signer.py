@@ -0,0 +1,77 @@
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from flask import Flask
+
+from app.image_url_signer import ImageUrlSigner
+from app.models.image_model import Image
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.add_url_rule("/images/<path:path>", endpoint="images.get_signed_image")
+    with app.test_request_context():
+        yield app
+
+
+def signed_params(url: str) -> dict:
+    parsed = urlparse(url)
+    params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+    return {"path": parsed.path.removeprefix("/images/"), "version": params["v"], "expires": int(params["expires"]),
+            "signature": params["sig"]}
+
+
+def test_signed_url_verifies(app: Flask):
+    signer = ImageUrlSigner(key="key", ttl=600, clock=Clock(1000))
+    url = signer.url_for(Image(path="sha256/ab/cd/abcd.png", content_hash="abcd"))
+
+    params = signed_params(url)
+    assert params["path"] == "sha256/ab/cd/abcd.png"
+    assert 1000 + 600 <= params["expires"] <= 1000 + 1200
+    assert signer.verify(**params)
+
+
+def test_tampered_url_rejected(app: Flask):
+    signer = ImageUrlSigner(key="key", ttl=600, clock=Clock(1000))
+    params = signed_params(signer.url_for(Image(path="members/1.png", content_hash="abcd")))
+
+    assert not signer.verify(**{**params, "path": "members/2.png"})
+    assert not signer.verify(**{**params, "version": "dcba"})
+    assert not signer.verify(**{**params, "expires": params["expires"] + 600})
+    assert not ImageUrlSigner(key="other key", clock=Clock(1000)).verify(**params)
+
+
+def test_url_expires(app: Flask):
+    clock = Clock(1000)
+    signer = ImageUrlSigner(key="key", ttl=600, clock=clock)
+    params = signed_params(signer.url_for(Image(path="members/1.png", content_hash="abcd")))
+
+    clock.now = params["expires"] + 1
+    assert not signer.verify(**params)
+
+
+def test_url_stable_within_window(app: Flask):
+    clock = Clock(1200)
+    signer = ImageUrlSigner(key="key", ttl=600, clock=clock)
+    image = Image(path="members/1.png", content_hash="abcd")
+
+    url = signer.url_for(image)
+    clock.now = 1799
+    assert signer.url_for(image) == url
+    clock.now = 1800
+    assert signer.url_for(image) != url
+
+
+def test_signing_disabled_without_key(app: Flask):
+    signer = ImageUrlSigner()
+    assert signer.url_for(Image(path="members/1.png", content_hash="abcd")) is None
+    assert not signer.verify("members/1.png", "abcd", 2000000000, "")
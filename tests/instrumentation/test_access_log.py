@@ -0,0 +1,114 @@
+import gzip
+import math
+from datetime import datetime, timezone
+
+import pytest
+from flask import Flask
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.instrumentation.access_log import latency_report, parse_access_log, percentile, read_access_logs
+
+LOG = [
+    '10.0.0.1 - - [01/Mar/2025:12:00:00 +0000] "GET /members HTTP/1.1" 200 512 "-" "curl" '
+    '10000 a1 member.get_members',
+    '10.0.0.1 - - [01/Mar/2025:12:00:01 +0000] "GET /members HTTP/1.1" 200 512 "-" "curl" '
+    '30000 a2 member.get_members',
+    '10.0.0.2 - - [01/Mar/2025:12:00:02 +0000] "GET /members HTTP/1.1" 500 12 "-" "curl" '
+    '250000 a3 member.get_members',
+    '10.0.0.2 - - [01/Mar/2025:12:30:00 +0000] "GET /projects/x HTTP/1.1" 404 12 "-" "curl" '
+    '5000 a4 projects.get_project_by_slug',
+    # logged before the duration was
+    '10.0.0.3 - - [01/Mar/2025:12:30:01 +0000] "GET /members HTTP/1.1" 200 512 "-" "curl"',
+    "not an access log line",
+]
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(Config, "SESSION_TYPE", "cachelib")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+
+def test_request_id_and_endpoint_headers(app: Flask):
+    rsp = app.test_client().get("/members")
+    assert rsp.headers["X-Endpoint"] == "member.get_members"
+    assert len(rsp.headers["X-Request-Id"]) == 32
+
+
+def test_request_id_kept_from_proxy(app: Flask):
+    rsp = app.test_client().get("/members", headers={"X-Request-Id": "0123abcd"})
+    assert rsp.headers["X-Request-Id"] == "0123abcd"
+
+
+def test_invalid_request_id_replaced(app: Flask):
+    rsp = app.test_client().get("/members", headers={"X-Request-Id": "bad id\" injected"})
+    assert rsp.headers["X-Request-Id"] != "bad id\" injected"
+
+
+def test_unmatched_endpoint_header(app: Flask):
+    assert app.test_client().get("/nowhere").headers["X-Endpoint"] == "unmatched"
+
+
+def test_parse_access_log():
+    entries = list(parse_access_log(LOG))
+    assert len(entries) == 5
+    assert entries[0].duration == 0.01
+    assert entries[0].request_id == "a1"
+    assert entries[0].endpoint == "member.get_members"
+    assert entries[0].time == datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+    assert entries[4].duration is None
+
+
+def test_percentile():
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 0)) == (3.0, 5.0, 1.0)
+    assert math.isnan(percentile([], 50))
+
+
+def test_latency_report():
+    report = latency_report(parse_access_log(LOG), slowest=2)
+    members, project = report.endpoints
+    assert (members.endpoint, members.requests, members.server_errors) == ("member.get_members", 3, 1)
+    assert (members.p50, members.max) == (0.03, 0.25)
+    assert members.error_rate == pytest.approx(1 / 3)
+    assert (project.requests, project.client_errors, project.server_errors) == (1, 1, 0)
+    assert [e.request_id for e in report.slowest] == ["a3", "a2"]
+    assert report.without_duration == 1
+
+
+def test_latency_report_window():
+    report = latency_report(parse_access_log(LOG), since=datetime(2025, 3, 1, 12, 0, 1, tzinfo=timezone.utc),
+                            until=datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc))
+    assert [(e.endpoint, e.requests) for e in report.endpoints] == [("member.get_members", 2)]
+    assert report.without_duration == 0
+
+
+def test_read_compressed_logs(tmp_path):
+    with gzip.open(tmp_path / "access.log.1.gz", "wt") as f:
+        f.write("\n".join(LOG[:2]))
+    (tmp_path / "access.log").write_text("\n".join(LOG[2:]))
+    entries = list(read_access_logs([str(tmp_path / "access.log.1.gz"), str(tmp_path / "access.log")]))
+    assert [e.request_id for e in entries[:4]] == ["a1", "a2", "a3", "a4"]
+
+
+def test_latency_report_command(app: Flask, tmp_path):
+    (tmp_path / "access.log").write_text("\n".join(LOG))
+    result = app.test_cli_runner().invoke(args=["latency-report", str(tmp_path / "access.log"), "--endpoint",
+                                                "member.get_members", "--until", "2025-03-01T12:00:02+00:00"])
+    assert result.exit_code == 0
+    assert "member.get_members" in result.output
+    assert "projects.get_project_by_slug" not in result.output
+    assert "GET /members  a2" in result.output
+
+
+def test_latency_report_command_rejects_bad_window(app: Flask, tmp_path):
+    (tmp_path / "access.log").write_text("\n".join(LOG))
+    result = app.test_cli_runner().invoke(args=["latency-report", str(tmp_path / "access.log"), "--since", "soon"])
+    assert result.exit_code != 0
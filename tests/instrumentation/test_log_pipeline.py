@@ -0,0 +1,99 @@
+import json
+import logging
+import queue
+
+import pytest
+from flask import Flask
+
+from app import create_app
+from app.config import Config
+from app.extensions import db, log_pipeline
+from app.instrumentation.logs import DebugSampler, _RequestQueueHandler
+from app.models.member_model import Member
+
+logger = logging.getLogger("app.tests")
+
+
+@pytest.fixture()
+def log_file(tmp_path):
+    return tmp_path / "logs" / "app.log"
+
+
+@pytest.fixture()
+def app(monkeypatch, log_file) -> Flask:
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(Config, "SESSION_TYPE", "cachelib")
+    monkeypatch.setattr(Config, "ENABLED_ACCESS_CONTROL", True)
+    monkeypatch.setattr(Config, "LOG_FILE", str(log_file))
+    monkeypatch.setattr(Config, "LOG_LEVEL", "debug")
+    monkeypatch.setattr(Config, "LOG_DEBUG_SAMPLE_RATE", 1.0)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Member(username="member", password="password", name="member", email="member",
+                              ist_id="ist100001", roles=["member"]))
+        db.session.commit()
+        yield app
+        db.drop_all()
+    log_pipeline.stop()
+
+
+def read_records(log_file):
+    log_pipeline.stop()  # waits for the listener to write them
+    return [json.loads(line) for line in log_file.read_text().splitlines()]
+
+
+def record(level: int, **fields) -> logging.LogRecord:
+    r = logging.LogRecord("app.tests", level, __file__, 0, "message", (), None)
+    r.__dict__.update(fields)
+    return r
+
+
+def test_request_records_carry_request_fields(app: Flask, log_file):
+    client = app.test_client()
+    client.post("/login", json={"username": "member", "password": "password"})
+    rsp = client.get("/members", headers={"X-Request-Id": "abc123"})
+    assert rsp.status_code == 200
+
+    records = [r for r in read_records(log_file) if r.get("request_id") == "abc123"]
+    assert records
+    r = records[0]
+    assert (r["level"], r["logger"], r["endpoint"], r["path"]) == ("DEBUG", "app.instrumentation.queries",
+                                                                   "member.get_members", "/members")
+    assert r["member_id"] == 1
+    assert r["sql_statements"] >= 1
+    assert r["duration_ms"] >= 0
+
+
+def test_records_outside_requests(app: Flask, log_file):
+    logger.info("hello %s", "world", extra={"images": 3})
+    [r] = [r for r in read_records(log_file) if r["logger"] == "app.tests"]
+    assert (r["message"], r["images"]) == ("hello world", 3)
+    assert "request_id" not in r
+
+
+def test_exceptions_rendered(app: Flask, log_file):
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    [r] = [r for r in read_records(log_file) if r["logger"] == "app.tests"]
+    assert "ValueError: boom" in r["exception"]
+
+
+def test_debug_records_sampled_by_request():
+    sampler = DebugSampler(0.5)
+    assert sampler.filter(record(logging.WARNING, request_id="a"))
+    kept = [sampler.filter(record(logging.DEBUG, request_id=str(i))) for i in range(1000)]
+    assert 350 < sum(kept) < 650
+    # the same for every record of a request
+    assert kept == [sampler.filter(record(logging.DEBUG, request_id=str(i))) for i in range(1000)]
+    assert not DebugSampler(0).filter(record(logging.DEBUG, request_id="a"))
+
+
+def test_records_dropped_when_queue_full():
+    records = queue.Queue(1)
+    handler = _RequestQueueHandler(records)
+    handler.handle(record(logging.INFO))
+    handler.handle(record(logging.INFO))
+    assert records.qsize() == 1
@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from flask import Flask
+from prometheus_client import REGISTRY
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(Config, "ENABLED_ACCESS_CONTROL", False)
+    app = create_app()
+
+    @app.route("/fail")
+    def fail():
+        raise RuntimeError("unhandled")
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_metrics(app: Flask):
+    labels = {"blueprint": "member", "endpoint": "member.get_members", "method": "GET"}
+    requests = sample("hs_api_http_request_duration_seconds_count", **labels)
+    responses = sample("hs_api_http_responses_total", **labels, status="200")
+    statements = sample("hs_api_db_request_statements_sum", endpoint="member.get_members")
+
+    assert app.test_client().get("/members").status_code == 200
+
+    assert sample("hs_api_http_request_duration_seconds_count", **labels) == requests + 1
+    assert sample("hs_api_http_responses_total", **labels, status="200") == responses + 1
+    assert sample("hs_api_db_request_statements_sum", endpoint="member.get_members") == statements + 1
+    assert sample("hs_api_session_store_duration_seconds_count", operation="open") > 0
+
+
+def test_unhandled_and_unmatched_requests_counted(app: Flask):
+    app.testing = False  # answer 500 instead of propagating
+    failed = sample("hs_api_http_responses_total", blueprint="", endpoint="fail", method="GET", status="500")
+    unmatched = sample("hs_api_http_responses_total", blueprint="", endpoint="unmatched", method="GET", status="404")
+
+    assert app.test_client().get("/fail").status_code == 500
+    assert app.test_client().get("/no/such/path").status_code == 404
+
+    assert sample("hs_api_http_responses_total", blueprint="", endpoint="fail", method="GET",
+                  status="500") == failed + 1
+    assert sample("hs_api_http_responses_total", blueprint="", endpoint="unmatched", method="GET",
+                  status="404") == unmatched + 1
+
+
+def test_metrics_endpoint(app: Flask):
+    app.test_client().get("/members")
+
+    rsp = app.test_client().get("/metrics")
+    assert rsp.status_code == 200
+    assert rsp.mimetype == "text/plain"
+    assert 'hs_api_http_request_duration_seconds_bucket{blueprint="member",endpoint="member.get_members"' in rsp.text
+    assert "hs_api_bcrypt_queue_depth" in rsp.text
+    assert "hs_api_fenix_request_duration_seconds" in rsp.text
+    assert "Set-Cookie" not in rsp.headers
+
+
+WORKER = """
+from app import create_app
+from app.config import Config
+from app.extensions import db
+Config.SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+Config.ENABLED_ACCESS_CONTROL = False
+app = create_app()
+with app.app_context():
+    db.create_all()
+    assert app.test_client().get("/members").status_code == 200
+    if {scrape}:
+        print(app.test_client().get("/metrics").text)
+"""
+
+
+def test_metrics_aggregated_across_processes(tmp_path):
+    """ Gunicorn workers are processes, the scrape answered by any of them covers all of them. """
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for scrape in (False, False, True):
+        result = subprocess.run([sys.executable, "-c", WORKER.format(scrape=scrape)], env=env, capture_output=True,
+                                text=True, cwd=ROOT, check=True)
+
+    assert 'hs_api_http_responses_total{blueprint="member",endpoint="member.get_members",method="GET",status="200"} ' \
+           '3.0' in result.stdout
@@ -0,0 +1,104 @@
+import cProfile
+import os
+
+import pytest
+from flask import Flask
+
+from app import create_app
+from app.config import Config
+from app.extensions import db, profiler
+from app.models.member_model import Member
+
+
+@pytest.fixture()
+def app(monkeypatch, tmp_path) -> Flask:
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(Config, "SESSION_TYPE", "cachelib")
+    monkeypatch.setattr(Config, "ENABLED_ACCESS_CONTROL", True)
+    monkeypatch.setattr(Config, "PROFILES_PATH", str(tmp_path / "profiles"))
+    monkeypatch.setattr(Config, "PROFILES_MAX", 2)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Member(username="sysadmin", password="password", name="sysadmin", email="sysadmin", ist_id="ist100000",
+                   roles=["sysadmin"]),
+            Member(username="member", password="password", name="member", email="member", ist_id="ist100001",
+                   roles=["member"]),
+        ])
+        db.session.commit()
+        yield app
+        db.drop_all()
+
+
+def login(app: Flask, username: str):
+    client = app.test_client()
+    client.post("/login", json={"username": username, "password": "password"})
+    return client
+
+
+def test_profile_saved_for_sysadmins(app: Flask):
+    rsp = login(app, "sysadmin").get("/members", headers={"X-Profile": "1"})
+    assert rsp.status_code == 200
+
+    name = rsp.headers["X-Profile"]
+    assert name.endswith("-member.get_members.prof")
+    assert os.listdir(profiler.path) == [name]
+
+
+def test_profile_requested_with_query_flag(app: Flask):
+    assert "X-Profile" in login(app, "sysadmin").get("/members?_profile=1").headers
+
+
+def test_profile_discarded_for_other_members(app: Flask):
+    rsp = login(app, "member").get("/members", headers={"X-Profile": "1"})
+    assert rsp.status_code == 200
+    assert "X-Profile" not in rsp.headers
+    assert not os.path.exists(profiler.path)
+
+
+def test_anonymous_requests_not_profiled(app: Flask, monkeypatch):
+    def profile():
+        raise AssertionError("anonymous request profiled")
+
+    monkeypatch.setattr(cProfile, "Profile", profile)
+    rsp = app.test_client().get("/members", headers={"X-Profile": "1"})
+    assert "X-Profile" not in rsp.headers
+    assert not os.path.exists(profiler.path)
+
+
+def test_forbidden_requests_not_profiled(app: Flask, monkeypatch):
+    key = login(app, "sysadmin").post("/members/sysadmin/api-keys",
+                                      json={"name": "ci", "permissions": ["task:create"]}).json["key"]
+    profiles = []
+    monkeypatch.setattr(cProfile, "Profile", lambda: profiles.append(1))
+
+    rsp = app.test_client().get("/members", headers={"Authorization": f"Bearer {key}", "X-Profile": "1"})
+    assert rsp.status_code == 403
+    assert profiles == []
+    assert "X-Profile" not in rsp.headers
+
+
+def test_requests_not_profiled_without_flag(app: Flask):
+    assert "X-Profile" not in login(app, "sysadmin").get("/members").headers
+
+
+def test_oldest_profiles_pruned(app: Flask):
+    client = login(app, "sysadmin")
+    names = [client.get("/members", headers={"X-Profile": "1"}).headers["X-Profile"] for _ in range(3)]
+    assert sorted(os.listdir(profiler.path)) == names[1:]
+
+
+def test_profiles_cli(app: Flask):
+    name = login(app, "sysadmin").get("/members", headers={"X-Profile": "1"}).headers["X-Profile"]
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["profiles", "list"])
+    assert name in result.output and "member.get_members" in result.output
+
+    result = runner.invoke(args=["profiles", "show", name, "--limit", "5", "--sort", "tottime"])
+    assert result.exit_code == 0
+    assert "function calls" in result.output
+
+    result = runner.invoke(args=["profiles", "show", "../secrets.prof"])
+    assert result.exit_code != 0
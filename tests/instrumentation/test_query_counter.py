@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.instrumentation.queries import count_queries
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(Config, "SQL_STATEMENT_BUDGET", 2)
+    monkeypatch.setattr(Config, "SQL_STATS_HEADERS", True)
+    app = create_app()
+
+    @app.route("/queries/<int:n>")
+    def run_queries(n):
+        for _ in range(n):
+            db.session.execute(text("SELECT 1"))
+        return {}
+
+    with app.app_context():
+        yield app
+
+
+def test_count_queries_nested(app: Flask):
+    with count_queries(record=True) as outer:
+        db.session.execute(text("SELECT 1"))
+        with count_queries() as inner:
+            db.session.execute(text("SELECT 2"))
+    db.session.execute(text("SELECT 3"))
+
+    assert outer.statements == 2
+    assert outer.executed == ["SELECT 1", "SELECT 2"]
+    assert outer.duration > 0
+    assert inner.statements == 1
+    assert inner.executed == []
+
+
+def test_request_statements_in_headers(app: Flask):
+    rsp = app.test_client().get("/queries/2")
+    assert rsp.headers["X-SQL-Statements"] == "2"
+    assert float(rsp.headers["X-SQL-Duration"]) > 0
+
+
+def test_requests_over_budget_logged(app: Flask, caplog):
+    with caplog.at_level(logging.DEBUG, logger="app.instrumentation.queries"):
+        app.test_client().get("/queries/2")
+        app.test_client().get("/queries/3")
+
+    within, over = caplog.records
+    assert within.levelno == logging.DEBUG
+    assert over.levelno == logging.WARNING
+    assert "GET /queries/3 executed 3 SQL statements, over the budget of 2" in over.getMessage()
+    assert over.sql_statements == 3
+    assert over.endpoint == "run_queries"
@@ -0,0 +1,82 @@
+import re
+
+import pytest
+from flask import Flask
+
+from app import create_app
+from app.config import Config
+from app.extensions import db, server_timing
+from app.instrumentation.server_timing import phase, _timings
+from app.models.member_model import Member
+from app.models.project_model import Project
+from app.models.project_participation_model import ProjectParticipation
+from app.utils import ProjectStateEnum
+
+
+def populate_db():
+    sysadmin = Member(username="sysadmin", password="password", name="sysadmin", email="sysadmin", ist_id="ist100000",
+                      roles=["sysadmin"])
+    member = Member(username="member", password="password", name="member", email="member", ist_id="ist100001",
+                    roles=["member"])
+    project = Project(name="Project Name", start_date="1970-01-01", state=ProjectStateEnum.ACTIVE)
+    db.session.add_all([sysadmin, member, project,
+                        ProjectParticipation(member=member, project=project, join_date="1970-01-01")])
+    db.session.commit()
+
+
+@pytest.fixture()
+def app(monkeypatch) -> Flask:
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(Config, "SESSION_TYPE", "cachelib")
+    monkeypatch.setattr(Config, "ENABLED_ACCESS_CONTROL", True)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        populate_db()
+        yield app
+        db.drop_all()
+
+
+def login(app: Flask, username: str):
+    client = app.test_client()
+    client.post("/login", json={"username": username, "password": "password"})
+    return client
+
+
+def phases(header: str) -> dict:
+    return {name: float(duration) for name, duration in re.findall(r"(\w+);dur=([\d.]+)", header)}
+
+
+def test_phases_reported_to_sysadmins(app: Flask):
+    rsp = login(app, "sysadmin").get("/projects/project-name/participations")
+    assert rsp.status_code == 200
+
+    assert {"session", "auth", "schema", "json", "app", "db"} <= phases(rsp.headers["Server-Timing"]).keys()
+    assert 'desc="SQL statements (3)"' in rsp.headers["Server-Timing"]
+    assert phases(rsp.headers["Server-Timing"])["app"] >= phases(rsp.headers["Server-Timing"])["schema"]
+
+
+def test_phases_hidden_from_other_members(app: Flask):
+    assert "Server-Timing" not in login(app, "member").get("/projects/project-name/participations").headers
+    assert "Server-Timing" not in app.test_client().get("/projects/project-name/participations").headers
+
+
+def test_phases_reported_to_everyone_when_enabled(app: Flask, monkeypatch):
+    monkeypatch.setattr(server_timing, "enabled", True)
+
+    rsp = app.test_client().post("/members", json={"username": "member"})
+    assert rsp.status_code == 401
+    assert "auth" in phases(rsp.headers["Server-Timing"])  # aborted while authenticating
+
+    rsp = login(app, "sysadmin").post("/projects/project-name/participations", json={"username": "?"})
+    assert rsp.status_code == 422
+    assert "validation" in phases(rsp.headers["Server-Timing"])
+
+
+def test_nested_phase_counted_once(app: Flask):
+    with app.test_request_context():
+        with phase("schema"):
+            with phase("schema"):
+                pass
+            assert "schema" not in _timings()  # still running
+        assert "schema" in _timings()
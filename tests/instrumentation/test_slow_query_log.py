@@ -0,0 +1,113 @@
+import json
+import threading
+
+import pytest
+from flask import Flask
+
+from app import create_app
+from app.config import Config
+from app.extensions import db, log_pipeline, slow_query_log
+from app.instrumentation.slow_queries import normalize_sql, parameter_shape
+from app.models.member_model import Member
+from app.repositories.member_repository import MemberRepository
+
+
+@pytest.fixture()
+def log_path(tmp_path):
+    return tmp_path / "slow" / "slow_queries.log"
+
+
+@pytest.fixture()
+def app(monkeypatch, tmp_path, log_path) -> Flask:
+    # plans are captured on another connection, which doesn't see in-memory databases
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    monkeypatch.setattr(Config, "SLOW_QUERY_THRESHOLD_MS", 1e-9)  # every statement is slow
+    monkeypatch.setattr(Config, "SLOW_QUERY_LOG", str(log_path))
+    app = create_app()
+
+    @app.route("/members/<username>/slow")
+    def get_member(username):
+        return {"name": MemberRepository(db=db).get_member_by_username(username).name}
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Member(username="member", name="member", email="member", ist_id="ist100001", roles=[]))
+        db.session.commit()
+        yield app
+        db.drop_all()
+    slow_query_log.wait()
+    log_pipeline.stop()
+
+
+def read_log(log_path, endpoint: str):
+    """ Entries of the statements executed by ``endpoint``, setting up the database is slow too. """
+    slow_query_log.wait()
+    log_pipeline.stop()  # waits for the listener to write them
+    return [entry for entry in map(json.loads, log_path.read_text().splitlines()) if entry["endpoint"] == endpoint]
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT *\n  FROM members\n WHERE id IN (?, ?,?)") == \
+           "SELECT * FROM members WHERE id IN (?, ...)"
+    assert normalize_sql("SELECT * FROM members WHERE id = (?)") == "SELECT * FROM members WHERE id = (?)"
+
+
+def test_parameter_shape():
+    assert parameter_shape(("member", 1), False) == "(str, int)"
+    assert parameter_shape({"username": "member"}, False) == "{username: str}"
+    assert parameter_shape([("a", 1), ("b", 2)], True) == "2 x (str, int)"
+
+
+def test_slow_statement_logged_with_plan(app: Flask, log_path):
+    rsp = app.test_client().get("/members/member/slow")
+    assert rsp.status_code == 200
+
+    entry, = read_log(log_path, "get_member")
+    assert entry["request_id"] == rsp.headers["X-Request-Id"]
+    assert entry["query_duration_ms"] > 0
+    assert entry["route"] == "GET /members/<username>/slow"
+    assert entry["endpoint"] == "get_member"
+    assert entry["repository"] == "MemberRepository.get_member_by_username"
+    assert entry["parameters"] == "(str)"
+    assert entry["statement"].startswith("SELECT members.id, members.username")
+    assert entry["plan"][0].startswith("SEARCH members USING INDEX")
+
+
+def test_fast_statements_not_logged(app: Flask, log_path, monkeypatch):
+    monkeypatch.setattr(slow_query_log, "threshold", 60_000)
+    app.test_client().get("/members/member/slow")
+    assert read_log(log_path, "get_member") == []
+
+
+def test_plans_captured_off_the_request_thread(app: Flask, log_path, monkeypatch):
+    threads, explain = [], slow_query_log._explain
+
+    def record_thread(*args):
+        threads.append(threading.current_thread().name)
+        explain(*args)
+
+    monkeypatch.setattr(slow_query_log, "_explain", record_thread)
+    app.test_client().get("/members/member/slow")
+    slow_query_log.wait()
+    assert threads and all(name.startswith("slow-query-plans") for name in threads)
+
+
+def test_kept_out_of_the_app_logs(app: Flask, log_path, tmp_path):
+    app.logger.info("hello")
+    app.test_client().get("/members/member/slow")
+    assert read_log(log_path, "get_member")
+
+    app_log = [json.loads(line) for line in (tmp_path / "logs" / "app.log").read_text().splitlines()]
+    assert "hello" in [r["message"] for r in app_log]
+    assert not [r for r in app_log if r["logger"] == "app.instrumentation.slow_queries"]
+
+
+def test_disabled_with_zero_threshold(monkeypatch, log_path):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(Config, "SLOW_QUERY_THRESHOLD_MS", 0)
+    monkeypatch.setattr(Config, "SLOW_QUERY_LOG", str(log_path))
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    log_pipeline.stop()
+    assert not log_path.exists()
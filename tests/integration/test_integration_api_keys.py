@@ -0,0 +1,129 @@
+from http import HTTPStatus
+
+import pytest
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+from app.utils import ProjectStateEnum
+
+from app.models.member_model import Member
+from app.models.project_model import Project
+from app.models.project_participation_model import ProjectParticipation
+
+roles = ["sysadmin", "member", "hook"]
+
+
+def populate_db():
+    members = {}
+    for i, role in enumerate(roles):
+        members[role] = Member(username=role, password="password", name=role, email=role,
+                               ist_id="ist10000" + str(i), roles=[role])
+        db.session.add(members[role])
+    project = Project(name="project", start_date="1970-01-01", state=ProjectStateEnum.ACTIVE)
+    db.session.add(project)
+    db.session.flush()
+    db.session.add(ProjectParticipation(member=members["hook"], project=project, roles=["participant"],
+                                        join_date="1970-01-01"))
+    db.session.commit()
+
+
+@pytest.fixture()
+def app():
+    Config.SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    Config.SESSION_TYPE = "cachelib"
+    Config.ENABLED_ACCESS_CONTROL = "True"
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        populate_db()
+        yield app
+        db.drop_all()
+
+@pytest.fixture(scope="function")
+def logged_in_sysadmin(app: Flask):
+    with app.test_client() as client:
+        client.post("/login", json={"username": "sysadmin", "password": "password"})
+        yield client
+
+@pytest.fixture(scope="function")
+def logged_in_hook(app: Flask):
+    with app.test_client() as client:
+        client.post("/login", json={"username": "hook", "password": "password"})
+        yield client
+
+@pytest.fixture(scope="function")
+def hook_key(logged_in_hook: FlaskClient):
+    rsp = logged_in_hook.post("/members/hook/api-keys", json={"name": "ci", "permissions": ["task:create"]})
+    assert rsp.status_code == HTTPStatus.OK
+    return rsp.json
+
+def test_issue_api_key(hook_key):
+    assert hook_key["key"].startswith(hook_key["prefix"])
+    assert hook_key["permissions"] == ["task:create"]
+    assert hook_key["name"] == "ci"
+    assert hook_key["id"] is not None
+
+def test_issue_api_key_exceeding_member_permissions(logged_in_hook: FlaskClient):
+    rsp = logged_in_hook.post("/members/hook/api-keys", json={"name": "ci", "permissions": ["member:delete"]})
+    assert rsp.status_code == HTTPStatus.FORBIDDEN
+
+def test_issue_api_key_for_higher_privilege_member(logged_in_hook: FlaskClient):
+    rsp = logged_in_hook.post("/members/sysadmin/api-keys", json={"name": "ci", "permissions": ["task:create"]})
+    assert rsp.status_code == HTTPStatus.FORBIDDEN
+
+def test_sysadmin_issue_api_key_for_member(logged_in_sysadmin: FlaskClient):
+    rsp = logged_in_sysadmin.post("/members/hook/api-keys", json={"name": "ci", "permissions": ["task:create"]})
+    assert rsp.status_code == HTTPStatus.OK
+
+def test_list_api_keys_hides_key(logged_in_hook: FlaskClient, hook_key):
+    rsp = logged_in_hook.get("/members/hook/api-keys")
+    assert rsp.status_code == HTTPStatus.OK
+    assert len(rsp.json) == 1
+    assert "key" not in rsp.json[0]
+    assert rsp.json[0]["prefix"] == hook_key["prefix"]
+
+def test_api_key_create_task(app: Flask, hook_key):
+    with app.test_client() as client:
+        rsp = client.post("/projects/project/tasks", headers={"Authorization": f"Bearer {hook_key['key']}"},
+                          json={"point_type": "pj", "points": 10, "description": "task", "username": "hook"})
+        assert rsp.status_code == HTTPStatus.OK
+
+def test_api_key_outside_key_permissions(app: Flask, logged_in_sysadmin: FlaskClient):
+    key = logged_in_sysadmin.post("/members/sysadmin/api-keys",
+                                  json={"name": "ci", "permissions": ["task:create"]}).json["key"]
+    with app.test_client() as client:
+        rsp = client.get("/members", headers={"Authorization": f"Bearer {key}"})
+        assert rsp.status_code == HTTPStatus.FORBIDDEN
+
+def test_invalid_api_key(app: Flask):
+    with app.test_client() as client:
+        rsp = client.get("/members", headers={"Authorization": "Bearer hs_invalid"})
+        assert rsp.status_code == HTTPStatus.UNAUTHORIZED
+        rsp = client.get("/members", headers={"Authorization": "Basic aGVsbG8="})
+        assert rsp.status_code == HTTPStatus.UNAUTHORIZED
+
+def test_api_key_cannot_issue_api_keys(app: Flask, hook_key):
+    with app.test_client() as client:
+        rsp = client.post("/members/hook/api-keys", headers={"Authorization": f"Bearer {hook_key['key']}"},
+                          json={"name": "ci", "permissions": ["task:create"]})
+        assert rsp.status_code == HTTPStatus.FORBIDDEN
+
+def test_revoke_api_key(app: Flask, logged_in_hook: FlaskClient, hook_key):
+    rsp = logged_in_hook.delete(f"/members/hook/api-keys/{hook_key['id']}")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.json["id"] == hook_key["id"]
+
+    with app.test_client() as client:
+        rsp = client.post("/projects/project/tasks", headers={"Authorization": f"Bearer {hook_key['key']}"},
+                          json={"point_type": "pj", "points": 10, "description": "task", "username": "hook"})
+        assert rsp.status_code == HTTPStatus.UNAUTHORIZED
+
+def test_revoke_api_key_not_found(logged_in_hook: FlaskClient):
+    rsp = logged_in_hook.delete("/members/hook/api-keys/42")
+    assert rsp.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,540 @@
+import io
+import os
+from http import HTTPStatus
+
+import PIL.Image
+import pytest
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.image_resizer import ImageResizer, variant_path
+from app.image_store import LocalImageStore, S3ImageStore
+from app.image_transcoder import ImageTranscoder
+
+from app.utils import ProjectStateEnum
+
+from app.models.image_model import Image
+from app.models.member_model import Member
+from app.models.project_model import Project
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"member image"
+JPEG = b"\xff\xd8\xff\xe0" + b"jpeg image"
+
+
+def populate_db():
+    db.session.add(Member(username="sysadmin", password="password", name="sysadmin", email="sysadmin",
+                          ist_id="ist100000", roles=["sysadmin"]))
+    db.session.add(Member(username="member", password="password", name="member", email="member",
+                          ist_id="ist100001", roles=["member"]))
+    db.session.add(Project(name="Project Name", start_date="1970-01-01", state=ProjectStateEnum.ACTIVE))
+    db.session.commit()
+
+
+@pytest.fixture()
+def image_store(tmp_path):
+    return LocalImageStore(str(tmp_path))
+
+
+@pytest.fixture()
+def image_transcoder(image_store: LocalImageStore):
+    transcoder = ImageTranscoder(image_resizer=ImageResizer(image_store=image_store), formats=("avif", "webp"))
+    yield transcoder
+    transcoder.wait()
+
+@pytest.fixture()
+def app(image_store: LocalImageStore, image_transcoder: ImageTranscoder):
+    Config.SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    Config.SESSION_TYPE = "cachelib"
+    Config.ENABLED_ACCESS_CONTROL = "True"
+    app = create_app(image_store=image_store, image_resizer=image_transcoder.image_resizer,
+                     image_transcoder=image_transcoder)
+
+    with app.app_context():
+        db.create_all()
+        populate_db()
+        yield app
+        db.drop_all()
+
+@pytest.fixture(scope="function")
+def client(app: Flask):
+    with app.test_client() as client:
+        client.post("/login", json={"username": "sysadmin", "password": "password"})
+        yield client
+
+def upload(client: FlaskClient, url: str, content: bytes, filename: str = "image.png"):
+    return client.post(url, data={"file": (io.BytesIO(content), filename)}, content_type="multipart/form-data")
+
+def test_upload_member_image_is_indexed(client: FlaskClient, image_store: LocalImageStore):
+    rsp = upload(client, "/members/member/image", PNG)
+    assert rsp.status_code == HTTPStatus.OK
+
+    image = db.session.query(Image).one()
+    assert image.mimetype == "image/png"
+    assert image.size == len(PNG)
+    assert len(image.content_hash) == 64
+    assert image.path == f"sha256/{image.content_hash[:2]}/{image.content_hash[2:4]}/{image.content_hash}.png"
+    assert os.path.exists(image_store.resolve(image.path))
+
+    rsp = client.get("/members/member/image")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.data == PNG
+    assert rsp.mimetype == "image/png"
+
+def test_reupload_member_image_replaces_file(client: FlaskClient, image_store: LocalImageStore):
+    upload(client, "/members/member/image", PNG)
+    old_path = db.session.query(Image).one().path
+
+    rsp = upload(client, "/members/member/image", JPEG, filename="image.JPG")
+    assert rsp.status_code == HTTPStatus.OK
+
+    image = db.session.query(Image).one()
+    assert image.mimetype == "image/jpeg"
+    assert image.path.endswith(".jpg")
+    assert not os.path.exists(image_store.resolve(old_path))
+    assert client.get("/members/member/image").data == JPEG
+
+def test_reupload_same_member_image(client: FlaskClient, image_store: LocalImageStore):
+    upload(client, "/members/member/image", PNG)
+    rsp = upload(client, "/members/member/image", PNG)
+    assert rsp.status_code == HTTPStatus.OK
+    assert client.get("/members/member/image").data == PNG
+
+def test_upload_project_image_found_by_slug(client: FlaskClient):
+    rsp = upload(client, "/projects/project-name/image", PNG)
+    assert rsp.status_code == HTTPStatus.OK
+
+    rsp = client.get("/projects/project-name/image")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.data == PNG
+
+def test_upload_type_sniffed_from_content(client: FlaskClient):
+    rsp = upload(client, "/members/member/image", b"GIF89a" + b"member image", filename="image.png")
+    assert rsp.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+    assert db.session.query(Image).count() == 0
+
+    rsp = upload(client, "/members/member/image", JPEG, filename="image.png")
+    assert rsp.status_code == HTTPStatus.OK
+    assert db.session.query(Image).one().mimetype == "image/jpeg"
+    assert client.get("/members/member/image").mimetype == "image/jpeg"
+
+def test_upload_too_large(client: FlaskClient):
+    rsp = upload(client, "/members/member/image", PNG + bytes(5 * 1024 * 1024))
+    assert rsp.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert db.session.query(Image).count() == 0
+
+def test_identical_uploads_share_a_blob(client: FlaskClient, image_store: LocalImageStore):
+    upload(client, "/members/member/image", PNG)
+    upload(client, "/projects/project-name/image", PNG)
+    paths = {image.path for image in db.session.query(Image)}
+    assert len(paths) == 1
+    path = paths.pop()
+
+    # still referenced by the project
+    upload(client, "/members/member/image", JPEG)
+    assert image_store.exists(path)
+    assert client.get("/projects/project-name/image").data == PNG
+
+    upload(client, "/projects/project-name/image", JPEG)
+    assert not image_store.exists(path)
+
+def test_collect_garbage(app: Flask, client: FlaskClient, image_store: LocalImageStore):
+    upload(client, "/members/member/image", PNG)
+    path = db.session.query(Image).one().path
+    client.delete("/members/member")
+    assert db.session.query(Image).count() == 0
+    assert image_store.exists(path)
+    app.config["IMAGES_PATH"] = image_store.root
+
+    result = app.test_cli_runner().invoke(args=["gc-images", "--grace-period", "0"])
+    assert result.exit_code == 0
+    assert path in result.output
+    assert not image_store.exists(path)
+
+def test_get_missing_image(client: FlaskClient):
+    rsp = client.get("/members/member/image")
+    assert rsp.status_code == HTTPStatus.NOT_FOUND
+    assert "image not found" in rsp.json["description"]
+
+    rsp = client.get("/members/nobody/image")
+    assert rsp.status_code == HTTPStatus.NOT_FOUND
+    assert "Member with username" in rsp.json["description"]
+
+def test_get_indexed_image_missing_from_disk(client: FlaskClient, image_store: LocalImageStore):
+    upload(client, "/members/member/image", PNG)
+    os.remove(image_store.resolve(db.session.query(Image).one().path))
+
+    rsp = client.get("/members/member/image")
+    assert rsp.status_code == HTTPStatus.NOT_FOUND
+
+def test_delete_member_deletes_index_entry(client: FlaskClient):
+    upload(client, "/members/member/image", PNG)
+    rsp = client.delete("/members/member")
+    assert rsp.status_code == HTTPStatus.OK
+    assert db.session.query(Image).count() == 0
+
+def test_index_legacy_images(app: Flask, image_store: LocalImageStore):
+    os.makedirs(image_store.resolve("members"), exist_ok=True)
+    os.makedirs(image_store.resolve("projects"), exist_ok=True)
+    with open(image_store.resolve("members/ist100001.png"), "wb") as f:
+        f.write(PNG)
+    with open(image_store.resolve("projects/Project Name.jpg"), "wb") as f:
+        f.write(b"jpeg image")
+    app.config["IMAGES_PATH"] = image_store.root
+
+    result = app.test_cli_runner().invoke(args=["index-images"])
+    assert "Indexed 2 images." in result.output
+
+    with app.test_client() as client:
+        client.post("/login", json={"username": "sysadmin", "password": "password"})
+        assert client.get("/members/member/image").data == PNG
+        assert client.get("/projects/project-name/image").data == b"jpeg image"
+
+def test_image_hash_in_member_and_project_json(client: FlaskClient):
+    assert client.get("/members/member").json["image_hash"] is None
+
+    image_hash = upload(client, "/members/member/image", PNG).json["image_hash"]
+    assert client.get("/members/member").json["image_hash"] == image_hash
+    assert db.session.query(Image).one().content_hash == image_hash
+
+    image_hash = upload(client, "/projects/project-name/image", PNG).json["image_hash"]
+    assert client.get("/projects/project-name").json["image_hash"] == image_hash
+    assert all("image_hash" in p for p in client.get("/projects").json)
+
+def test_image_conditional_get(client: FlaskClient):
+    image_hash = upload(client, "/members/member/image", PNG).json["image_hash"]
+
+    rsp = client.get("/members/member/image")
+    assert rsp.headers["ETag"] == f'"{image_hash}"'
+    last_modified = rsp.headers["Last-Modified"]
+    assert rsp.cache_control.no_cache
+    assert not rsp.cache_control.immutable
+
+    rsp = client.get("/members/member/image", headers={"If-None-Match": f'"{image_hash}"'})
+    assert rsp.status_code == HTTPStatus.NOT_MODIFIED
+    assert rsp.data == b""
+
+    rsp = client.get("/members/member/image", headers={"If-Modified-Since": last_modified})
+    assert rsp.status_code == HTTPStatus.NOT_MODIFIED
+
+    rsp = client.get("/members/member/image", headers={"If-None-Match": '"stale"'})
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.data == PNG
+
+def test_versioned_image_url_is_immutable(client: FlaskClient):
+    image_hash = upload(client, "/members/member/image", PNG).json["image_hash"]
+
+    rsp = client.get(f"/members/member/image?v={image_hash}")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.cache_control.immutable
+    assert rsp.cache_control.private
+    assert rsp.cache_control.max_age == Config.IMAGES_CACHE_MAX_AGE
+
+    rsp = client.get("/members/member/image?v=outdated")
+    assert rsp.status_code == HTTPStatus.OK
+    assert not rsp.cache_control.immutable
+
+def test_versioned_image_revalidated_before_authentication(app: Flask, client: FlaskClient):
+    image_hash = upload(client, "/members/member/image", PNG).json["image_hash"]
+
+    with app.test_client() as anonymous:
+        rsp = anonymous.get(f"/members/member/image?v={image_hash}", headers={"If-None-Match": f'"{image_hash}"'})
+        assert rsp.status_code == HTTPStatus.NOT_MODIFIED
+        assert rsp.headers["ETag"] == f'"{image_hash}"'
+
+        rsp = anonymous.get(f"/members/member/image?v={image_hash}")
+        assert rsp.status_code == HTTPStatus.UNAUTHORIZED
+
+@pytest.fixture()
+def offload_client(request, monkeypatch, image_store: LocalImageStore):
+    monkeypatch.setattr(Config, "IMAGES_OFFLOAD", request.param)
+    monkeypatch.setattr(Config, "IMAGES_OFFLOAD_PREFIX", "/internal/images")
+    app = create_app(image_store=image_store)
+    with app.app_context():
+        db.create_all()
+        populate_db()
+        with app.test_client() as client:
+            client.post("/login", json={"username": "sysadmin", "password": "password"})
+            yield client
+        db.drop_all()
+
+@pytest.mark.parametrize("offload_client", ["x-accel"], indirect=True)
+def test_x_accel_redirect_offload(offload_client: FlaskClient):
+    image_hash = upload(offload_client, "/members/member/image", PNG).json["image_hash"]
+    path = db.session.query(Image).one().path
+
+    rsp = offload_client.get(f"/members/member/image?v={image_hash}")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.headers["X-Accel-Redirect"] == f"/internal/images/{path}"
+    assert rsp.headers["ETag"] == f'"{image_hash}"'
+    assert rsp.mimetype == "image/png"
+    assert rsp.cache_control.immutable
+    assert rsp.data == b""
+
+    rsp = offload_client.get("/members/member/image", headers={"If-None-Match": f'"{image_hash}"'})
+    assert rsp.status_code == HTTPStatus.NOT_MODIFIED
+    assert "X-Accel-Redirect" not in rsp.headers
+
+@pytest.mark.parametrize("offload_client", ["x-sendfile"], indirect=True)
+def test_x_sendfile_offload(offload_client: FlaskClient, image_store: LocalImageStore):
+    upload(offload_client, "/projects/project-name/image", PNG)
+    path = db.session.query(Image).one().path
+
+    rsp = offload_client.get("/projects/project-name/image")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.headers["X-Sendfile"] == image_store.resolve(path)
+    assert rsp.data == b""
+
+def test_invalid_offload_mode(monkeypatch):
+    monkeypatch.setattr(Config, "IMAGES_OFFLOAD", "sendfile")
+    with pytest.raises(ValueError):
+        create_app()
+
+def encode_png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    PIL.Image.new("RGB", (width, height)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_get_image_variant(client: FlaskClient):
+    image_hash = upload(client, "/members/member/image", encode_png(1000, 1000)).json["image_hash"]
+
+    rsp = client.get(f"/members/member/image?size=48&v={image_hash}")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.headers["ETag"] == f'"{image_hash}-48"'
+    assert rsp.cache_control.immutable
+    with PIL.Image.open(io.BytesIO(rsp.data)) as image:
+        assert image.size == (48, 48)
+
+    rsp = client.get("/members/member/image?size=48", headers={"If-None-Match": f'"{image_hash}-48"'})
+    assert rsp.status_code == HTTPStatus.NOT_MODIFIED
+
+    rsp = client.get(f"/members/member/image?size=48&v={image_hash}", headers={"If-None-Match": f'"{image_hash}"'})
+    assert rsp.status_code == HTTPStatus.OK
+
+def test_get_project_image_variant(client: FlaskClient):
+    upload(client, "/projects/project-name/image", encode_png(1000, 500))
+
+    rsp = client.get("/projects/project-name/image?size=128")
+    assert rsp.status_code == HTTPStatus.OK
+    with PIL.Image.open(io.BytesIO(rsp.data)) as image:
+        assert image.size == (128, 64)
+
+def test_get_image_invalid_size(client: FlaskClient):
+    upload(client, "/members/member/image", encode_png(100, 100))
+
+    assert client.get("/members/member/image?size=64").status_code == HTTPStatus.BAD_REQUEST
+    assert client.get("/members/member/image?size=large").status_code == HTTPStatus.BAD_REQUEST
+
+def test_get_variant_of_undecodable_image_serves_original(client: FlaskClient):
+    upload(client, "/members/member/image", PNG)
+
+    rsp = client.get("/members/member/image?size=48")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.data == PNG
+
+def test_reupload_deletes_variants(client: FlaskClient, image_store: LocalImageStore):
+    upload(client, "/members/member/image", encode_png(200, 200))
+    old_path = db.session.query(Image).one().path
+    client.get("/members/member/image?size=48")
+    assert image_store.exists(variant_path(old_path, 48))
+
+    upload(client, "/members/member/image", encode_png(300, 300))
+    assert not image_store.exists(variant_path(old_path, 48))
+    with PIL.Image.open(io.BytesIO(client.get("/members/member/image?size=128").data)) as image:
+        assert image.size == (128, 128)
+
+def test_image_negotiated_by_accept(client: FlaskClient, image_transcoder: ImageTranscoder):
+    image_hash = upload(client, "/members/member/image", encode_png(200, 200)).json["image_hash"]
+    image_transcoder.wait()
+
+    rsp = client.get(f"/members/member/image?v={image_hash}", headers={"Accept": "image/webp,image/*;q=0.8"})
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.mimetype == "image/webp"
+    assert rsp.headers["ETag"] == f'"{image_hash}-webp"'
+    assert "Accept" in rsp.vary
+    with PIL.Image.open(io.BytesIO(rsp.data)) as image:
+        assert image.format == "WEBP"
+
+    # wildcards don't say a format decodes, the original is kept for those browsers
+    rsp = client.get(f"/members/member/image?v={image_hash}", headers={"Accept": "image/*,*/*;q=0.8"})
+    assert rsp.mimetype == "image/png"
+    assert rsp.headers["ETag"] == f'"{image_hash}"'
+    assert "Accept" in rsp.vary
+
+    rsp = client.get("/members/member/image", headers={"Accept": "image/webp;q=0,image/png"})
+    assert rsp.mimetype == "image/png"
+
+def test_image_variant_served_in_original_format_until_encoded(client: FlaskClient,
+                                                               image_transcoder: ImageTranscoder):
+    if "avif" not in image_transcoder.formats:
+        pytest.skip("Pillow built without AVIF")
+    upload(client, "/members/member/image", encode_png(1000, 500))
+
+    rsp = client.get("/members/member/image?size=128", headers={"Accept": "image/avif,image/webp"})
+    assert rsp.mimetype == "image/png"
+
+    image_transcoder.wait()
+    rsp = client.get("/members/member/image?size=128", headers={"Accept": "image/avif,image/webp"})
+    assert rsp.mimetype == "image/avif"
+    with PIL.Image.open(io.BytesIO(rsp.data)) as image:
+        assert image.size == (128, 64)
+
+def test_negotiated_image_revalidated_before_authentication(app: Flask, client: FlaskClient,
+                                                            image_transcoder: ImageTranscoder):
+    image_hash = upload(client, "/members/member/image", encode_png(200, 200)).json["image_hash"]
+    image_transcoder.wait()
+
+    with app.test_client() as anonymous:
+        rsp = anonymous.get(f"/members/member/image?v={image_hash}", headers={"If-None-Match": f'"{image_hash}-webp"'})
+        assert rsp.status_code == HTTPStatus.NOT_MODIFIED
+        assert rsp.headers["ETag"] == f'"{image_hash}-webp"'
+        assert "Accept" in rsp.vary
+
+def test_reupload_deletes_encoded_variants(client: FlaskClient, image_store: LocalImageStore,
+                                           image_transcoder: ImageTranscoder):
+    upload(client, "/members/member/image", encode_png(200, 200))
+    image_transcoder.wait()
+    old_path = db.session.query(Image).one().path
+    assert image_store.exists(variant_path(old_path, None, "webp"))
+
+    upload(client, "/members/member/image", encode_png(300, 300))
+    image_transcoder.wait()
+    new_path = db.session.query(Image).one().path
+    assert not image_store.exists(variant_path(old_path, None, "webp"))
+    assert image_store.exists(variant_path(new_path, None, "webp"))
+
+def test_image_range_request(client: FlaskClient):
+    upload(client, "/members/member/image", PNG)
+
+    rsp = client.get("/members/member/image", headers={"Range": "bytes=8-13"})
+    assert rsp.status_code == HTTPStatus.PARTIAL_CONTENT
+    assert rsp.headers["Content-Range"] == f"bytes 8-13/{len(PNG)}"
+    assert rsp.data == PNG[8:14]
+
+@pytest.fixture()
+def s3_client(s3_image_store: S3ImageStore):
+    transcoder = ImageTranscoder(image_resizer=ImageResizer(image_store=s3_image_store), formats=("webp",))
+    app = create_app(image_store=s3_image_store, image_resizer=transcoder.image_resizer, image_transcoder=transcoder)
+    with app.app_context():
+        db.create_all()
+        populate_db()
+        with app.test_client() as client:
+            client.post("/login", json={"username": "sysadmin", "password": "password"})
+            yield client
+        transcoder.wait()
+        db.drop_all()
+
+def test_s3_image_storage(s3_client: FlaskClient, s3_image_store: S3ImageStore):
+    content = encode_png(1000, 500)
+    image_hash = upload(s3_client, "/members/member/image", content).json["image_hash"]
+    path = db.session.query(Image).one().path
+    assert s3_image_store.read(path) == content
+
+    rsp = s3_client.get(f"/members/member/image?v={image_hash}")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.data == content
+    assert rsp.headers["ETag"] == f'"{image_hash}"'
+
+    rsp = s3_client.get("/members/member/image", headers={"Range": "bytes=100-199"})
+    assert rsp.status_code == HTTPStatus.PARTIAL_CONTENT
+    assert rsp.data == content[100:200]
+
+    with PIL.Image.open(io.BytesIO(s3_client.get("/members/member/image?size=128").data)) as image:
+        assert image.size == (128, 64)
+
+    upload(s3_client, "/members/member/image", PNG)
+    assert not s3_image_store.exists(path)
+    assert not s3_image_store.exists(variant_path(path, 128))
+
+def test_offload_requires_local_storage(s3_image_store: S3ImageStore, monkeypatch):
+    monkeypatch.setattr(Config, "IMAGES_OFFLOAD", "x-accel")
+    with pytest.raises(ValueError):
+        create_app(image_store=s3_image_store)
+
+@pytest.fixture()
+def signed_client(monkeypatch, image_store: LocalImageStore):
+    monkeypatch.setattr(Config, "IMAGES_URL_KEY", "test key")
+    app = create_app(image_store=image_store)
+    with app.app_context():
+        db.create_all()
+        populate_db()
+        with app.test_client() as client:
+            client.post("/login", json={"username": "sysadmin", "password": "password"})
+            yield client
+        db.drop_all()
+
+def test_signed_image_url_served_without_session_or_queries(signed_client: FlaskClient, monkeypatch,
+                                                            assert_max_queries):
+    upload(signed_client, "/members/member/image", encode_png(200, 200))
+    upload(signed_client, "/projects/project-name/image", PNG)
+    image_url = signed_client.get("/members/member").json["image_url"]
+    assert image_url.startswith("/images/sha256/")
+    assert signed_client.get("/projects/project-name").json["image_url"].startswith("/images/sha256/")
+    assert signed_client.get("/members/sysadmin").json["image_url"] is None
+
+    session_interface = signed_client.application.session_interface.interface
+    monkeypatch.setattr(session_interface, "open_session", lambda *args: pytest.fail("session loaded"))
+    with assert_max_queries(0):
+        rsp = signed_client.get(image_url)
+        assert rsp.status_code == HTTPStatus.OK
+        assert rsp.mimetype == "image/png"
+        assert rsp.cache_control.immutable
+        with PIL.Image.open(io.BytesIO(signed_client.get(image_url + "&size=48").data)) as image:
+            assert image.size == (48, 48)
+
+def test_signed_image_url_tampered(signed_client: FlaskClient):
+    upload(signed_client, "/members/member/image", PNG)
+    image_url = signed_client.get("/members/member").json["image_url"]
+
+    assert signed_client.get(image_url.replace("expires=", "expires=1")).status_code == HTTPStatus.FORBIDDEN
+    assert signed_client.get(image_url.replace(".png", ".jpg")).status_code == HTTPStatus.FORBIDDEN
+    assert signed_client.get(image_url.split("?")[0]).status_code == HTTPStatus.FORBIDDEN
+
+def test_signed_image_urls_disabled_without_key(client: FlaskClient):
+    upload(client, "/members/member/image", PNG)
+    assert client.get("/members/member").json["image_url"] is None
+
+def test_member_images_manifest(client: FlaskClient, image_transcoder: ImageTranscoder):
+    image_hash = upload(client, "/members/member/image", encode_png(300, 200)).json["image_hash"]
+    image_transcoder.wait()  # rendered in the background
+
+    rsp = client.get("/members/images/manifest")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.json == {
+        "member": {"hash": image_hash, "sizes": [48, 128, 512], "url": f"/members/member/image?v={image_hash}"},
+        "sysadmin": None,
+    }
+
+    rsp = client.get("/members/images/manifest?placeholders=true")
+    assert rsp.json["member"]["placeholder"].startswith("data:image/webp;base64,")
+    assert client.get("/members/images/manifest", headers={"If-None-Match": rsp.headers["ETag"]}).status_code \
+           == HTTPStatus.OK
+    assert client.get("/members/images/manifest?placeholders=true",
+                      headers={"If-None-Match": rsp.headers["ETag"]}).status_code == HTTPStatus.NOT_MODIFIED
+
+def test_member_images_manifest_single_query(signed_client: FlaskClient, assert_max_queries):
+    upload(signed_client, "/members/member/image", PNG)
+    upload(signed_client, "/members/sysadmin/image", JPEG)
+
+    with assert_max_queries(2):  # the logged in member and the manifest, no query per member
+        rsp = signed_client.get("/members/images/manifest?placeholders=1")
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.json["member"]["url"].startswith("/images/sha256/")
+    assert rsp.json["member"]["placeholder"] is None  # undecodable
+
+def test_render_placeholders(app: Flask, client: FlaskClient, image_store: LocalImageStore,
+                             image_transcoder: ImageTranscoder):
+    upload(client, "/members/member/image", encode_png(64, 64))
+    image_transcoder.wait()
+    image = db.session.query(Image).one()
+    image.placeholder = None
+    db.session.commit()
+    app.config["IMAGES_PATH"] = image_store.root
+
+    result = app.test_cli_runner().invoke(args=["render-placeholders"])
+    assert result.exit_code == 0
+    assert "Rendered 1 placeholders" in result.output
+    assert db.session.query(Image).one().placeholder.startswith("data:image/webp")
@@ -1,10 +1,11 @@
 import pytest
 
 from flask.testing import FlaskClient
+from sqlalchemy import select
 
 from app import create_app
 
-from app.extensions import db
+from app.extensions import db, password_hasher
 from app.config import Config
 
 from app.models.member_model import Member
@@ -102,3 +103,48 @@ def test_login_me(client: FlaskClient):
     del items["password"]
     for k in items:
         assert rsp.json[k] == sysadmin_member[k]
+
+def test_login_rehashes_outdated_password(client: FlaskClient):
+    member = db.session.execute(select(Member).where(Member.username == "sysadmin")).scalars().one()
+    assert not member.password_needs_rehash()
+    rounds = password_hasher.rounds
+    password_hasher.configure(rounds=rounds + 1)
+    try:
+        rsp = client.post("/login", json={"username": "sysadmin", "password": "password"})
+        assert rsp.status_code == 200
+        db.session.refresh(member)
+        assert not member.password_needs_rehash()
+        assert member.matches_password("password")
+    finally:
+        password_hasher.configure(rounds=rounds)
+
+def test_login_single_query(client: FlaskClient, assert_max_queries):
+    with assert_max_queries(1):  # the member, not reloaded after the commit
+        rsp = client.post("/login", json={"username": "sysadmin", "password": "password"})
+    assert rsp.status_code == 200
+    assert rsp.json["member"]["username"] == "sysadmin"
+
+def test_login_password_hasher_busy(client: FlaskClient, monkeypatch):
+    from app.password_hasher import PasswordHasherBusyError
+
+    def busy(*args):
+        raise PasswordHasherBusyError()
+
+    monkeypatch.setattr(password_hasher, "verify", busy)
+    rsp = client.post("/login", json={"username": "sysadmin", "password": "password"})
+    assert rsp.status_code == 503
+    assert rsp.mimetype == "application/json"
+    assert rsp.headers["Retry-After"] == "1"
+
+def test_login_rate_limited_before_password_check(client: FlaskClient, monkeypatch):
+    client.application.config["LOGIN_RATE_LIMIT_USERNAME"] = "2/minute"
+    for _ in range(2):
+        assert client.post("/login", json={"username": "sysadmin", "password": "invalid_password"}).status_code == 401
+
+    def fail(*args):
+        raise AssertionError("password verified while rate limited")
+
+    monkeypatch.setattr(password_hasher, "verify", fail)
+    rsp = client.post("/login", json={"username": "sysadmin", "password": "password"})
+    assert rsp.status_code == 429
+    assert "Retry-After" in rsp.headers
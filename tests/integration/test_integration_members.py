@@ -105,8 +105,9 @@ def test_dev_create_duplicate_ist_ist_id(logged_in_dev: FlaskClient):
     rsp = logged_in_dev.post("/members", json=info)
     assert rsp.status_code == HTTPStatus.CONFLICT
 
-def test_sysadmin_get_members(logged_in_sysadmin: FlaskClient):
-    rsp = logged_in_sysadmin.get("/members")
+def test_sysadmin_get_members(logged_in_sysadmin: FlaskClient, assert_max_queries):
+    with assert_max_queries(2):
+        rsp = logged_in_sysadmin.get("/members")
     assert rsp.status_code == 200
     assert rsp.mimetype == "application/json"
     assert isinstance(rsp.json, list) and len(rsp.json) == len(roles)
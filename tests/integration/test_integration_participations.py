@@ -70,3 +70,25 @@ def logged_in_member(app: Flask):
     with app.test_client() as client:
         client.post("/login", json={"username": "member", "password": "password"})
         yield client
+
+
+def test_sysadmin_update_participation(logged_in_sysadmin: FlaskClient, assert_max_queries):
+    rsp = logged_in_sysadmin.post("/projects/name0/participations", json={"username": "dev", "join_date": "1970-01-01"})
+    assert rsp.status_code == HTTPStatus.OK
+
+    # the logged in member, the project, the member, the participation and its update
+    with assert_max_queries(5):
+        rsp = logged_in_sysadmin.put("/projects/name0/participations/dev", json={"roles": ["participant"]})
+    assert rsp.status_code == HTTPStatus.OK
+    assert rsp.json["roles"] == ["participant"]
+
+
+def test_get_project_participations_single_query(logged_in_sysadmin: FlaskClient, assert_max_queries):
+    for role in roles:
+        logged_in_sysadmin.post("/projects/name0/participations", json={"username": role, "join_date": "1970-01-01"})
+
+    # the logged in member, the project and its participations with their members, none per participation
+    with assert_max_queries(3):
+        rsp = logged_in_sysadmin.get("/projects/name0/participations")
+    assert rsp.status_code == HTTPStatus.OK
+    assert len(rsp.json) == len(roles)
@@ -100,8 +100,9 @@ def test_sysadmin_create_project_conflict_slug(logged_in_sysadmin: FlaskClient):
     assert rsp.mimetype == "application/json"
 
 
-def test_sysadmin_get_all_projects(logged_in_sysadmin: FlaskClient):
-    rsp = logged_in_sysadmin.get("/projects")
+def test_sysadmin_get_all_projects(logged_in_sysadmin: FlaskClient, assert_max_queries):
+    with assert_max_queries(2):
+        rsp = logged_in_sysadmin.get("/projects")
     assert rsp.status_code == HTTPStatus.OK
     assert rsp.mimetype == "application/json"
     data = rsp.json
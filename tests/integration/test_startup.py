@@ -0,0 +1,48 @@
+import subprocess
+import sys
+
+import pytest
+
+from app.config import resolve_clients
+from benchmarks.startup import OPTIONAL_MODULES, ROOT, StartupSample, measure_startup
+
+# generous for slow CI runners, python -m benchmarks.startup measures around 800ms
+STARTUP_BUDGET_MS = 3000
+
+
+@pytest.fixture(scope="module")
+def startup() -> StartupSample:
+    return measure_startup()
+
+
+def test_startup_within_budget(startup: StartupSample):
+    assert startup.total_ms < STARTUP_BUDGET_MS
+
+
+def test_optional_integrations_not_imported(startup: StartupSample):
+    assert not set(OPTIONAL_MODULES) & set(startup.modules)
+
+
+def test_config_import_has_no_side_effects(tmp_path):
+    sessions = tmp_path / "sessions"
+    subprocess.run([sys.executable, "-c", "import sys, app.config; assert 'redis' not in sys.modules"], cwd=ROOT,
+                   check=True, env={"SESSION_DIR": str(sessions), "SESSION_TYPE": "cachelib",
+                                    "RATE_LIMIT_REDIS": "redis://localhost:6379"})
+    assert not sessions.exists()
+
+
+def test_clients_resolved_once_per_process(tmp_path):
+    config = {"SECRET_KEY": "", "SESSION_TYPE": "cachelib", "SESSION_DIR": str(tmp_path), "RATE_LIMIT_REDIS_URL": ""}
+    other = dict(config)
+    resolve_clients(config)
+    resolve_clients(other)
+    assert config["SECRET_KEY"] and config["SECRET_KEY"] == other["SECRET_KEY"]
+    assert config["SESSION_CACHELIB"] is other["SESSION_CACHELIB"]
+    assert config["RATE_LIMIT_REDIS"] is None
+
+
+def test_configured_clients_kept():
+    config = {"SECRET_KEY": "secret", "SESSION_TYPE": "redis", "SESSION_REDIS": object(), "RATE_LIMIT_REDIS_URL": ""}
+    resolve_clients(config)
+    assert config["SECRET_KEY"] == "secret"
+    assert config["RATE_LIMIT_REDIS"] is config["SESSION_REDIS"]
@@ -0,0 +1,84 @@
+import pytest
+
+from sqlalchemy import select
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+from app.models.api_key_model import ApiKey, generate_api_key, hash_api_key
+from app.models.member_model import Member
+from app.repositories.api_key_repository import ApiKeyRepository
+
+base_member = {
+    "ist_id": "ist100000",
+    "username": "username",
+    "name": "name",
+    "email": "email",
+}
+
+@pytest.fixture(scope="function")
+def app():
+    Config.SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield
+        db.session.commit() # flush transactions or it won't be able to drop
+        db.drop_all()
+
+@pytest.fixture
+def api_key_repository():
+    return ApiKeyRepository(db=db)
+
+@pytest.fixture
+def member(app):
+    member = Member(**base_member)
+    db.session.add(member)
+    return member
+
+def test_create_api_key(member, api_key_repository: ApiKeyRepository):
+    key = generate_api_key()
+    api_key = api_key_repository.create_api_key(ApiKey(member=member, key=key, name="hook", permissions=["task:create"]))
+    assert api_key.id is not None
+
+    created = db.session.execute(select(ApiKey).where(ApiKey.id == api_key.id)).scalars().one_or_none()
+    assert created is not None
+    assert created.key_hash == hash_api_key(key)
+    assert created.key_hash != key
+    assert key.startswith(created.prefix)
+    assert created.permissions == ["task:create"]
+    assert created.member.username == member.username
+
+def test_get_api_key_by_hash(member, api_key_repository: ApiKeyRepository):
+    key = generate_api_key()
+    db.session.add(ApiKey(member=member, key=key, name="hook", permissions=["task:create", "task:read"]))
+
+    gotten = api_key_repository.get_api_key_by_hash(hash_api_key(key))
+    assert gotten is not None
+    assert gotten.permissions == ["task:create", "task:read"]
+    assert gotten.member.username == member.username
+
+def test_get_no_api_key_by_hash(member, api_key_repository: ApiKeyRepository):
+    db.session.add(ApiKey(member=member, key=generate_api_key(), name="hook", permissions=["task:create"]))
+    assert api_key_repository.get_api_key_by_hash(hash_api_key(generate_api_key())) is None
+
+def test_get_api_keys_by_member_id(member, api_key_repository: ApiKeyRepository):
+    for i in range(3):
+        db.session.add(ApiKey(member=member, key=generate_api_key(), name=f"key{i}", permissions=["task:create"]))
+    db.session.flush()
+
+    gotten = api_key_repository.get_api_keys_by_member_id(member.id)
+    assert {k.name for k in gotten} == {"key0", "key1", "key2"}
+
+def test_delete_api_key(member, api_key_repository: ApiKeyRepository):
+    api_key = api_key_repository.create_api_key(ApiKey(member=member, key=generate_api_key(), name="hook",
+                                                        permissions=["task:create"]))
+    deleted_id = api_key_repository.delete_api_key(api_key)
+    assert deleted_id == api_key.id
+    assert api_key_repository.get_api_key_by_id(deleted_id) is None
+
+def test_invalid_api_key_name(app):
+    with pytest.raises(ValueError) as exc_info:
+        ApiKey(member=Member(**base_member), key=generate_api_key(), name="", permissions=["task:create"])
+    assert "Invalid name length" in str(exc_info)
@@ -0,0 +1,89 @@
+import pytest
+
+from sqlalchemy.exc import IntegrityError
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+from app.utils import ProjectStateEnum
+
+from app.models.image_model import Image
+from app.models.member_model import Member
+from app.models.project_model import Project
+from app.repositories.image_repository import ImageRepository
+
+base_image = {
+    "path": "members/1-0123456789abcdef.png",
+    "mimetype": "image/png",
+    "size": 10,
+    "content_hash": "0" * 64,
+    "mtime": 0.0,
+}
+
+@pytest.fixture(scope="function")
+def app():
+    Config.SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield
+        db.session.commit() # flush transactions or it won't be able to drop
+        db.drop_all()
+
+@pytest.fixture
+def image_repository():
+    return ImageRepository(db=db)
+
+@pytest.fixture
+def member(app):
+    member = Member(ist_id="ist100000", username="username", name="name", email="email")
+    db.session.add(member)
+    db.session.flush()
+    return member
+
+@pytest.fixture
+def project(app):
+    project = Project(name="Project Name", start_date="1970-01-01", state=ProjectStateEnum.ACTIVE)
+    db.session.add(project)
+    db.session.flush()
+    return project
+
+def test_get_image_by_username(member, image_repository: ImageRepository):
+    image = image_repository.save_image(Image(**base_image, member_id=member.id))
+    assert image.id is not None
+    assert image_repository.get_image_by_username("username") == image
+    assert image_repository.get_image_by_member_id(member.id) == image
+    assert image_repository.get_image_by_username("other") is None
+
+def test_get_image_by_project_slug(project, image_repository: ImageRepository):
+    image = image_repository.save_image(Image(**base_image, project_id=project.id))
+    assert image_repository.get_image_by_project_slug("project-name") == image
+    assert image_repository.get_image_by_project_id(project.id) == image
+
+def test_image_single_owner(member, project, image_repository: ImageRepository):
+    with pytest.raises(IntegrityError):
+        image_repository.save_image(Image(**base_image, member_id=member.id, project_id=project.id))
+    db.session.rollback()
+
+def test_one_image_per_member(member, image_repository: ImageRepository):
+    image_repository.save_image(Image(**base_image, member_id=member.id))
+    with pytest.raises(IntegrityError):
+        image_repository.save_image(Image(**base_image, member_id=member.id))
+    db.session.rollback()
+
+def test_delete_image(member, image_repository: ImageRepository):
+    image = image_repository.save_image(Image(**base_image, member_id=member.id))
+    assert image_repository.delete_image(image) == image.id
+    assert image_repository.get_images() == []
+
+def test_get_member_images(member, image_repository: ImageRepository):
+    db.session.add(Member(ist_id="ist100001", username="other", name="name", email="email"))
+    image = image_repository.save_image(Image(**base_image, placeholder="data:", member_id=member.id))
+    db.session.expunge_all()
+
+    assert [(username, i and i.id) for username, i in image_repository.get_member_images()] == \
+           [("other", None), ("username", image.id)]
+    (_, with_placeholder), = [row for row in image_repository.get_member_images(placeholders=True) if row[1]]
+    assert "placeholder" in with_placeholder.__dict__
+    assert with_placeholder.placeholder == "data:"